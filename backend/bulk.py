@@ -0,0 +1,237 @@
+import os
+import time
+from datetime import datetime, timezone
+from collections import Counter
+from typing import Iterator, List, Optional, Sequence
+
+from sqlalchemy import String, and_, cast, delete, exists, func, insert, literal, select, update
+from sqlalchemy.orm import Session
+
+import counters
+import events
+import models
+
+# Keeps IN lists well under the bind-parameter limits of Postgres and SQLite.
+BULK_CHUNK_SIZE = int(os.environ.get('BULK_CHUNK_SIZE', '5000'))
+BULK_MAX_ISSUES = int(os.environ.get('BULK_MAX_ISSUES', '100000'))
+
+RESOLVED_STATUSES = ('resolved', 'closed')
+
+FIELD_OPERATIONS = {
+    'set_status': 'status',
+    'set_priority': 'priority',
+    'assign': 'assignee_id',
+}
+LABEL_HISTORY_PREFIX = {'add_labels': 'added', 'remove_labels': 'removed', 'set_labels': 'set'}
+
+
+class InvalidIssueIds(ValueError):
+    pass
+
+
+class InvalidBulkOperation(ValueError):
+    pass
+
+
+def chunked(values: Sequence[int], size: Optional[int] = None) -> Iterator[List[int]]:
+    # Read at call time so the setting can be changed without reimporting.
+    size = size or BULK_CHUNK_SIZE
+    for start in range(0, len(values), size):
+        yield list(values[start:start + size])
+
+
+def count_existing(db: Session, issue_ids: Sequence[int]) -> int:
+    return sum(
+        db.execute(select(func.count(models.Issue.id)).where(models.Issue.id.in_(chunk))).scalar()
+        for chunk in chunked(issue_ids)
+    )
+
+
+def validate_issue_ids(db: Session, issue_ids: Sequence[int]):
+    if len(set(issue_ids)) != len(issue_ids) or count_existing(db, issue_ids) != len(issue_ids):
+        raise InvalidIssueIds('One or more issue IDs are invalid')
+
+
+def history_from_select(issue_ids: List[int], changed_by_id: int, change_type: str, field_name: str, old_value, new_value, now: datetime, *conditions):
+    """INSERT ... SELECT one history row per issue; ``old_value`` may be a column of ``issues``."""
+    history = models.IssueHistory
+    return insert(history).from_select(
+        ['issue_id', 'changed_by_id', 'change_type', 'field_name', 'old_value', 'new_value', 'created_at'],
+        select(
+            models.Issue.id,
+            literal(changed_by_id, type_=history.changed_by_id.type),
+            literal(change_type, type_=history.change_type.type),
+            literal(field_name, type_=history.field_name.type),
+            old_value,
+            literal(new_value, type_=history.new_value.type),
+            literal(now, type_=history.created_at.type),
+        ).where(models.Issue.id.in_(issue_ids), *conditions),
+    )
+
+
+def bulk_update_status(db: Session, issue_ids: Sequence[int], new_status: str, changed_by_id: int) -> dict:
+    """Set ``new_status`` on every issue with set-based statements; the caller commits."""
+    started = time.perf_counter()
+    validate_issue_ids(db, issue_ids)
+    validated = time.perf_counter()
+
+    now = datetime.now(timezone.utc)
+    values = {
+        'status': new_status,
+        'version': models.Issue.version + 1,
+        'updated_at': now,
+    }
+    if new_status in RESOLVED_STATUSES:
+        values['resolved_at'] = func.coalesce(models.Issue.resolved_at, now)
+
+    statements = 0
+    deltas = Counter()
+    for chunk in chunked(issue_ids):
+        # History and counter deltas first, so they still see each issue's old status.
+        deltas.update(counters.grouped_change_deltas(db, 'status', chunk, new_status))
+        previous = events.snapshots(db, chunk)
+        db.execute(history_from_select(
+            chunk, changed_by_id, 'bulk_status_update', 'status', models.Issue.status, new_status, now
+        ))
+        db.execute(
+            update(models.Issue).where(models.Issue.id.in_(chunk)).values(**values),
+            execution_options={'synchronize_session': False},
+        )
+        statements += 3
+        events.record_issues(
+            db, chunk, 'bulk_status_update', previous,
+            field_name='status', new_value=new_status, changed_by_id=changed_by_id,
+        )
+    statements += counters.apply(db, deltas)
+
+    finished = time.perf_counter()
+    return {
+        'updated': len(issue_ids),
+        'status': new_status,
+        'statements': statements,
+        'validate_ms': round((validated - started) * 1000, 2),
+        'write_ms': round((finished - validated) * 1000, 2),
+        'elapsed_ms': round((finished - started) * 1000, 2),
+    }
+
+
+def resolve_targets(db: Session, issue_ids: Optional[Sequence[int]] = None, filters: Optional[dict] = None) -> List[int]:
+    if issue_ids is not None:
+        validate_issue_ids(db, issue_ids)
+        return list(issue_ids)
+
+    query = select(models.Issue.id)
+    for field, value in (filters or {}).items():
+        if value is not None:
+            query = query.where(getattr(models.Issue, field) == value)
+    targets = db.execute(query.order_by(models.Issue.id).limit(BULK_MAX_ISSUES + 1)).scalars().all()
+    if len(targets) > BULK_MAX_ISSUES:
+        raise InvalidBulkOperation(f'Filter matches more than {BULK_MAX_ISSUES} issues')
+    return targets
+
+
+def _label_names(db: Session, label_ids: List[int]) -> List[str]:
+    names = db.execute(
+        select(models.Label.name).where(models.Label.id.in_(label_ids)).order_by(models.Label.name)
+    ).scalars().all()
+    if len(names) != len(set(label_ids)):
+        raise InvalidBulkOperation('One or more label IDs are invalid')
+    return names
+
+
+def _add_labels(issue_ids: List[int], label_ids: List[int]):
+    link = models.issue_labels
+    return insert(link).from_select(
+        ['issue_id', 'label_id'],
+        select(models.Issue.id, models.Label.id)
+        .join(models.Label, models.Label.id.in_(label_ids))
+        .where(models.Issue.id.in_(issue_ids))
+        .where(~exists().where(and_(link.c.issue_id == models.Issue.id, link.c.label_id == models.Label.id))),
+    )
+
+
+def bulk_mutate(db: Session, issue_ids: Sequence[int], operations: List[dict], changed_by_id: int) -> dict:
+    """Apply field and label operations to ``issue_ids`` with a few set-based statements per chunk.
+
+    Each operation is a dict with ``op`` and ``value``. Fields are written by one
+    UPDATE that also bumps version/updated_at; label operations rewrite
+    ``issue_labels`` directly. The caller commits.
+    """
+    started = time.perf_counter()
+    now = datetime.now(timezone.utc)
+
+    field_values = {}
+    label_operations = []
+    for operation in operations:
+        op, value = operation['op'], operation.get('value')
+        if op in FIELD_OPERATIONS:
+            field_values[FIELD_OPERATIONS[op]] = value
+        elif op in LABEL_HISTORY_PREFIX:
+            label_ids = list(value or [])
+            names = _label_names(db, label_ids) if label_ids else []
+            label_operations.append((op, label_ids, names))
+        else:
+            raise InvalidBulkOperation(f'Unknown operation {op!r}')
+
+    assignee_id = field_values.get('assignee_id')
+    if assignee_id is not None and db.get(models.User, assignee_id) is None:
+        raise InvalidBulkOperation('Assignee does not exist')
+
+    values = {'version': models.Issue.version + 1, 'updated_at': now, **field_values}
+    if field_values.get('status') in RESOLVED_STATUSES:
+        values['resolved_at'] = func.coalesce(models.Issue.resolved_at, now)
+
+    link = models.issue_labels
+    executed = 0
+    deltas = Counter()
+    for chunk in chunked(issue_ids):
+        for field in ('status', 'priority'):
+            if field in field_values:
+                deltas.update(counters.grouped_change_deltas(db, field, chunk, field_values[field]))
+                executed += 1
+
+        statements = []
+        for field, value in field_values.items():
+            column = getattr(models.Issue, field)
+            old_value = cast(column, String) if field == 'assignee_id' else column
+            statements.append(history_from_select(
+                chunk, changed_by_id, 'bulk_update', field, old_value,
+                str(value) if value is not None else None, now,
+                column.is_distinct_from(value),
+            ))
+
+        statements.append(
+            update(models.Issue).where(models.Issue.id.in_(chunk)).values(**values)
+            .execution_options(synchronize_session=False)
+        )
+
+        for op, label_ids, names in label_operations:
+            if op == 'remove_labels':
+                statements.append(delete(link).where(link.c.issue_id.in_(chunk), link.c.label_id.in_(label_ids)))
+            if op == 'set_labels':
+                statements.append(delete(link).where(link.c.issue_id.in_(chunk), link.c.label_id.not_in(label_ids)))
+            if op in ('add_labels', 'set_labels') and label_ids:
+                statements.append(_add_labels(chunk, label_ids))
+            summary = ', '.join(names) if names else 'none'
+            statements.append(history_from_select(
+                chunk, changed_by_id, 'bulk_labels_update', 'labels', literal(None, type_=String),
+                f'{LABEL_HISTORY_PREFIX[op]}: {summary}', now,
+            ))
+
+        previous = events.snapshots(db, chunk)
+        for statement in statements:
+            db.execute(statement)
+        executed += len(statements)
+        events.record_issues(
+            db, chunk, 'bulk_update' if field_values else 'bulk_labels_update', previous,
+            operations=[operation['op'] for operation in operations], changed_by_id=changed_by_id,
+        )
+    executed += counters.apply(db, deltas)
+
+    finished = time.perf_counter()
+    return {
+        'updated': len(issue_ids),
+        'operations': [operation['op'] for operation in operations],
+        'statements': executed,
+        'elapsed_ms': round((finished - started) * 1000, 2),
+    }
@@ -0,0 +1,211 @@
+import logging
+import os
+import threading
+from collections import Counter
+from typing import Iterable, Optional
+
+from sqlalchemy import delete, event, func, insert, select, text, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+import models
+from database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+COUNTER_RECONCILE_INTERVAL = int(os.environ.get('COUNTER_RECONCILE_INTERVAL', '3600'))
+
+TOTAL = ('total', '')
+# Bumped once by every transaction that writes what an issue list shows; list ETags read it.
+CHANGES = ('changes', '')
+LISTED_TABLES = frozenset({'issues', 'issue_labels', 'labels', 'users'})
+
+
+def issue_deltas(status: Optional[str], priority: Optional[str], sign: int = 1) -> Counter:
+    deltas = Counter({TOTAL: sign})
+    if status is not None:
+        deltas[('status', status)] += sign
+    if priority is not None:
+        deltas[('priority', priority)] += sign
+    return deltas
+
+
+def change_deltas(dimension: str, old_value: Optional[str], new_value: Optional[str], count: int = 1) -> Counter:
+    deltas = Counter()
+    if old_value == new_value:
+        return deltas
+    if old_value is not None:
+        deltas[(dimension, old_value)] -= count
+    if new_value is not None:
+        deltas[(dimension, new_value)] += count
+    return deltas
+
+
+def grouped_change_deltas(db: Session, dimension: str, issue_ids: Iterable[int], new_value: str) -> Counter:
+    """Deltas for moving ``issue_ids`` to ``new_value``; must run before the UPDATE."""
+    column = getattr(models.Issue, dimension)
+    rows = db.execute(
+        select(column, func.count(models.Issue.id))
+        .where(models.Issue.id.in_(list(issue_ids)))
+        .group_by(column)
+    ).all()
+    deltas = Counter()
+    for old_value, count in rows:
+        deltas.update(change_deltas(dimension, old_value, new_value, count))
+    return deltas
+
+
+def _upsert(dialect_name: str):
+    if dialect_name == 'postgresql':
+        return postgresql.insert
+    if dialect_name == 'sqlite':
+        return sqlite.insert
+    return None
+
+
+def apply(db: Session, deltas: Counter):
+    """Add ``deltas`` to the counters inside the caller's transaction; returns the statements issued."""
+    counter = models.IssueCounter
+    statements = 0
+    upsert = _upsert(db.get_bind().dialect.name)
+    # Sorted keys give every writer the same row-lock order.
+    for (dimension, value), delta in sorted(deltas.items()):
+        if not delta:
+            continue
+        statements += 1
+        if upsert is not None:
+            statement = upsert(counter).values(dimension=dimension, value=value, count=delta)
+            db.execute(statement.on_conflict_do_update(
+                index_elements=['dimension', 'value'],
+                set_={'count': counter.count + delta},
+            ))
+            continue
+        updated = db.execute(
+            update(counter)
+            .where(counter.dimension == dimension, counter.value == value)
+            .values(count=counter.count + delta)
+        ).rowcount
+        if not updated:
+            db.execute(insert(counter).values(dimension=dimension, value=value, count=delta))
+            statements += 1
+    return statements
+
+
+def read(db: Session) -> dict:
+    rows = db.execute(select(models.IssueCounter)).scalars().all()
+    stats = {'total_issues': 0, 'by_status': {}, 'by_priority': {}}
+    for row in rows:
+        if row.dimension == 'total':
+            stats['total_issues'] = row.count
+        elif row.dimension == CHANGES[0]:
+            continue
+        elif row.count:
+            stats[f'by_{row.dimension}'][row.value] = row.count
+    return stats
+
+
+def reconcile(db: Session) -> Counter:
+    """Recompute every counter from ``issues``; returns the drift that was repaired."""
+    counter = models.IssueCounter
+    if db.get_bind().dialect.name == 'postgresql':
+        # Writers wait for the rebuild, so no increment lands between the count and the rewrite.
+        db.execute(text('LOCK TABLE issue_counters IN EXCLUSIVE MODE'))
+    # The change token is not derived from ``issues`` and is left alone.
+    derived = counter.dimension != CHANGES[0]
+    current = Counter({
+        (row.dimension, row.value): row.count
+        for row in db.execute(select(counter).where(derived)).scalars()
+    })
+    db.execute(delete(counter).where(derived))
+
+    actual = Counter({TOTAL: db.execute(select(func.count(models.Issue.id))).scalar()})
+    for dimension in ('status', 'priority'):
+        column = getattr(models.Issue, dimension)
+        for value, count in db.execute(
+            select(column, func.count(models.Issue.id)).where(column.isnot(None)).group_by(column)
+        ):
+            actual[(dimension, value)] = count
+
+    if actual:
+        db.execute(insert(counter), [
+            {'dimension': dimension, 'value': value, 'count': count}
+            for (dimension, value), count in actual.items()
+        ])
+
+    drift = Counter(actual)
+    drift.subtract(current)
+    return Counter({key: delta for key, delta in drift.items() if delta})
+
+
+def _mark_listed_write(session: Session):
+    session.info['listed_changes'] = True
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_listed_writes(session, flush_context):
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        table = getattr(type(instance), '__tablename__', None)
+        if table in LISTED_TABLES:
+            _mark_listed_write(session)
+            return
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _collect_listed_statements(orm_execute_state):
+    if orm_execute_state.is_select:
+        return
+    table = getattr(orm_execute_state.statement, 'table', None)
+    if getattr(table, 'name', None) in LISTED_TABLES:
+        _mark_listed_write(orm_execute_state.session)
+
+
+@event.listens_for(Session, 'before_commit')
+def _bump_change_token(session):
+    # Pending objects are flushed after this hook; flush now so they are seen.
+    session.flush()
+    if session.info.pop('listed_changes', False):
+        # Inside the writing transaction, so the token moves exactly when the
+        # write becomes visible, whatever order writers commit in.
+        apply(session, Counter({CHANGES: 1}))
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_listed_writes(session):
+    session.info.pop('listed_changes', None)
+
+
+class CounterReconciler:
+    def __init__(self, session_factory=SessionLocal, interval: int = COUNTER_RECONCILE_INTERVAL):
+        self.session_factory = session_factory
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def run_once(self):
+        db = self.session_factory()
+        try:
+            drift = reconcile(db)
+            db.commit()
+            if drift:
+                logger.warning('Repaired issue counter drift: %s', dict(drift))
+        except Exception:
+            db.rollback()
+            logger.exception('Issue counter reconciliation failed')
+        finally:
+            db.close()
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self.run_once()
+
+    def start(self):
+        self.run_once()
+        if self.interval > 0 and self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name='counter-reconciler', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+
+reconciler = CounterReconciler()
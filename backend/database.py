@@ -31,6 +31,17 @@ if not DB_URL:
 # -------------------------------------------------
 connect_args = {"sslmode": "require"} if IS_RENDER else {}
 
+# Blocking route handlers run in a thread pool; size the connection pool so
+# those threads wait on the database concurrently rather than on each other.
+THREADPOOL_SIZE = int(os.getenv("THREADPOOL_SIZE", "40"))
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+
+pool_args = {} if DB_URL.startswith("sqlite") else {
+    "pool_size": DB_POOL_SIZE,
+    "max_overflow": DB_MAX_OVERFLOW,
+}
+
 engine = create_engine(
     DB_URL,
     pool_pre_ping=True,
@@ -38,6 +49,7 @@ engine = create_engine(
     connect_args={
         "sslmode": "require"
     } if IS_RENDER else {},
+    **pool_args,
 )
 
 
@@ -65,4 +77,4 @@ def get_db() -> Generator[Session, None, None]:
 # -------------------------------------------------
 # Explicit exports (helps Pylance)
 # -------------------------------------------------
-__all__ = ["engine", "SessionLocal", "Base", "get_db"]
+__all__ = ["engine", "SessionLocal", "Base", "get_db", "THREADPOOL_SIZE"]
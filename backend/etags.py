@@ -0,0 +1,77 @@
+import hashlib
+import json
+from typing import Optional
+
+from fastapi import Response
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+import counters
+import models
+
+# Clients may keep a copy but must revalidate it, which is a cheap 304 when nothing changed.
+CACHE_CONTROL = 'private, no-cache'
+
+
+def make_etag(*parts) -> str:
+    digest = hashlib.sha256(json.dumps(parts, default=str, separators=(',', ':')).encode('utf-8')).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match uses the weak comparison: a W/ prefix is ignored."""
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(',')]
+    return '*' in candidates or any(candidate.removeprefix('W/') == etag for candidate in candidates)
+
+
+def headers(etag: str) -> dict:
+    return {'ETag': etag, 'Cache-Control': CACHE_CONTROL}
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers=headers(etag))
+
+
+def issue_etag(db: Session, issue_id: int, *params) -> Optional[str]:
+    """ETag of one issue's representation, or None if it does not exist.
+
+    ``version`` covers the issue's fields and labels; comments are not
+    versioned, so their count and latest update are folded in.
+    """
+    comments = models.Comment.issue_id == issue_id
+    row = db.execute(
+        select(
+            models.Issue.version,
+            models.Issue.updated_at,
+            select(func.count(models.Comment.id)).where(comments).scalar_subquery(),
+            select(func.max(models.Comment.updated_at)).where(comments).scalar_subquery(),
+        ).where(models.Issue.id == issue_id)
+    ).first()
+    if row is None:
+        return None
+    return make_etag('issue', issue_id, *row, *params)
+
+
+def issues_etag(db: Session, filters: dict, *params) -> str:
+    """ETag of a filtered issue list, from the change counter: one primary-key lookup.
+
+    Every transaction that writes issues, their labels or the users they
+    embed bumps ``counters.CHANGES`` before it commits, so the tag changes
+    whenever such a write becomes visible, including writes whose
+    ``updated_at`` is older than one already committed. Any write changes
+    every list's tag: a refetch, never a stale list.
+    """
+    counter = models.IssueCounter
+    dimension, value = counters.CHANGES
+    token = db.execute(
+        select(counter.count).where(counter.dimension == dimension, counter.value == value)
+    ).scalar()
+    return make_etag('issues', token or 0, sorted(filters.items(), key=lambda item: item[0]), *params)
+
+
+def labels_etag(db: Session) -> str:
+    # Labels are only ever created, so the count and the highest id identify the set.
+    row = db.execute(select(func.count(models.Label.id), func.max(models.Label.id))).one()
+    return make_etag('labels', *row)
@@ -0,0 +1,265 @@
+"""In-process fan-out of committed issue changes to server-sent event streams.
+
+Events are built from the same writes that produce ``IssueHistory`` rows:
+ORM history objects are picked up at flush, set-based writers call
+``record_issues``. They are queued on the session and published only after
+the transaction commits.
+
+Writers never wait on consumers: ``publish`` hands the batch to the event
+loop and returns. Each subscriber has a bounded queue; when it overflows, the
+backlog is dropped and the subscriber is told it lagged, so it can refetch.
+
+Events carry the filterable fields as they were before the change in
+``previous``, so a filtered subscriber also hears about issues that leave its
+filter, not only about the ones that enter or stay in it.
+"""
+import asyncio
+import itertools
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+
+import models
+
+logger = logging.getLogger(__name__)
+
+EVENT_QUEUE_SIZE = int(os.environ.get('EVENT_QUEUE_SIZE', '256'))
+EVENT_HEARTBEAT_SECONDS = float(os.environ.get('EVENT_HEARTBEAT_SECONDS', '15'))
+
+SNAPSHOT_FIELDS = ('status', 'priority', 'assignee_id', 'version')
+FILTER_FIELDS = ('status', 'priority', 'assignee_id')
+
+
+def event_kind(change_type: str) -> str:
+    if change_type.startswith('comment'):
+        return 'comment'
+    if 'labels' in change_type:
+        return 'labels'
+    return 'issue'
+
+
+def make_event(issue_id: int, change_type: str, issue: Optional[dict] = None, **details) -> dict:
+    return {
+        'kind': event_kind(change_type),
+        'change_type': change_type,
+        'issue_id': issue_id,
+        'issue': issue or {},
+        'at': datetime.now(timezone.utc).isoformat(),
+        **details,
+    }
+
+
+class Subscription:
+    def __init__(self, issue_id: Optional[int] = None, filters: Optional[dict] = None, maxsize: int = EVENT_QUEUE_SIZE):
+        self.issue_id = issue_id
+        self.filters = {field: value for field, value in (filters or {}).items() if value is not None}
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.lagged = False
+        self.dropped = 0
+
+    def _passes(self, issue: dict) -> bool:
+        return all(issue.get(field) == value for field, value in self.filters.items())
+
+    def matches(self, change: dict) -> bool:
+        """True if the issue passes the filters after the change or did before it."""
+        if self.issue_id is not None and change['issue_id'] != self.issue_id:
+            return False
+        issue = change['issue']
+        if self._passes(issue):
+            return True
+        previous = change.get('previous')
+        return previous is not None and self._passes({**issue, **previous})
+
+    def offer(self, change: dict):
+        try:
+            self.queue.put_nowait(change)
+        except asyncio.QueueFull:
+            # Keep memory bounded: the consumer refetches instead of replaying.
+            self.dropped += self.queue.qsize() + 1
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.lagged = True
+
+
+class EventBroker:
+    def __init__(self, maxsize: int = EVENT_QUEUE_SIZE):
+        self.maxsize = maxsize
+        self._subscribers = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+        self._sequence = itertools.count(1)
+        self.published = 0
+
+    @property
+    def has_subscribers(self) -> bool:
+        return bool(self._subscribers)
+
+    def subscribe(self, issue_id: Optional[int] = None, filters: Optional[dict] = None) -> Subscription:
+        """Register a subscriber; must be called from the event loop that will consume it."""
+        subscription = Subscription(issue_id, filters, self.maxsize)
+        with self._lock:
+            self._loop = asyncio.get_running_loop()
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def publish(self, changes: List[dict]):
+        """Thread-safe and non-blocking; delivery happens on the event loop."""
+        loop = self._loop
+        if not changes or loop is None or not self._subscribers or loop.is_closed():
+            return
+        with self._lock:
+            for change in changes:
+                change['id'] = next(self._sequence)
+            self.published += len(changes)
+        try:
+            loop.call_soon_threadsafe(self._fan_out, changes)
+        except RuntimeError:
+            logger.debug('Event loop closed; dropping %d events', len(changes))
+
+    def _fan_out(self, changes: List[dict]):
+        for subscription in list(self._subscribers):
+            for change in changes:
+                if subscription.matches(change):
+                    subscription.offer(change)
+
+    def stats(self) -> dict:
+        subscribers = list(self._subscribers)
+        return {
+            'subscribers': len(subscribers),
+            'published': self.published,
+            'lagged_subscribers': sum(1 for subscription in subscribers if subscription.lagged),
+            'dropped': sum(subscription.dropped for subscription in subscribers),
+        }
+
+
+broker = EventBroker()
+
+
+def format_sse(change: dict) -> str:
+    return f"id: {change['id']}\nevent: {change['kind']}\ndata: {json.dumps(change, default=str)}\n\n"
+
+
+async def stream(subscription: Subscription, is_disconnected, heartbeat: float = EVENT_HEARTBEAT_SECONDS):
+    """Yield SSE frames for ``subscription`` until the client goes away."""
+    try:
+        yield ': connected\n\n'
+        while not await is_disconnected():
+            if subscription.lagged:
+                subscription.lagged = False
+                yield 'event: lagged\ndata: {}\n\n'
+            try:
+                change = await asyncio.wait_for(subscription.queue.get(), heartbeat)
+            except asyncio.TimeoutError:
+                yield ': keep-alive\n\n'
+                continue
+            yield format_sse(change)
+    finally:
+        broker.unsubscribe(subscription)
+
+
+def snapshot(issue) -> dict:
+    # Only already-loaded values: attribute loads are not allowed inside a flush.
+    loaded = inspect(issue).dict
+    return {field: loaded[field] for field in SNAPSHOT_FIELDS if field in loaded}
+
+
+def previous_values(issue: Optional[dict], changes: Iterable[Tuple[Optional[str], Optional[str]]]) -> Optional[dict]:
+    """The filterable fields of ``issue`` before ``changes``, its history ``(field_name, old_value)`` pairs in order."""
+    if issue is None:
+        return None
+    previous = {field: issue[field] for field in FILTER_FIELDS if field in issue}
+    # The first change to a field holds its value from before the transaction.
+    for field_name, old_value in reversed(list(changes)):
+        if field_name == 'assignee_id':
+            previous[field_name] = int(old_value) if old_value is not None else None
+        elif field_name in FILTER_FIELDS:
+            previous[field_name] = old_value
+    return previous
+
+
+def snapshots(session: Session, issue_ids: List[int]) -> Dict[int, dict]:
+    """Current snapshot of each issue, with one query; empty when nobody is listening."""
+    if not broker.has_subscribers or not issue_ids:
+        return {}
+    return {
+        row.id: {field: getattr(row, field) for field in SNAPSHOT_FIELDS}
+        for row in session.execute(
+            select(models.Issue.id, *[getattr(models.Issue, field) for field in SNAPSHOT_FIELDS])
+            .where(models.Issue.id.in_(issue_ids))
+        )
+    }
+
+
+def record(session: Session, changes: Iterable[dict]):
+    session.info.setdefault('pending_events', []).extend(changes)
+
+
+def record_issues(
+    session: Session,
+    issue_ids: List[int],
+    change_type: str,
+    previous: Optional[Dict[int, dict]] = None,
+    **details,
+):
+    """Queue events for issues written with set-based statements, with one snapshot query.
+
+    ``previous`` holds the snapshots taken by ``snapshots`` before the write.
+    """
+    if not broker.has_subscribers or not issue_ids:
+        return
+    current = snapshots(session, issue_ids)
+    changes = []
+    for issue_id in issue_ids:
+        before = (previous or {}).get(issue_id)
+        if before is not None:
+            details['previous'] = {field: before[field] for field in FILTER_FIELDS}
+        else:
+            details.pop('previous', None)
+        changes.append(make_event(issue_id, change_type, current.get(issue_id), **details))
+    record(session, changes)
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_history(session, flush_context):
+    if not broker.has_subscribers:
+        return
+    changes = []
+    for instance in session.new:
+        if not isinstance(instance, models.IssueHistory):
+            continue
+        issue = session.identity_map.get(session.identity_key(models.Issue, instance.issue_id))
+        current = snapshot(issue) if issue is not None else None
+        changes.append(make_event(
+            instance.issue_id,
+            instance.change_type,
+            current,
+            previous=previous_values(current, [(instance.field_name, instance.old_value)]),
+            field_name=instance.field_name,
+            old_value=instance.old_value,
+            new_value=instance.new_value,
+            changed_by_id=instance.changed_by_id,
+        ))
+    if changes:
+        record(session, changes)
+
+
+@event.listens_for(Session, 'after_commit')
+def _publish_on_commit(session):
+    changes = session.info.pop('pending_events', None)
+    if changes:
+        broker.publish(changes)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_on_rollback(session):
+    session.info.pop('pending_events', None)
@@ -0,0 +1,180 @@
+import csv
+import io
+import json
+import os
+from collections import defaultdict
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session, aliased
+
+import history_archive
+import models
+
+EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', '1000'))
+
+EXPORT_FORMATS = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+EXPORT_INCLUDES = ('labels', 'history')
+
+# The first columns match the importer's format, so an export can be re-imported.
+CSV_COLUMNS = [
+    'title', 'description', 'status', 'priority', 'assignee_email',
+    'id', 'creator_email', 'version', 'created_at', 'updated_at', 'resolved_at',
+]
+
+
+def _isoformat(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value is not None else None
+
+
+def _labels_by_issue(db: Session, issue_ids: List[int]) -> Dict[int, List[str]]:
+    link = models.issue_labels
+    labels = defaultdict(list)
+    for issue_id, name in db.execute(
+        select(link.c.issue_id, models.Label.name)
+        .join(models.Label, models.Label.id == link.c.label_id)
+        .where(link.c.issue_id.in_(issue_ids))
+        .order_by(link.c.issue_id, models.Label.name)
+    ):
+        labels[issue_id].append(name)
+    return labels
+
+
+def _history_by_issue(db: Session, issue_ids: List[int]) -> Dict[int, List[dict]]:
+    history = models.IssueHistory
+    entries = defaultdict(list)
+    for row in db.execute(
+        select(
+            history.issue_id, history.change_type, history.field_name,
+            history.old_value, history.new_value, history.changed_by_id, history.created_at,
+        )
+        .where(history.issue_id.in_(issue_ids))
+        .order_by(history.issue_id, history.created_at, history.id)
+    ):
+        entries[row.issue_id].append({
+            'change_type': row.change_type,
+            'field_name': row.field_name,
+            'old_value': row.old_value,
+            'new_value': row.new_value,
+            'changed_by_id': row.changed_by_id,
+            'created_at': _isoformat(row.created_at),
+        })
+    # Archived months are older than anything still live.
+    for issue_id, rows in history_archive.archived_rows(db, issue_ids).items():
+        entries[issue_id][:0] = [
+            {
+                'change_type': row['change_type'],
+                'field_name': row['field_name'],
+                'old_value': row['old_value'],
+                'new_value': row['new_value'],
+                'changed_by_id': row['changed_by_id'],
+                'created_at': _isoformat(row['created_at']),
+            }
+            for row in rows
+        ]
+    return entries
+
+
+def iter_issues(
+    session_factory: Callable[[], Session],
+    filters: Optional[dict] = None,
+    include: tuple = (),
+    batch_size: int = EXPORT_BATCH_SIZE,
+) -> Iterator[dict]:
+    """Yield issues as plain dicts in id order, holding at most one batch in memory.
+
+    Rows come from a server-side cursor (``yield_per`` streams results on
+    Postgres); labels and history are fetched with one query per batch. The
+    generator owns its session because it outlives the request's dependencies.
+    """
+    creator = aliased(models.User)
+    assignee = aliased(models.User)
+    query = (
+        select(
+            models.Issue.id, models.Issue.title, models.Issue.description,
+            models.Issue.status, models.Issue.priority, models.Issue.version,
+            models.Issue.created_at, models.Issue.updated_at, models.Issue.resolved_at,
+            creator.email.label('creator_email'), assignee.email.label('assignee_email'),
+        )
+        .outerjoin(creator, creator.id == models.Issue.creator_id)
+        .outerjoin(assignee, assignee.id == models.Issue.assignee_id)
+        .order_by(models.Issue.id)
+    )
+    for field, value in (filters or {}).items():
+        if value is not None:
+            query = query.where(getattr(models.Issue, field) == value)
+
+    db = session_factory()
+    try:
+        result = db.execute(query.execution_options(yield_per=batch_size))
+        for batch in result.partitions():
+            issue_ids = [row.id for row in batch]
+            labels = _labels_by_issue(db, issue_ids) if 'labels' in include else None
+            history = _history_by_issue(db, issue_ids) if 'history' in include else None
+            for row in batch:
+                item = {
+                    'id': row.id,
+                    'title': row.title,
+                    'description': row.description,
+                    'status': row.status,
+                    'priority': row.priority,
+                    'version': row.version,
+                    'creator_email': row.creator_email,
+                    'assignee_email': row.assignee_email,
+                    'created_at': _isoformat(row.created_at),
+                    'updated_at': _isoformat(row.updated_at),
+                    'resolved_at': _isoformat(row.resolved_at),
+                }
+                if labels is not None:
+                    item['labels'] = labels.get(row.id, [])
+                if history is not None:
+                    item['history'] = history.get(row.id, [])
+                yield item
+    finally:
+        db.close()
+
+
+def stream_ndjson(items: Iterator[dict], flush_every: int = EXPORT_BATCH_SIZE) -> Iterator[str]:
+    buffer = []
+    for item in items:
+        buffer.append(json.dumps(item, separators=(',', ':')))
+        if len(buffer) >= flush_every:
+            yield '\n'.join(buffer) + '\n'
+            buffer = []
+    if buffer:
+        yield '\n'.join(buffer) + '\n'
+
+
+def stream_csv(items: Iterator[dict], include: tuple = (), flush_every: int = EXPORT_BATCH_SIZE) -> Iterator[str]:
+    # Labels are joined with ';'; history is embedded as a JSON array.
+    columns = CSV_COLUMNS + [name for name in EXPORT_INCLUDES if name in include]
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction='ignore')
+    writer.writeheader()
+    rows = 0
+    for item in items:
+        if 'labels' in item:
+            item['labels'] = ';'.join(item['labels'])
+        if 'history' in item:
+            item['history'] = json.dumps(item['history'], separators=(',', ':'))
+        writer.writerow(item)
+        rows += 1
+        if rows % flush_every == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def stream_export(
+    session_factory: Callable[[], Session],
+    export_format: str,
+    filters: Optional[dict] = None,
+    include: tuple = (),
+    batch_size: int = EXPORT_BATCH_SIZE,
+) -> Iterator[str]:
+    items = iter_issues(session_factory, filters, include, batch_size)
+    if export_format == 'ndjson':
+        return stream_ndjson(items, batch_size)
+    return stream_csv(items, include, batch_size)
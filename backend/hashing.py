@@ -0,0 +1,124 @@
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+import auth
+
+logger = logging.getLogger(__name__)
+
+# bcrypt is deliberately slow CPU work. It runs in a dedicated pool (processes by
+# default, so hashes run in parallel without contending for the GIL) behind a
+# bounded number of in-flight requests; excess requests are shed instead of queued.
+HASH_EXECUTOR = os.environ.get('HASH_EXECUTOR', 'process')
+HASH_WORKERS = int(os.environ.get('HASH_WORKERS', os.cpu_count() or 1))
+HASH_MAX_PENDING = int(os.environ.get('HASH_MAX_PENDING', HASH_WORKERS * 4))
+HASH_TIMEOUT = float(os.environ.get('HASH_TIMEOUT', '10'))
+
+
+class HashingOverloaded(Exception):
+    pass
+
+
+class HashMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._operations = {}
+        self.rejected = 0
+
+    def record(self, operation: str, seconds: float):
+        with self._lock:
+            stats = self._operations.setdefault(operation, {'count': 0, 'total': 0.0, 'max': 0.0})
+            stats['count'] += 1
+            stats['total'] += seconds
+            stats['max'] = max(stats['max'], seconds)
+
+    def reject(self):
+        with self._lock:
+            self.rejected += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            operations = {
+                name: {
+                    'count': stats['count'],
+                    'avg_ms': round(stats['total'] / stats['count'] * 1000, 2),
+                    'max_ms': round(stats['max'] * 1000, 2),
+                }
+                for name, stats in self._operations.items()
+            }
+            return {'operations': operations, 'rejected': self.rejected}
+
+
+class HashingExecutor:
+    def __init__(self, kind: str = HASH_EXECUTOR, workers: int = HASH_WORKERS, max_pending: int = HASH_MAX_PENDING):
+        if kind not in ('process', 'thread'):
+            raise ValueError(f'Unknown hashing executor {kind!r}')
+        self.kind = kind
+        self.workers = workers
+        self.max_pending = max_pending
+        self.metrics = HashMetrics()
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    def _get_executor(self) -> Executor:
+        with self._executor_lock:
+            if self._executor is None:
+                if self.kind == 'process':
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                else:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='hashing')
+            return self._executor
+
+    def run(self, operation: str, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            self.metrics.reject()
+            raise HashingOverloaded('Too many password hashing requests in flight')
+
+        start = time.perf_counter()
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        # The slot belongs to the job, not the caller: a job that outlives its
+        # caller's timeout keeps counting against max_pending until it ends.
+        future.add_done_callback(lambda _: self._slots.release())
+
+        timed_out = False
+        try:
+            return future.result(timeout=HASH_TIMEOUT)
+        except FutureTimeoutError:
+            timed_out = True
+            future.cancel()
+            self.metrics.reject()
+            raise HashingOverloaded('Password hashing timed out')
+        finally:
+            if not timed_out:
+                self.metrics.record(operation, time.perf_counter() - start)
+
+    def hash_password(self, password: str) -> str:
+        return self.run('hash', auth.get_password_hash, password)
+
+    def verify_password(self, plain_password: str, hashed_password: str) -> bool:
+        return self.run('verify', auth.verify_password, plain_password, hashed_password)
+
+    def stats(self) -> dict:
+        return {
+            'executor': self.kind,
+            'workers': self.workers,
+            'max_pending': self.max_pending,
+            **self.metrics.snapshot(),
+        }
+
+    def shutdown(self):
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+hasher = HashingExecutor()
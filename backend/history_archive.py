@@ -0,0 +1,280 @@
+"""Monthly compaction of old issue history.
+
+Usage: python history_archive.py [--retention-days N] [--max-rows N]
+
+``issue_history`` keeps the last ``HISTORY_RETENTION_DAYS`` (rounded down to
+whole calendar months); older rows are moved into ``issue_history_archive``,
+one row per issue and month holding its entries as zlib-compressed columnar
+JSON. The timeline, export and sync read both tables.
+
+Each run moves at most ``HISTORY_ARCHIVE_MAX_ROWS`` rows, in transactions of
+``HISTORY_ARCHIVE_BATCH_SIZE`` with ``HISTORY_ARCHIVE_PAUSE_SECONDS`` between
+them, so deletes reach vacuum in small steps instead of one large burst.
+"""
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+import zlib
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, func, select, tuple_
+from sqlalchemy.orm import Session
+
+import models
+from database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# 0 keeps every history row live.
+HISTORY_RETENTION_DAYS = int(os.environ.get('HISTORY_RETENTION_DAYS', '0'))
+HISTORY_ARCHIVE_BATCH_SIZE = int(os.environ.get('HISTORY_ARCHIVE_BATCH_SIZE', '1000'))
+HISTORY_ARCHIVE_MAX_ROWS = int(os.environ.get('HISTORY_ARCHIVE_MAX_ROWS', '100000'))
+HISTORY_ARCHIVE_PAUSE_SECONDS = float(os.environ.get('HISTORY_ARCHIVE_PAUSE_SECONDS', '0.5'))
+HISTORY_ARCHIVE_INTERVAL = int(os.environ.get('HISTORY_ARCHIVE_INTERVAL', '3600'))
+
+FIELDS = ('id', 'changed_by_id', 'change_type', 'field_name', 'old_value', 'new_value', 'created_at')
+
+
+@dataclass
+class ArchivedHistory:
+    """An archived history entry, shaped like ``models.IssueHistory`` for the timeline."""
+    id: int
+    issue_id: int
+    changed_by_id: Optional[int]
+    change_type: str
+    field_name: Optional[str]
+    old_value: Optional[str]
+    new_value: Optional[str]
+    created_at: datetime
+    changed_by: Optional[models.User] = None
+
+
+def _utc(value: datetime) -> datetime:
+    # SQLite hands back naive datetimes that were written as UTC.
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def month_start(value: datetime) -> datetime:
+    return _utc(value).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def cutoff(retention_days: int, now: Optional[datetime] = None) -> datetime:
+    """Rows created before this are archived; only whole months are, so a bucket never changes once written."""
+    return month_start((now or datetime.now(timezone.utc)) - timedelta(days=retention_days))
+
+
+def encode(entries: List[dict]) -> bytes:
+    # Column-wise, so repeated change types and field names sit next to each other for zlib.
+    columns = {field: [entry[field] for entry in entries] for field in FIELDS}
+    columns['created_at'] = [value.isoformat() for value in columns['created_at']]
+    return zlib.compress(json.dumps(columns, separators=(',', ':')).encode('utf-8'), 6)
+
+
+def decode(payload: bytes) -> List[dict]:
+    columns = json.loads(zlib.decompress(payload))
+    columns['created_at'] = [datetime.fromisoformat(value) for value in columns['created_at']]
+    return [dict(zip(FIELDS, values)) for values in zip(*(columns[field] for field in FIELDS))]
+
+
+def archive_batch(db: Session, before: datetime, batch_size: int, from_issue_id: int = 0) -> Tuple[int, int]:
+    """Move up to ``batch_size`` history rows older than ``before`` into the archive.
+
+    Only issues from ``from_issue_id`` on are read, so a pass resumes where
+    its previous batch stopped instead of rescanning issues it has finished.
+    Returns the rows moved and the issue id to resume from.
+    """
+    history = models.IssueHistory
+    # (issue_id, created_at) order follows idx_history_issue_created and keeps
+    # each issue's month together, so a bucket is split only at batch edges.
+    rows = db.execute(
+        select(*[getattr(history, field) for field in FIELDS], history.issue_id)
+        .where(history.issue_id >= from_issue_id, history.created_at < before)
+        .order_by(history.issue_id, history.created_at, history.id)
+        .limit(batch_size)
+    ).all()
+    if not rows:
+        return 0, from_issue_id
+
+    buckets: Dict[Tuple[int, datetime], List[dict]] = defaultdict(list)
+    for row in rows:
+        buckets[(row.issue_id, month_start(row.created_at))].append({field: getattr(row, field) for field in FIELDS})
+
+    archive = models.IssueHistoryArchive
+    existing = {
+        (bucket.issue_id, _utc(bucket.period_start)): bucket
+        for bucket in db.query(archive).filter(
+            tuple_(archive.issue_id, archive.period_start).in_(list(buckets))
+        )
+    }
+    for (issue_id, period_start), entries in buckets.items():
+        bucket = existing.get((issue_id, period_start))
+        if bucket is not None:
+            # The previous batch ended inside this issue's month.
+            entries = decode(bucket.payload) + entries
+        else:
+            bucket = archive(issue_id=issue_id, period_start=period_start)
+            db.add(bucket)
+        bucket.payload = encode(entries)
+        bucket.entry_count = len(entries)
+        bucket.first_history_id = min(entry['id'] for entry in entries)
+        bucket.last_history_id = max(entry['id'] for entry in entries)
+
+    db.execute(delete(history).where(history.id.in_([row.id for row in rows])))
+    # The last issue may have more old rows; its moved ones are gone, so >= is safe.
+    return len(rows), rows[-1].issue_id
+
+
+def compact(
+    session_factory=SessionLocal,
+    retention_days: int = HISTORY_RETENTION_DAYS,
+    batch_size: int = HISTORY_ARCHIVE_BATCH_SIZE,
+    max_rows: int = HISTORY_ARCHIVE_MAX_ROWS,
+    pause_seconds: float = HISTORY_ARCHIVE_PAUSE_SECONDS,
+    now: Optional[datetime] = None,
+) -> dict:
+    """Archive history older than the retention window, one committed batch at a time, within ``max_rows``."""
+    started = time.perf_counter()
+    before = cutoff(retention_days, now)
+    archived = batches = position = 0
+    while archived < max_rows:
+        db = session_factory()
+        try:
+            moved, position = archive_batch(db, before, min(batch_size, max_rows - archived), position)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        if not moved:
+            break
+        archived += moved
+        batches += 1
+        if archived < max_rows and pause_seconds:
+            time.sleep(pause_seconds)
+    return {
+        'cutoff': before.isoformat(),
+        'archived_rows': archived,
+        'batches': batches,
+        'budget_exhausted': archived >= max_rows,
+        'elapsed_seconds': round(time.perf_counter() - started, 3),
+    }
+
+
+def archived_rows(db: Session, issue_ids: Iterable[int]) -> Dict[int, List[dict]]:
+    """Decoded archive entries per issue, oldest first."""
+    archive = models.IssueHistoryArchive
+    query = db.query(archive.issue_id, archive.payload).filter(archive.issue_id.in_(list(issue_ids)))
+    entries = defaultdict(list)
+    for issue_id, payload in query.order_by(archive.issue_id, archive.period_start):
+        entries[issue_id].extend(decode(payload))
+    return entries
+
+
+def archived_through(db: Session) -> int:
+    """The highest history id that has been moved to the archive, or 0."""
+    return db.query(func.max(models.IssueHistoryArchive.last_history_id)).scalar() or 0
+
+
+def _key(entry) -> Tuple[datetime, int]:
+    return _utc(entry.created_at), entry.id
+
+
+def timeline(
+    db: Session,
+    issue_id: int,
+    change_type: Optional[str] = None,
+    field_name: Optional[str] = None,
+    before: Optional[Tuple[datetime, int]] = None,
+    limit: Optional[int] = None,
+) -> List[ArchivedHistory]:
+    """Archived entries of one issue, newest first, filtered like the timeline and after a keyset position.
+
+    An issue's oldest rows are archived first, so these all come after its
+    live rows. Months are decompressed newest first, only until ``limit``
+    entries are found.
+    """
+    archive = models.IssueHistoryArchive
+    buckets = db.query(archive.id).filter(archive.issue_id == issue_id)
+    if before is not None:
+        buckets = buckets.filter(archive.period_start <= before[0])
+    position = (_utc(before[0]), before[1]) if before is not None else None
+
+    entries = []
+    for (bucket_id,) in buckets.order_by(archive.period_start.desc()).all():
+        payload = db.query(archive.payload).filter(archive.id == bucket_id).scalar()
+        month = [
+            ArchivedHistory(issue_id=issue_id, **row)
+            for row in decode(payload)
+            if (change_type is None or row['change_type'] == change_type)
+            and (field_name is None or row['field_name'] == field_name)
+        ]
+        if position is not None:
+            month = [entry for entry in month if _key(entry) < position]
+        entries.extend(sorted(month, key=_key, reverse=True))
+        if limit is not None and len(entries) >= limit:
+            entries = entries[:limit]
+            break
+
+    user_ids = {entry.changed_by_id for entry in entries if entry.changed_by_id is not None}
+    users = {user.id: user for user in db.query(models.User).filter(models.User.id.in_(user_ids))} if user_ids else {}
+    for entry in entries:
+        entry.changed_by = users.get(entry.changed_by_id)
+    return entries
+
+
+class ArchiveJob:
+    def __init__(self, session_factory=SessionLocal, interval: int = HISTORY_ARCHIVE_INTERVAL, retention_days: int = HISTORY_RETENTION_DAYS):
+        self.session_factory = session_factory
+        self.interval = interval
+        self.retention_days = retention_days
+        self._stop = threading.Event()
+        self._thread = None
+
+    def run_once(self):
+        try:
+            result = compact(self.session_factory, self.retention_days)
+            if result['archived_rows']:
+                logger.info('Archived issue history: %s', result)
+        except Exception:
+            logger.exception('Issue history archiving failed')
+
+    def _loop(self):
+        # First pass at startup, off the request path; then every ``interval``.
+        while True:
+            self.run_once()
+            if self._stop.wait(self.interval):
+                break
+
+    def start(self):
+        if self.retention_days <= 0 or self.interval <= 0 or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._loop, name='history-archive', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+
+archive_job = ArchiveJob()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Move issue history older than the retention window into the archive.')
+    parser.add_argument('--retention-days', type=int, default=HISTORY_RETENTION_DAYS or 365)
+    parser.add_argument('--batch-size', type=int, default=HISTORY_ARCHIVE_BATCH_SIZE)
+    parser.add_argument('--max-rows', type=int, default=HISTORY_ARCHIVE_MAX_ROWS)
+    parser.add_argument('--pause', type=float, default=HISTORY_ARCHIVE_PAUSE_SECONDS)
+    args = parser.parse_args()
+    result = compact(SessionLocal, args.retention_days, args.batch_size, args.max_rows, args.pause)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,208 @@
+import contextlib
+import csv
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import BinaryIO, Optional
+
+from sqlalchemy import func, or_, update
+from sqlalchemy.orm import Session
+
+import models
+from csv_import import CSVImporter
+from database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+IMPORT_JOB_DIR = os.environ.get('IMPORT_JOB_DIR', os.path.join(tempfile.gettempdir(), 'issue_tracker_imports'))
+IMPORT_JOB_WORKERS = int(os.environ.get('IMPORT_JOB_WORKERS', '2'))
+# A running job whose heartbeat is older than this belonged to a worker that died.
+IMPORT_JOB_STALE_SECONDS = int(os.environ.get('IMPORT_JOB_STALE_SECONDS', '300'))
+
+
+class ImportInterrupted(Exception):
+    pass
+
+
+def count_rows(path: str) -> int:
+    with open(path, newline='', encoding='utf-8') as f:
+        return sum(1 for _ in csv.DictReader(f))
+
+
+def create_job(db: Session, upload: BinaryIO, filename: Optional[str], created_by_id: int, chunk_size: int) -> models.ImportJob:
+    os.makedirs(IMPORT_JOB_DIR, exist_ok=True)
+    job_id = uuid.uuid4().hex
+    path = os.path.join(IMPORT_JOB_DIR, f'{job_id}.csv')
+    with open(path, 'wb') as out:
+        shutil.copyfileobj(upload, out, 1024 * 1024)
+
+    try:
+        total_rows = count_rows(path)
+    except UnicodeDecodeError:
+        os.remove(path)
+        raise
+
+    job = models.ImportJob(
+        id=job_id,
+        status='queued',
+        filename=filename,
+        file_path=path,
+        created_by_id=created_by_id,
+        chunk_size=chunk_size,
+        total_rows=total_rows,
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def job_status(job: models.ImportJob) -> dict:
+    eta_seconds = None
+    if job.status == 'running' and job.started_at and job.rows_processed:
+        started_at = job.started_at
+        if started_at.tzinfo is None:
+            started_at = started_at.replace(tzinfo=timezone.utc)
+        elapsed = (datetime.now(timezone.utc) - started_at).total_seconds()
+        remaining = max(job.total_rows - job.rows_processed, 0)
+        eta_seconds = round(elapsed / job.rows_processed * remaining, 1)
+
+    return {
+        'id': job.id,
+        'status': job.status,
+        'filename': job.filename,
+        'total_rows': job.total_rows,
+        'rows_processed': job.rows_processed,
+        'successful': job.successful,
+        'failed': job.failed,
+        'errors': json.loads(job.errors) if job.errors else [],
+        'error_message': job.error_message,
+        'eta_seconds': eta_seconds,
+        'created_at': job.created_at,
+        'started_at': job.started_at,
+        'finished_at': job.finished_at,
+    }
+
+
+class ImportJobRunner:
+    """Runs import jobs on a thread pool; job rows in the database are the queue."""
+
+    def __init__(self, session_factory=SessionLocal, workers: int = IMPORT_JOB_WORKERS):
+        self.session_factory = session_factory
+        self.workers = workers
+        self._executor = None
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+
+    def submit(self, job_id: str):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='import-job')
+            self._executor.submit(self.run_job, job_id)
+
+    def resume_pending(self):
+        db = self.session_factory()
+        try:
+            stale_before = datetime.now(timezone.utc) - timedelta(seconds=IMPORT_JOB_STALE_SECONDS)
+            db.execute(
+                update(models.ImportJob)
+                .where(
+                    models.ImportJob.status == 'running',
+                    or_(models.ImportJob.heartbeat_at.is_(None), models.ImportJob.heartbeat_at < stale_before),
+                )
+                .values(status='queued')
+            )
+            db.commit()
+            job_ids = [
+                job_id for (job_id,) in db.query(models.ImportJob.id)
+                .filter(models.ImportJob.status == 'queued')
+                .order_by(models.ImportJob.created_at)
+            ]
+        finally:
+            db.close()
+
+        for job_id in job_ids:
+            logger.info('Resuming import job %s', job_id)
+            self.submit(job_id)
+
+    def shutdown(self):
+        self._stopping.set()
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True, cancel_futures=True)
+                self._executor = None
+
+    def _claim(self, db: Session, job_id: str) -> Optional[models.ImportJob]:
+        now = datetime.now(timezone.utc)
+        claimed = db.execute(
+            update(models.ImportJob)
+            .where(models.ImportJob.id == job_id, models.ImportJob.status == 'queued')
+            .values(
+                status='running',
+                heartbeat_at=now,
+                started_at=func.coalesce(models.ImportJob.started_at, now),
+            )
+        ).rowcount
+        db.commit()
+        return db.get(models.ImportJob, job_id) if claimed else None
+
+    def _record_progress(self, job: models.ImportJob, importer: CSVImporter):
+        job.rows_processed = importer.total_rows
+        job.successful = importer.successful
+        job.failed = importer.failed
+        job.errors = json.dumps(importer.errors)
+        job.heartbeat_at = datetime.now(timezone.utc)
+
+    def run_job(self, job_id: str):
+        db = self.session_factory()
+        job = None
+        try:
+            job = self._claim(db, job_id)
+            if job is None:
+                return
+
+            importer = CSVImporter(db, creator_id=job.created_by_id, chunk_size=job.chunk_size)
+            importer.total_rows = job.rows_processed
+            importer.successful = job.successful
+            importer.failed = job.failed
+            importer.errors = json.loads(job.errors) if job.errors else []
+
+            def on_chunk(progress: CSVImporter):
+                if self._stopping.is_set():
+                    raise ImportInterrupted()
+                self._record_progress(job, progress)
+
+            with open(job.file_path, 'rb') as stream:
+                importer.run(stream, skip_rows=job.rows_processed, commit_each_chunk=True, on_chunk=on_chunk)
+
+            self._record_progress(job, importer)
+            job.status = 'completed'
+            job.finished_at = datetime.now(timezone.utc)
+            db.commit()
+            os.remove(job.file_path)
+        except ImportInterrupted:
+            db.rollback()
+            job.status = 'queued'
+            db.commit()
+        except Exception as e:
+            logger.exception('Import job %s failed', job_id)
+            db.rollback()
+            if job is not None:
+                job.status = 'failed'
+                job.error_message = str(e)
+                job.finished_at = datetime.now(timezone.utc)
+                db.commit()
+                # A failed job is not retried, so its upload is never read again.
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(job.file_path)
+        finally:
+            db.close()
+
+
+job_runner = ImportJobRunner()
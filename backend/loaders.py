@@ -0,0 +1,81 @@
+from typing import Iterable, List, Optional, Tuple
+
+from sqlalchemy import func
+
+from sqlalchemy.orm import Query, Session, joinedload, selectinload
+
+import models
+import pagination
+
+
+# Many-to-one users are joined into the main SELECT; the labels collection is
+# fetched with one extra IN query per page, so a page costs two statements
+# whatever its size.
+def issue_load_options():
+    return (
+        joinedload(models.Issue.creator),
+        joinedload(models.Issue.assignee),
+        selectinload(models.Issue.labels),
+    )
+
+
+def issue_detail_load_options():
+    return issue_load_options() + (
+        selectinload(models.Issue.comments).joinedload(models.Comment.author),
+    )
+
+
+def issue_query(db: Session) -> Query:
+    return db.query(models.Issue).options(*issue_load_options())
+
+
+def get_issue(db: Session, issue_id: int) -> Optional[models.Issue]:
+    return issue_query(db).filter(models.Issue.id == issue_id).first()
+
+
+def get_issue_detail(db: Session, issue_id: int) -> Optional[models.Issue]:
+    return (
+        db.query(models.Issue)
+        .options(*issue_detail_load_options())
+        .filter(models.Issue.id == issue_id)
+        .first()
+    )
+
+
+def load_issues(db: Session, issue_ids: Iterable[int]) -> List[models.Issue]:
+    issue_ids = list(issue_ids)
+    if not issue_ids:
+        return []
+    issues = issue_query(db).filter(models.Issue.id.in_(issue_ids)).all()
+    by_id = {issue.id: issue for issue in issues}
+    return [by_id[issue_id] for issue_id in issue_ids if issue_id in by_id]
+
+
+def recent_issues(db: Session, limit: int = 5) -> List[models.Issue]:
+    return issue_query(db).order_by(models.Issue.created_at.desc()).limit(limit).all()
+
+
+def history_query(db: Session, issue_id: int) -> Query:
+    return (
+        db.query(models.IssueHistory)
+        .options(joinedload(models.IssueHistory.changed_by))
+        .filter(models.IssueHistory.issue_id == issue_id)
+    )
+
+
+def comment_query(db: Session, issue_id: int) -> Query:
+    return (
+        db.query(models.Comment)
+        .options(joinedload(models.Comment.author))
+        .filter(models.Comment.issue_id == issue_id)
+    )
+
+
+def comment_preview(db: Session, issue_id: int, limit: int) -> Tuple[List[models.Comment], Optional[str], int]:
+    """The first ``limit`` comments of an issue, the cursor after them and the total count."""
+    comments, next_cursor = pagination.keyset_page(
+        comment_query(db, issue_id), models.Comment.created_at, models.Comment.id,
+        None, limit, descending=False,
+    )
+    total = db.query(func.count(models.Comment.id)).filter(models.Comment.issue_id == issue_id).scalar()
+    return comments, next_cursor, total
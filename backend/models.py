@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Table, Index
+from sqlalchemy import Column, Integer, BigInteger, String, Text, DateTime, ForeignKey, Table, Index, LargeBinary, UniqueConstraint
 from sqlalchemy.orm import relationship
 from datetime import datetime, timezone
 from database import Base
@@ -60,6 +60,8 @@ class Issue(Base):
     __table_args__ = (
         Index('idx_status_priority', 'status', 'priority'),
         Index('idx_assignee_status', 'assignee_id', 'status'),
+        Index('idx_resolved_at', 'resolved_at'),
+        Index('idx_assignee_resolved_at', 'assignee_id', 'resolved_at'),
     )
 
 class Comment(Base):
@@ -75,6 +77,10 @@ class Comment(Base):
     issue = relationship('Issue', back_populates='comments')
     author = relationship('User', back_populates='comments')
 
+    __table_args__ = (
+        Index('idx_comments_issue_created', 'issue_id', 'created_at'),
+    )
+
 class IssueHistory(Base):
     __tablename__ = 'issue_history'
     
@@ -86,6 +92,58 @@ class IssueHistory(Base):
     old_value = Column(Text)
     new_value = Column(Text)
     created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), index=True)
+    # Writing transaction's id on Postgres (default installed by sync.install), 0 elsewhere.
+    txid = Column(BigInteger, nullable=False, server_default='0')
     
     issue = relationship('Issue', back_populates='history')
-    changed_by = relationship('User')
\ No newline at end of file
+    changed_by = relationship('User')
+
+    __table_args__ = (
+        Index('idx_history_issue_created', 'issue_id', 'created_at'),
+        Index('idx_history_txid_id', 'txid', 'id'),
+    )
+
+class IssueHistoryArchive(Base):
+    # One issue's history for one calendar month, compacted by history_archive.
+    __tablename__ = 'issue_history_archive'
+    
+    id = Column(Integer, primary_key=True)
+    issue_id = Column(Integer, ForeignKey('issues.id', ondelete='CASCADE'), nullable=False)
+    period_start = Column(DateTime(timezone=True), nullable=False)
+    first_history_id = Column(Integer, nullable=False)
+    last_history_id = Column(Integer, nullable=False, index=True)
+    entry_count = Column(Integer, nullable=False)
+    payload = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+
+    __table_args__ = (
+        UniqueConstraint('issue_id', 'period_start', name='uq_history_archive_issue_period'),
+    )
+
+class ImportJob(Base):
+    __tablename__ = 'import_jobs'
+    
+    id = Column(String(36), primary_key=True)
+    status = Column(String(20), nullable=False, default='queued', index=True)
+    filename = Column(String(255))
+    file_path = Column(String(1024), nullable=False)
+    created_by_id = Column(Integer, ForeignKey('users.id', ondelete='SET NULL'))
+    chunk_size = Column(Integer, nullable=False)
+    total_rows = Column(Integer, nullable=False, default=0)
+    rows_processed = Column(Integer, nullable=False, default=0)
+    successful = Column(Integer, nullable=False, default=0)
+    failed = Column(Integer, nullable=False, default=0)
+    errors = Column(Text)
+    error_message = Column(Text)
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    heartbeat_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+
+class IssueCounter(Base):
+    __tablename__ = 'issue_counters'
+    
+    dimension = Column(String(20), primary_key=True)
+    value = Column(String(50), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,59 @@
+import base64
+import json
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Query
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    payload = json.dumps([created_at.isoformat(), row_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (TypeError, ValueError) as e:
+        raise ValueError('Invalid cursor') from e
+
+
+def keyset_page(
+    query: Query,
+    created_column,
+    id_column,
+    cursor: Optional[str],
+    limit: int,
+    descending: bool = True,
+) -> Tuple[List, Optional[str]]:
+    """Return one page of ``query`` ordered by (created_at, id) and the cursor of the next page."""
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        # The leading range predicate on created_at lets the planner use the
+        # created_at index; the OR only breaks ties inside one timestamp.
+        if descending:
+            query = query.filter(and_(
+                created_column <= created_at,
+                or_(created_column < created_at, id_column < row_id),
+            ))
+        else:
+            query = query.filter(and_(
+                created_column >= created_at,
+                or_(created_column > created_at, id_column > row_id),
+            ))
+
+    if descending:
+        query = query.order_by(created_column.desc(), id_column.desc())
+    else:
+        query = query.order_by(created_column.asc(), id_column.asc())
+
+    rows = query.limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, created_column.key), getattr(last, id_column.key))
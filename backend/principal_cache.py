@@ -0,0 +1,187 @@
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+import models
+
+PRINCIPAL_CACHE_BACKEND = os.environ.get('PRINCIPAL_CACHE_BACKEND', 'memory')
+PRINCIPAL_CACHE_TTL = float(os.environ.get('PRINCIPAL_CACHE_TTL', '60'))
+PRINCIPAL_CACHE_SIZE = int(os.environ.get('PRINCIPAL_CACHE_SIZE', '10000'))
+PRINCIPAL_CACHE_PATH = os.environ.get(
+    'PRINCIPAL_CACHE_PATH',
+    os.path.join(tempfile.gettempdir(), 'issue_tracker_principals.db'),
+)
+
+# The password hash is never cached; it stays unloaded on cached principals.
+CACHED_COLUMNS = ('id', 'email', 'username', 'full_name', 'created_at')
+
+
+class CacheBackend(ABC):
+    @abstractmethod
+    def get(self, key: int) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    def set(self, key: int, value: dict):
+        ...
+
+    @abstractmethod
+    def delete(self, key: int):
+        ...
+
+    @abstractmethod
+    def clear(self):
+        ...
+
+
+class MemoryBackend(CacheBackend):
+    def __init__(self, ttl: float = PRINCIPAL_CACHE_TTL, max_size: int = PRINCIPAL_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteBackend(CacheBackend):
+    """Host-local store shared by every worker process pointed at the same file."""
+
+    def __init__(self, path: str = PRINCIPAL_CACHE_PATH, ttl: float = PRINCIPAL_CACHE_TTL, max_size: int = PRINCIPAL_CACHE_SIZE):
+        self.path = path
+        self.ttl = ttl
+        self.max_size = max_size
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS principals '
+                '(user_id INTEGER PRIMARY KEY, payload TEXT NOT NULL, expires_at REAL NOT NULL)'
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=1.0)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        row = self._connect().execute(
+            'SELECT payload FROM principals WHERE user_id = ? AND expires_at >= ?',
+            (key, time.time()),
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key, value):
+        with self._connect() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO principals (user_id, payload, expires_at) VALUES (?, ?, ?)',
+                (key, json.dumps(value), time.time() + self.ttl),
+            )
+            conn.execute(
+                'DELETE FROM principals WHERE user_id IN ('
+                'SELECT user_id FROM principals ORDER BY expires_at DESC LIMIT -1 OFFSET ?)',
+                (self.max_size,),
+            )
+
+    def delete(self, key):
+        with self._connect() as conn:
+            conn.execute('DELETE FROM principals WHERE user_id = ?', (key,))
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute('DELETE FROM principals')
+
+
+class PrincipalCache:
+    def __init__(self, backend: Optional[CacheBackend]):
+        self.backend = backend
+
+    def get(self, user_id: int) -> Optional[dict]:
+        if self.backend is None:
+            return None
+        value = self.backend.get(user_id)
+        if value is not None and value.get('created_at'):
+            value = {**value, 'created_at': datetime.fromisoformat(value['created_at'])}
+        return value
+
+    def put(self, user: models.User):
+        if self.backend is None:
+            return
+        value = {column: getattr(user, column) for column in CACHED_COLUMNS}
+        if value['created_at'] is not None:
+            value['created_at'] = value['created_at'].isoformat()
+        self.backend.set(user.id, value)
+
+    def invalidate(self, user_id: int):
+        if self.backend is not None:
+            self.backend.delete(user_id)
+
+
+def build_backend(name: str = PRINCIPAL_CACHE_BACKEND) -> Optional[CacheBackend]:
+    if name == 'memory':
+        return MemoryBackend()
+    if name == 'sqlite':
+        return SQLiteBackend()
+    if name == 'none':
+        return None
+    raise ValueError(f'Unknown principal cache backend {name!r}')
+
+
+principal_cache = PrincipalCache(build_backend())
+
+
+# Changed users are dropped from the cache once their transaction commits.
+@event.listens_for(models.User, 'after_update')
+@event.listens_for(models.User, 'after_delete')
+def _mark_user_changed(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault('changed_user_ids', set()).add(target.id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_changed_users(session):
+    for user_id in session.info.pop('changed_user_ids', ()):
+        principal_cache.invalidate(user_id)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_changed_users(session):
+    session.info.pop('changed_user_ids', None)
@@ -0,0 +1,73 @@
+from functools import lru_cache
+from typing import FrozenSet, Iterable, List, Optional
+
+from pydantic import ConfigDict, create_model
+from sqlalchemy.orm import Query, Session, joinedload, load_only, raiseload, selectinload
+
+import models
+import schemas
+
+RELATIONSHIP_LOADERS = {
+    'creator': lambda: joinedload(models.Issue.creator),
+    'assignee': lambda: joinedload(models.Issue.assignee),
+    'labels': lambda: selectinload(models.Issue.labels),
+    'comments': lambda: selectinload(models.Issue.comments).joinedload(models.Comment.author),
+}
+
+LIST_FIELDS = frozenset(schemas.Issue.model_fields)
+DETAIL_FIELDS = LIST_FIELDS | {'comments'}
+
+# Always loaded, even when not returned: the key and the keyset pagination column.
+REQUIRED_COLUMNS = ('id', 'created_at')
+
+
+class InvalidFields(ValueError):
+    pass
+
+
+def parse_fields(raw: Optional[str], allowed: FrozenSet[str] = LIST_FIELDS) -> Optional[FrozenSet[str]]:
+    """Parse a comma-separated ``fields=`` value; ``None`` means the full representation."""
+    if raw is None:
+        return None
+    fields = {name.strip() for name in raw.split(',') if name.strip()}
+    unknown = fields - allowed
+    if unknown:
+        raise InvalidFields(f'Unknown fields: {", ".join(sorted(unknown))}')
+    return frozenset(fields | {'id'})
+
+
+def load_options(fields: Iterable[str]) -> list:
+    """Load only the requested columns and relationships; anything else raises instead of lazy loading."""
+    fields = set(fields)
+    columns = [
+        getattr(models.Issue, name)
+        for name in LIST_FIELDS
+        if name not in RELATIONSHIP_LOADERS and (name in fields or name in REQUIRED_COLUMNS)
+    ]
+    options = [load_only(*columns, raiseload=True)]
+    options += [loader() for name, loader in RELATIONSHIP_LOADERS.items() if name in fields]
+    options.append(raiseload('*'))
+    return options
+
+
+def issue_query(db: Session, fields: Iterable[str]) -> Query:
+    return db.query(models.Issue).options(*load_options(fields))
+
+
+@lru_cache(maxsize=128)
+def _model(fields: FrozenSet[str]) -> type:
+    source = schemas.IssueDetail.model_fields
+    return create_model(
+        'IssueFields',
+        __config__=ConfigDict(from_attributes=True),
+        **{name: (info.annotation, info) for name, info in source.items() if name in fields},
+    )
+
+
+def serialize(issue: models.Issue, fields: FrozenSet[str]) -> dict:
+    return _model(fields).model_validate(issue).model_dump(mode='json')
+
+
+def serialize_many(issues: Iterable[models.Issue], fields: FrozenSet[str]) -> List[dict]:
+    model = _model(fields)
+    return [model.model_validate(issue).model_dump(mode='json') for issue in issues]
@@ -0,0 +1,274 @@
+"""Vectorized report engine.
+
+Usage: python report_engine.py [--rounds N]   (benchmark against reports.py)
+
+One refresh reads a few narrow issue columns into numpy arrays and computes
+every summary metric from them: counts, resolution averages and percentiles,
+per-assignee breakdowns and weekly buckets. Summaries are cached for
+``REPORT_REFRESH_SECONDS``; while one thread refreshes, others get the
+previous summary.
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+from sqlalchemy import case, func, select
+from sqlalchemy.orm import Session
+
+import models
+import schemas
+from database import SessionLocal
+from reports import PRIORITIES, STATUSES
+
+REPORT_REFRESH_SECONDS = float(os.environ.get('REPORT_REFRESH_SECONDS', '300'))
+REPORT_WEEKS = int(os.environ.get('REPORT_WEEKS', '12'))
+REPORT_TOP_ASSIGNEES = 10
+REPORT_CHUNK_SIZE = 50000
+
+PERCENTILES = {'median': 50, 'p90': 90, 'p95': 95}
+HOUR = 3600.0
+
+
+def _epoch(value: Optional[datetime]) -> float:
+    if value is None:
+        return np.nan
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def epoch_seconds(db: Session, column):
+    # Converted in SQL: parsing datetimes row by row would dominate a refresh.
+    if db.get_bind().dialect.name == 'postgresql':
+        return func.extract('epoch', column)
+    return (func.julianday(column) - 2440587.5) * 86400.0
+
+
+class IssueColumns:
+    """Issue attributes as parallel arrays; categories are stored as codes."""
+
+    def __init__(self, status, priority, assignee_id, created_at, resolved_at):
+        self.status = status
+        self.priority = priority
+        self.assignee_id = assignee_id
+        self.created_at = created_at
+        self.resolved_at = resolved_at
+
+    def __len__(self):
+        return len(self.status)
+
+    @classmethod
+    def load(cls, db: Session, chunk_size: int = REPORT_CHUNK_SIZE) -> 'IssueColumns':
+        # Every column is numeric by the time it leaves the database, so each
+        # chunk converts to one float matrix; unknown categories become -1.
+        # Rows are turned into plain tuples first: numpy reads Row objects
+        # element by element, which is several times slower.
+        query = select(
+            _codes(models.Issue.status, STATUSES),
+            _codes(models.Issue.priority, PRIORITIES),
+            func.coalesce(models.Issue.assignee_id, -1),
+            epoch_seconds(db, models.Issue.created_at),
+            epoch_seconds(db, models.Issue.resolved_at),
+        )
+        result = db.connection().execution_options(yield_per=chunk_size).execute(query)
+        chunks = [np.array(list(map(tuple, chunk)), dtype=np.float64) for chunk in result.partitions()]
+        matrix = np.concatenate(chunks) if chunks else np.zeros((0, 5), dtype=np.float64)
+        return cls(
+            status=matrix[:, 0].astype(np.int8),
+            priority=matrix[:, 1].astype(np.int8),
+            assignee_id=matrix[:, 2].astype(np.int64),
+            created_at=matrix[:, 3],
+            resolved_at=matrix[:, 4],
+        )
+
+
+def _codes(column, names: List[str]):
+    return case({name: code for code, name in enumerate(names)}, value=column, else_=-1)
+
+
+def _category_counts(codes: np.ndarray, names: List[str]) -> Dict[str, int]:
+    counts = np.bincount(codes[codes >= 0], minlength=len(names))
+    return {name: int(count) for name, count in zip(names, counts)}
+
+
+def resolution_metrics(columns: IssueColumns) -> dict:
+    resolved = ~np.isnan(columns.resolved_at)
+    hours = (columns.resolved_at[resolved] - columns.created_at[resolved]) / HOUR
+    if not len(hours):
+        return {
+            'total_resolved': 0,
+            'average_resolution_hours': 0,
+            **{f'{name}_resolution_hours': 0 for name in PERCENTILES},
+            'by_priority': {},
+        }
+
+    # Linear interpolation, the same definition as Postgres percentile_cont.
+    percentiles = np.percentile(hours, list(PERCENTILES.values()))
+    priority = columns.priority[resolved]
+    known = priority >= 0
+    sums = np.bincount(priority[known], weights=hours[known], minlength=len(PRIORITIES))
+    counts = np.bincount(priority[known], minlength=len(PRIORITIES))
+    averages = np.divide(sums, counts, out=np.zeros_like(sums), where=counts > 0)
+    return {
+        'total_resolved': int(len(hours)),
+        'average_resolution_hours': round(float(hours.mean()), 2),
+        **{
+            f'{name}_resolution_hours': round(float(value), 2)
+            for name, value in zip(PERCENTILES, percentiles)
+        },
+        'by_priority': {name: round(float(value), 2) for name, value in zip(PRIORITIES, averages)},
+    }
+
+
+def assignee_breakdown(columns: IssueColumns, limit: int = REPORT_TOP_ASSIGNEES) -> List[dict]:
+    assigned = columns.assignee_id >= 0
+    assignee_ids, index = np.unique(columns.assignee_id[assigned], return_inverse=True)
+    if not len(assignee_ids):
+        return []
+    totals = np.bincount(index, minlength=len(assignee_ids))
+
+    status = columns.status[assigned]
+    known = status >= 0
+    by_status = np.zeros((len(assignee_ids), len(STATUSES)), dtype=np.int64)
+    np.add.at(by_status, (index[known], status[known]), 1)
+
+    # Most issues first, ties broken by the lower assignee id, as in reports.top_assignees.
+    order = np.lexsort((assignee_ids, -totals))[:limit]
+    return [
+        {
+            'assignee_id': int(assignee_ids[i]),
+            'issue_count': int(totals[i]),
+            'by_status': {name: int(count) for name, count in zip(STATUSES, by_status[i])},
+        }
+        for i in order
+    ]
+
+
+def weekly_buckets(columns: IssueColumns, now: datetime, weeks: int = REPORT_WEEKS) -> List[dict]:
+    """Issues created and resolved per ISO week (Monday start, UTC), oldest first."""
+    day = 86400.0
+    # 1970-01-01 was a Thursday; shifting by three days puts week boundaries on Mondays.
+    current_week = int((_epoch(now) // day + 3) // 7)
+    first_week = current_week - weeks + 1
+
+    def counts(timestamps):
+        present = timestamps[~np.isnan(timestamps)]
+        week = (np.floor(present / day).astype(np.int64) + 3) // 7 - first_week
+        week = week[(week >= 0) & (week < weeks)]
+        return np.bincount(week, minlength=weeks)
+
+    created = counts(columns.created_at)
+    resolved = counts(columns.resolved_at)
+    epoch = datetime(1970, 1, 1, tzinfo=timezone.utc)
+    return [
+        {
+            'week_start': (epoch + timedelta(days=(first_week + i) * 7 - 3)).date().isoformat(),
+            'created': int(created[i]),
+            'resolved': int(resolved[i]),
+        }
+        for i in range(weeks)
+    ]
+
+
+def build_summary(db: Session, now: Optional[datetime] = None) -> dict:
+    started = time.perf_counter()
+    now = now or datetime.now(timezone.utc)
+    columns = IssueColumns.load(db)
+
+    top = assignee_breakdown(columns)
+    users = {
+        user.id: schemas.User.model_validate(user).model_dump()
+        for user in db.query(models.User).filter(models.User.id.in_([row['assignee_id'] for row in top]))
+    } if top else {}
+    for row in top:
+        row['assignee'] = users.get(row.pop('assignee_id'))
+
+    return {
+        'generated_at': now.isoformat(),
+        'total_issues': len(columns),
+        'by_status': _category_counts(columns.status, STATUSES),
+        'by_priority': _category_counts(columns.priority, PRIORITIES),
+        'resolution': resolution_metrics(columns),
+        'top_assignees': top,
+        'weekly': weekly_buckets(columns, now),
+        'refresh_ms': round((time.perf_counter() - started) * 1000, 2),
+    }
+
+
+class ReportEngine:
+    def __init__(self, session_factory: Callable[[], Session] = SessionLocal, refresh_seconds: float = REPORT_REFRESH_SECONDS):
+        self.session_factory = session_factory
+        self.refresh_seconds = refresh_seconds
+        self._summary = None
+        self._expires = 0.0
+        self._lock = threading.Lock()
+
+    def summary(self) -> dict:
+        if self._summary is not None and time.monotonic() < self._expires:
+            return self._summary
+        if not self._lock.acquire(blocking=self._summary is None):
+            return self._summary
+        try:
+            if self._summary is None or time.monotonic() >= self._expires:
+                self.refresh()
+            return self._summary
+        finally:
+            self._lock.release()
+
+    def refresh(self) -> dict:
+        db = self.session_factory()
+        try:
+            self._summary = build_summary(db)
+        finally:
+            db.close()
+        self._expires = time.monotonic() + self.refresh_seconds
+        return self._summary
+
+
+report_engine = ReportEngine()
+
+
+def benchmark(rounds: int = 5) -> dict:
+    """Time one engine refresh against the per-endpoint queries it replaces."""
+    import counters
+    import reports
+
+    def timed(fn):
+        samples = []
+        for _ in range(rounds):
+            db = SessionLocal()
+            try:
+                started = time.perf_counter()
+                fn(db)
+                samples.append((time.perf_counter() - started) * 1000)
+            finally:
+                db.close()
+        return round(float(np.median(samples)), 2)
+
+    def per_endpoint(db):
+        reports.report_cache.invalidate()
+        reports.resolution_stats(db)
+        reports.top_assignees(db)
+        counters.read(db)
+
+    return {
+        'rounds': rounds,
+        'engine_refresh_ms': timed(build_summary),
+        'per_endpoint_ms': timed(per_endpoint),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the vectorized report engine.')
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps(benchmark(args.rounds), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,203 @@
+import math
+import os
+import threading
+import time
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import case, event, exists, func, select
+from sqlalchemy.orm import Session
+
+import models
+import schemas
+
+REPORT_CACHE_TTL = float(os.environ.get('REPORT_CACHE_TTL', '60'))
+
+PRIORITIES = ['low', 'medium', 'high', 'critical']
+STATUSES = ['open', 'in_progress', 'resolved', 'closed']
+PERCENTILES = {'median': 0.5, 'p90': 0.9, 'p95': 0.95}
+ISSUE_TABLES = {'issues', 'issue_labels'}
+
+
+class ReportCache:
+    def __init__(self, ttl: float = REPORT_CACHE_TTL):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                return None
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+
+
+report_cache = ReportCache()
+
+
+# Any committed write to issues or their labels drops cached reports, whether
+# it went through the ORM unit of work or a set-based statement.
+@event.listens_for(Session, 'after_flush')
+def _track_issue_flush(session, flush_context):
+    for instance in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(instance, models.Issue):
+            session.info['issues_changed'] = True
+            return
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _track_issue_statements(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        table = getattr(orm_execute_state.statement, 'table', None)
+        if getattr(table, 'name', None) in ISSUE_TABLES:
+            orm_execute_state.session.info['issues_changed'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_on_commit(session):
+    if session.info.pop('issues_changed', False):
+        report_cache.invalidate()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_on_rollback(session):
+    session.info.pop('issues_changed', None)
+
+
+def resolution_hours(db: Session):
+    if db.get_bind().dialect.name == 'postgresql':
+        return func.extract('epoch', models.Issue.resolved_at - models.Issue.created_at) / 3600.0
+    return (func.julianday(models.Issue.resolved_at) - func.julianday(models.Issue.created_at)) * 24.0
+
+
+def _percentiles(db: Session, hours, conditions: List, total: int) -> dict:
+    if db.get_bind().dialect.name == 'postgresql':
+        row = db.execute(
+            select(*[
+                func.percentile_cont(fraction).within_group(hours).label(name)
+                for name, fraction in PERCENTILES.items()
+            ]).where(*conditions)
+        ).one()
+        return {name: float(getattr(row, name) or 0) for name in PERCENTILES}
+
+    # Interpolated like percentile_cont: read the two neighbouring rows by offset.
+    results = {}
+    for name, fraction in PERCENTILES.items():
+        position = fraction * (total - 1)
+        lower = math.floor(position)
+        values = db.execute(
+            select(hours).where(*conditions).order_by(hours).offset(lower).limit(2)
+        ).scalars().all()
+        if len(values) == 2:
+            results[name] = values[0] + (values[1] - values[0]) * (position - lower)
+        else:
+            results[name] = values[0]
+    return results
+
+
+def resolution_stats(
+    db: Session,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    assignee_id: Optional[int] = None,
+) -> dict:
+    hours = resolution_hours(db)
+    conditions = [models.Issue.resolved_at.isnot(None)]
+    if start is not None:
+        conditions.append(models.Issue.resolved_at >= start)
+    if end is not None:
+        conditions.append(models.Issue.resolved_at < end)
+    if assignee_id is not None:
+        conditions.append(models.Issue.assignee_id == assignee_id)
+
+    total, average = db.execute(select(func.count(models.Issue.id), func.avg(hours)).where(*conditions)).one()
+    if not total:
+        return {
+            'total_resolved': 0,
+            'average_resolution_hours': 0,
+            'median_resolution_hours': 0,
+            'p90_resolution_hours': 0,
+            'p95_resolution_hours': 0,
+            'by_priority': {},
+        }
+
+    by_priority = {priority: 0 for priority in PRIORITIES}
+    for priority, priority_average in db.execute(
+        select(models.Issue.priority, func.avg(hours)).where(*conditions).group_by(models.Issue.priority)
+    ):
+        if priority in by_priority:
+            by_priority[priority] = round(float(priority_average), 2)
+
+    percentiles = _percentiles(db, hours, conditions, total)
+    return {
+        'total_resolved': total,
+        'average_resolution_hours': round(float(average), 2),
+        'median_resolution_hours': round(percentiles['median'], 2),
+        'p90_resolution_hours': round(percentiles['p90'], 2),
+        'p95_resolution_hours': round(percentiles['p95'], 2),
+        'by_priority': by_priority,
+    }
+
+
+def top_assignees(
+    db: Session,
+    limit: int = 10,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    label_id: Optional[int] = None,
+) -> List[dict]:
+    key = ('top_assignees', limit, since, until, label_id)
+    cached = report_cache.get(key)
+    if cached is not None:
+        return cached
+
+    conditions = [models.Issue.assignee_id.isnot(None)]
+    if since is not None:
+        conditions.append(models.Issue.created_at >= since)
+    if until is not None:
+        conditions.append(models.Issue.created_at < until)
+    if label_id is not None:
+        link = models.issue_labels
+        conditions.append(exists().where(link.c.issue_id == models.Issue.id, link.c.label_id == label_id))
+
+    issue_count = func.count(models.Issue.id)
+    grouped = (
+        select(
+            models.Issue.assignee_id,
+            issue_count.label('issue_count'),
+            *[
+                func.sum(case((models.Issue.status == status, 1), else_=0)).label(status)
+                for status in STATUSES
+            ],
+        )
+        .where(*conditions)
+        .group_by(models.Issue.assignee_id)
+        .order_by(issue_count.desc(), models.Issue.assignee_id)
+        .limit(limit)
+        .subquery()
+    )
+    rows = db.execute(
+        select(models.User, grouped)
+        .join(grouped, grouped.c.assignee_id == models.User.id)
+        .order_by(grouped.c.issue_count.desc(), grouped.c.assignee_id)
+    ).all()
+
+    results = [
+        {
+            'assignee': schemas.User.model_validate(row.User).model_dump(),
+            'issue_count': row.issue_count,
+            'by_status': {status: getattr(row, status) or 0 for status in STATUSES},
+        }
+        for row in rows
+    ]
+    report_cache.set(key, results)
+    return results
@@ -1,6 +1,6 @@
-from pydantic import BaseModel, EmailStr, Field, field_validator
+from pydantic import BaseModel, EmailStr, Field, field_validator, model_validator
 from datetime import datetime
-from typing import Optional, List
+from typing import Optional, List, Union
 
 class UserCreate(BaseModel):
     email: EmailStr
@@ -131,6 +131,31 @@ class Issue(BaseModel):
 class IssueDetail(Issue):
     comments: List[Comment] = []
 
+class IssueDetailPreview(IssueDetail):
+    # The detail requested with ``comments_limit``: the first comments only.
+    comment_count: int
+    comments_next_cursor: Optional[str] = None
+
+class CommentPage(BaseModel):
+    items: List[Comment]
+    next_cursor: Optional[str] = None
+
+class IssuePage(BaseModel):
+    items: List[Issue]
+    next_cursor: Optional[str] = None
+
+class SyncPage(BaseModel):
+    issues: List[Issue]
+    # Issues whose history moved past the watermark but that no longer exist.
+    deleted_ids: List[int] = []
+    watermark: str
+    has_more: bool
+
+class SearchResult(BaseModel):
+    issue: Issue
+    rank: float
+    highlights: dict = {}
+
 class BulkStatusUpdate(BaseModel):
     issue_ids: List[int]
     status: str
@@ -142,6 +167,48 @@ class BulkStatusUpdate(BaseModel):
             raise ValueError(f'Status must be one of {valid_statuses}')
         return v
 
+class IssueFilter(BaseModel):
+    status: Optional[str] = None
+    priority: Optional[str] = None
+    assignee_id: Optional[int] = None
+
+class BulkOperation(BaseModel):
+    op: str
+    value: Optional[Union[int, str, List[int]]] = None
+    
+    @model_validator(mode='after')
+    def validate_value(self):
+        if self.op == 'set_status':
+            valid_statuses = ['open', 'in_progress', 'resolved', 'closed']
+            if self.value not in valid_statuses:
+                raise ValueError(f'Status must be one of {valid_statuses}')
+        elif self.op == 'set_priority':
+            valid_priorities = ['low', 'medium', 'high', 'critical']
+            if self.value not in valid_priorities:
+                raise ValueError(f'Priority must be one of {valid_priorities}')
+        elif self.op == 'assign':
+            if self.value is not None and not isinstance(self.value, int):
+                raise ValueError('assign expects a user id or null')
+        elif self.op in ('add_labels', 'remove_labels', 'set_labels'):
+            if not isinstance(self.value, list):
+                raise ValueError(f'{self.op} expects a list of label ids')
+        else:
+            raise ValueError(f'Unknown operation {self.op}')
+        return self
+
+class BulkMutation(BaseModel):
+    issue_ids: Optional[List[int]] = None
+    filter: Optional[IssueFilter] = None
+    operations: List[BulkOperation]
+    
+    @model_validator(mode='after')
+    def validate_target(self):
+        if (self.issue_ids is None) == (self.filter is None):
+            raise ValueError('Provide exactly one of issue_ids or filter')
+        if not self.operations:
+            raise ValueError('At least one operation is required')
+        return self
+
 class IssueHistoryItem(BaseModel):
     id: int
     change_type: str
@@ -154,11 +221,32 @@ class IssueHistoryItem(BaseModel):
     class Config:
         from_attributes = True
 
+class TimelinePage(BaseModel):
+    items: List[IssueHistoryItem]
+    next_cursor: Optional[str] = None
+
 class CSVImportResult(BaseModel):
     total_rows: int
     successful: int
     failed: int
     errors: List[dict]
+    elapsed_seconds: float = 0
+    rows_per_second: float = 0
+
+class ImportJob(BaseModel):
+    id: str
+    status: str
+    filename: Optional[str] = None
+    total_rows: int
+    rows_processed: int
+    successful: int
+    failed: int
+    errors: List[dict] = []
+    error_message: Optional[str] = None
+    eta_seconds: Optional[float] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
 
 class TopAssignee(BaseModel):
     assignee: Optional[User] = None
@@ -168,4 +256,14 @@ class TopAssignee(BaseModel):
 class ResolutionStats(BaseModel):
     total_resolved: int
     average_resolution_hours: float
-    by_priority: dict
\ No newline at end of file
+    median_resolution_hours: float = 0
+    p90_resolution_hours: float = 0
+    p95_resolution_hours: float = 0
+    by_priority: dict
+
+class SnapshotResult(BaseModel):
+    format: str
+    path: str
+    created_at: datetime
+    tables: dict
+    elapsed_seconds: float
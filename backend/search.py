@@ -0,0 +1,229 @@
+import logging
+import re
+from html import escape
+from typing import Dict, List, Optional
+
+from sqlalchemy import Float, Integer, bindparam, case, func, literal_column, or_, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+import models
+
+logger = logging.getLogger(__name__)
+
+HIGHLIGHT_START = '<mark>'
+HIGHLIGHT_STOP = '</mark>'
+# The databases mark matches with these private-use code points; the fragment
+# is HTML-escaped around them before they become <mark> tags, as the
+# in-process engine (search_index.highlight) does.
+MATCH_START = '\ue000'
+MATCH_STOP = '\ue001'
+
+# Postgres: expression GIN indexes, kept current by the database itself. The
+# expressions below must stay identical to the indexed ones.
+ISSUE_VECTOR_SQL = "to_tsvector('english', coalesce(title, '') || ' ' || coalesce(description, ''))"
+COMMENT_VECTOR_SQL = "to_tsvector('english', body)"
+
+POSTGRES_DDL = [
+    f'CREATE INDEX IF NOT EXISTS idx_issues_fts ON issues USING GIN ({ISSUE_VECTOR_SQL})',
+    f'CREATE INDEX IF NOT EXISTS idx_comments_fts ON comments USING GIN ({COMMENT_VECTOR_SQL})',
+]
+
+# SQLite: external-content FTS5 tables maintained by triggers.
+SQLITE_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS issues_fts USING fts5(title, description, content='issues', content_rowid='id')",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS comments_fts USING fts5(body, content='comments', content_rowid='id')",
+    """CREATE TRIGGER IF NOT EXISTS issues_fts_ai AFTER INSERT ON issues BEGIN
+        INSERT INTO issues_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS issues_fts_ad AFTER DELETE ON issues BEGIN
+        INSERT INTO issues_fts(issues_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS issues_fts_au AFTER UPDATE OF title, description ON issues BEGIN
+        INSERT INTO issues_fts(issues_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO issues_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS comments_fts_ai AFTER INSERT ON comments BEGIN
+        INSERT INTO comments_fts(rowid, body) VALUES (new.id, new.body);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS comments_fts_ad AFTER DELETE ON comments BEGIN
+        INSERT INTO comments_fts(comments_fts, rowid, body) VALUES ('delete', old.id, old.body);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS comments_fts_au AFTER UPDATE OF body ON comments BEGIN
+        INSERT INTO comments_fts(comments_fts, rowid, body) VALUES ('delete', old.id, old.body);
+        INSERT INTO comments_fts(rowid, body) VALUES (new.id, new.body);
+    END""",
+]
+
+
+class SearchUnavailable(Exception):
+    pass
+
+
+def install(engine: Engine) -> bool:
+    """Create the full-text indexes for this database; returns False if it has none."""
+    dialect = engine.dialect.name
+    with engine.begin() as conn:
+        if dialect == 'postgresql':
+            for statement in POSTGRES_DDL:
+                conn.execute(text(statement))
+            return True
+        if dialect == 'sqlite':
+            existing = conn.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'issues_fts'")).first()
+            try:
+                for statement in SQLITE_DDL:
+                    conn.execute(text(statement))
+            except Exception:
+                logger.warning('SQLite FTS5 is not available; full-text search is disabled')
+                return False
+            if existing is None:
+                conn.execute(text("INSERT INTO issues_fts(issues_fts) VALUES ('rebuild')"))
+                conn.execute(text("INSERT INTO comments_fts(comments_fts) VALUES ('rebuild')"))
+            return True
+    return False
+
+
+def _filter_conditions(filters: Optional[dict]) -> List:
+    return [
+        getattr(models.Issue, field) == value
+        for field, value in (filters or {}).items()
+        if value is not None
+    ]
+
+
+def _postgres_search(db: Session, query: str, filters: Optional[dict], skip: int, limit: int) -> List[dict]:
+    tsquery = func.websearch_to_tsquery(literal_column("'english'"), bindparam('q', query))
+    issue_vector = literal_column(ISSUE_VECTOR_SQL)
+    comment_vector = literal_column(COMMENT_VECTOR_SQL)
+
+    comment_hits = (
+        select(models.Comment.issue_id, func.max(func.ts_rank(comment_vector, tsquery)).label('rank'))
+        .where(comment_vector.op('@@')(tsquery))
+        .group_by(models.Comment.issue_id)
+        .subquery()
+    )
+    issue_match = issue_vector.op('@@')(tsquery)
+    rank = (
+        case((issue_match, func.ts_rank(issue_vector, tsquery)), else_=0)
+        + func.coalesce(comment_hits.c.rank, 0)
+    ).label('rank')
+    rows = db.execute(
+        select(models.Issue.id, rank)
+        .outerjoin(comment_hits, comment_hits.c.issue_id == models.Issue.id)
+        .where(or_(issue_match, comment_hits.c.issue_id.isnot(None)), *_filter_conditions(filters))
+        .order_by(rank.desc(), models.Issue.id.desc())
+        .offset(skip)
+        .limit(limit)
+    ).all()
+    if not rows:
+        return []
+
+    issue_ids = [row.id for row in rows]
+    options = literal_column(f"'StartSel={MATCH_START}, StopSel={MATCH_STOP}, MaxFragments=2'")
+    highlights: Dict[int, dict] = {issue_id: {} for issue_id in issue_ids}
+    for issue_id, title, description in db.execute(
+        select(
+            models.Issue.id,
+            func.ts_headline(literal_column("'english'"), models.Issue.title, tsquery, options),
+            func.ts_headline(literal_column("'english'"), func.coalesce(models.Issue.description, ''), tsquery, options),
+        ).where(models.Issue.id.in_(issue_ids), issue_match)
+    ):
+        highlights[issue_id].update(_marked(title=title, description=description))
+    for issue_id, body in db.execute(
+        select(models.Comment.issue_id, func.ts_headline(literal_column("'english'"), models.Comment.body, tsquery, options))
+        .where(models.Comment.issue_id.in_(issue_ids), comment_vector.op('@@')(tsquery))
+        .order_by(models.Comment.issue_id, func.ts_rank(comment_vector, tsquery).desc())
+        .distinct(models.Comment.issue_id)
+    ):
+        highlights[issue_id].update(_marked(comment=body))
+
+    return [{'issue_id': row.id, 'rank': float(row.rank), 'highlights': highlights[row.id]} for row in rows]
+
+
+def _fts5_query(query: str) -> str:
+    # Quote every term so user input can never be parsed as FTS5 syntax.
+    terms = re.findall(r'\w+', query)
+    return ' '.join(f'"{term}"' for term in terms)
+
+
+def _sqlite_search(db: Session, query: str, filters: Optional[dict], skip: int, limit: int) -> List[dict]:
+    if db.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'issues_fts'")).first() is None:
+        raise SearchUnavailable('Full-text index has not been installed')
+    match = _fts5_query(query)
+    if not match:
+        return []
+
+    # FTS5's hidden rank column is bm25(), where lower is better; it is negated so
+    # higher ranks are better, as on Postgres. (bm25() itself cannot be called
+    # once SQLite flattens the match into an aggregate.)
+    hits = text("""
+        SELECT issue_id, -SUM(score) AS rank FROM (
+            SELECT rowid AS issue_id, rank AS score FROM issues_fts WHERE issues_fts MATCH :q
+            UNION ALL
+            SELECT comments.issue_id, MIN(matched.score) FROM (
+                SELECT rowid AS comment_id, rank AS score FROM comments_fts WHERE comments_fts MATCH :q
+            ) AS matched
+            JOIN comments ON comments.id = matched.comment_id GROUP BY comments.issue_id
+        ) GROUP BY issue_id
+    """).columns(issue_id=Integer, rank=Float).subquery()
+    rows = db.execute(
+        select(hits.c.issue_id, hits.c.rank)
+        .join(models.Issue, models.Issue.id == hits.c.issue_id)
+        .where(*_filter_conditions(filters))
+        .order_by(hits.c.rank.desc(), hits.c.issue_id.desc())
+        .offset(skip)
+        .limit(limit),
+        {'q': match},
+    ).all()
+    if not rows:
+        return []
+
+    issue_ids = [row.issue_id for row in rows]
+    id_list = ', '.join(str(int(issue_id)) for issue_id in issue_ids)
+    highlights: Dict[int, dict] = {issue_id: {} for issue_id in issue_ids}
+    for issue_id, title, description in db.execute(text(f"""
+        SELECT rowid,
+               highlight(issues_fts, 0, '{MATCH_START}', '{MATCH_STOP}'),
+               snippet(issues_fts, 1, '{MATCH_START}', '{MATCH_STOP}', '…', 24)
+        FROM issues_fts WHERE issues_fts MATCH :q AND rowid IN ({id_list})
+    """), {'q': match}):
+        highlights[issue_id].update(_marked(title=title, description=description))
+    for issue_id, body in db.execute(text(f"""
+        SELECT comments.issue_id, matched.fragment FROM (
+            SELECT rowid AS comment_id, rank AS score,
+                   snippet(comments_fts, 0, '{MATCH_START}', '{MATCH_STOP}', '…', 24) AS fragment
+            FROM comments_fts WHERE comments_fts MATCH :q
+            AND rowid IN (SELECT id FROM comments WHERE issue_id IN ({id_list}))
+        ) AS matched
+        JOIN comments ON comments.id = matched.comment_id
+        ORDER BY matched.score
+    """), {'q': match}):
+        if 'comment' not in highlights[issue_id]:
+            highlights[issue_id].update(_marked(comment=body))
+
+    return [{'issue_id': row.issue_id, 'rank': float(row.rank), 'highlights': highlights[row.issue_id]} for row in rows]
+
+
+def _marked(**fragments) -> dict:
+    """Fragments that contain a match, HTML-escaped with the matches wrapped in <mark>."""
+    return {
+        name: escape(value).replace(MATCH_START, HIGHLIGHT_START).replace(MATCH_STOP, HIGHLIGHT_STOP)
+        for name, value in fragments.items()
+        if value and MATCH_START in value
+    }
+
+
+def search_issues(
+    db: Session,
+    query: str,
+    filters: Optional[dict] = None,
+    skip: int = 0,
+    limit: int = 20,
+) -> List[dict]:
+    """Ranked issue ids matching ``query`` in titles, descriptions or comments."""
+    dialect = db.get_bind().dialect.name
+    if dialect == 'postgresql':
+        return _postgres_search(db, query, filters, skip, limit)
+    if dialect == 'sqlite':
+        return _sqlite_search(db, query, filters, skip, limit)
+    raise SearchUnavailable(f'Full-text search is not supported on {dialect}')
@@ -0,0 +1,622 @@
+"""Pure-Python inverted index for deployments without database full-text search.
+
+Issues and comments are indexed as separate documents. The compacted index is
+stored in one file that is memory-mapped on load: doc metadata and postings are
+flat uint32 arrays read through numpy views. Writes land in an in-memory delta
+segment (plus tombstones for replaced base documents) and are folded into a
+new file by ``compact()``.
+
+The file belongs to a single process, enforced by ``<path>.lock`` holding
+the owner's pid. A lock left by a process that is gone means it crashed with
+uncompacted changes, so the index is rebuilt. The header also records a mark
+of the database state it was compacted from; a mismatch at startup (rows
+written while no owner was running) triggers a rebuild as well.
+"""
+import contextlib
+import hashlib
+import logging
+import math
+import mmap
+import os
+import re
+import struct
+import tempfile
+import threading
+from array import array
+from collections import Counter
+from html import escape
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+
+import counters
+import models
+
+logger = logging.getLogger(__name__)
+
+SEARCH_ENGINE = os.environ.get('SEARCH_ENGINE', 'database')
+SEARCH_INDEX_PATH = os.environ.get(
+    'SEARCH_INDEX_PATH',
+    os.path.join(tempfile.gettempdir(), 'issue_tracker_search.idx'),
+)
+SEARCH_INDEX_COMPACT_EVERY = int(os.environ.get('SEARCH_INDEX_COMPACT_EVERY', '5000'))
+
+ISSUE, COMMENT = 0, 1
+K1, B = 1.2, 0.75
+TOKEN_RE = re.compile(r'\w+')
+MAGIC = b'ITSIDX02'
+HEADER = struct.Struct('<8sQQQ16s')  # magic, documents, terms, postings length, state mark
+# Written by background compactions, which have no consistent database state to record.
+NO_MARK = bytes(16)
+
+
+class IndexLocked(RuntimeError):
+    """Another live process owns the index file."""
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    return TOKEN_RE.findall(text.lower()) if text else []
+
+
+def issue_text(title: Optional[str], description: Optional[str]) -> str:
+    return f'{title or ""} {description or ""}'
+
+
+class Segment:
+    """Immutable, memory-mapped part of the index."""
+
+    def __init__(self):
+        self._mmap = None
+        self.doc_kind = np.zeros(0, dtype=np.uint32)
+        self.doc_ref = np.zeros(0, dtype=np.uint32)
+        self.doc_issue = np.zeros(0, dtype=np.uint32)
+        self.doc_length = np.zeros(0, dtype=np.uint32)
+        self.terms: Dict[str, Tuple[int, int]] = {}
+        self.postings = np.zeros(0, dtype=np.uint32)
+        self.mark = NO_MARK
+
+    @property
+    def size(self) -> int:
+        return len(self.doc_ref)
+
+    @classmethod
+    def open(cls, path: str) -> 'Segment':
+        segment = cls()
+        with open(path, 'rb') as f:
+            segment._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buffer = segment._mmap
+        if len(buffer) < HEADER.size:
+            raise ValueError(f'{path} is not a search index')
+        magic, n_docs, n_terms, n_postings, segment.mark = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            raise ValueError(f'{path} is not a search index')
+
+        offset = HEADER.size
+        columns = []
+        for _ in range(4):
+            columns.append(np.frombuffer(buffer, dtype=np.uint32, count=n_docs, offset=offset))
+            offset += 4 * n_docs
+        segment.doc_kind, segment.doc_ref, segment.doc_issue, segment.doc_length = columns
+
+        (blob_length,) = struct.unpack_from('<Q', buffer, offset)
+        offset += 8
+        words = bytes(buffer[offset:offset + blob_length]).decode('utf-8').split('\n') if n_terms else []
+        offset += blob_length
+        offset += -offset % 8
+        bounds = np.frombuffer(buffer, dtype=np.uint64, count=n_terms + 1, offset=offset)
+        offset += 8 * (n_terms + 1)
+        segment.terms = {word: (int(bounds[i]), int(bounds[i + 1])) for i, word in enumerate(words)}
+        segment.postings = np.frombuffer(buffer, dtype=np.uint32, count=n_postings, offset=offset)
+        return segment
+
+    def lookup(self, term: str) -> np.ndarray:
+        bounds = self.terms.get(term)
+        if bounds is None:
+            return self.postings[:0]
+        return self.postings[bounds[0]:bounds[1]]
+
+    def close(self):
+        # numpy views keep the map alive until they are released.
+        self.__init__()
+
+
+def write_segment(path: str, docs: Dict[str, np.ndarray], postings: Dict[str, np.ndarray], mark: bytes = NO_MARK):
+    words = sorted(postings)
+    blob = '\n'.join(words).encode('utf-8')
+    bounds = np.zeros(len(words) + 1, dtype=np.uint64)
+    if words:
+        bounds[1:] = np.cumsum([len(postings[word]) for word in words])
+    n_docs = len(docs['ref'])
+
+    with open(path, 'wb') as out:
+        out.write(HEADER.pack(MAGIC, n_docs, len(words), int(bounds[-1]), mark))
+        for column in ('kind', 'ref', 'issue', 'length'):
+            out.write(np.ascontiguousarray(docs[column], dtype=np.uint32).tobytes())
+        out.write(struct.pack('<Q', len(blob)))
+        out.write(blob)
+        out.write(b'\0' * (-out.tell() % 8))
+        out.write(bounds.tobytes())
+        for word in words:
+            out.write(np.ascontiguousarray(postings[word], dtype=np.uint32).tobytes())
+
+
+class InvertedIndex:
+    def __init__(self, path: str = SEARCH_INDEX_PATH):
+        self.path = path
+        self._lock = threading.RLock()
+        self._compacting = False
+        self._compact_lock = threading.Lock()
+        self.base = Segment()
+        self._reset_delta()
+        self._keys: Dict[Tuple[int, int], int] = {}
+
+    def _reset_delta(self):
+        self._dead = set()
+        self._delta_kind = array('I')
+        self._delta_ref = array('I')
+        self._delta_issue = array('I')
+        self._delta_length = array('I')
+        # term -> interleaved (doc number, term frequency) pairs
+        self._delta_postings: Dict[str, array] = {}
+
+    @property
+    def size(self) -> int:
+        return self.base.size + len(self._delta_ref)
+
+    @property
+    def pending(self) -> int:
+        return len(self._delta_ref) + len(self._dead)
+
+    def load(self) -> bool:
+        if not os.path.exists(self.path):
+            return False
+        with self._lock:
+            self.base = Segment.open(self.path)
+            self._reset_delta()
+            self._keys = {
+                (int(kind), int(ref)): docno
+                for docno, (kind, ref) in enumerate(zip(self.base.doc_kind.tolist(), self.base.doc_ref.tolist()))
+            }
+        return True
+
+    def add(self, kind: int, ref: int, issue_id: int, text: str):
+        tokens = tokenize(text)
+        with self._lock:
+            self._drop(kind, ref)
+            docno = self.size
+            self._delta_kind.append(kind)
+            self._delta_ref.append(ref)
+            self._delta_issue.append(issue_id)
+            self._delta_length.append(len(tokens))
+            for term, frequency in Counter(tokens).items():
+                self._delta_postings.setdefault(term, array('I')).extend((docno, frequency))
+            self._keys[(kind, ref)] = docno
+
+    def remove(self, kind: int, ref: int):
+        with self._lock:
+            self._drop(kind, ref)
+
+    def _drop(self, kind: int, ref: int):
+        docno = self._keys.pop((kind, ref), None)
+        if docno is not None:
+            self._dead.add(docno)
+
+    def _columns(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        if not self._delta_ref and not self._dead:
+            base = self.base
+            return base.doc_kind, base.doc_ref, base.doc_issue, base.doc_length, np.ones(base.size, dtype=bool)
+        kind = np.concatenate([self.base.doc_kind, np.frombuffer(self._delta_kind, dtype=np.uint32)])
+        ref = np.concatenate([self.base.doc_ref, np.frombuffer(self._delta_ref, dtype=np.uint32)])
+        issue = np.concatenate([self.base.doc_issue, np.frombuffer(self._delta_issue, dtype=np.uint32)])
+        length = np.concatenate([self.base.doc_length, np.frombuffer(self._delta_length, dtype=np.uint32)])
+        alive = np.ones(len(ref), dtype=bool)
+        if self._dead:
+            alive[np.fromiter(self._dead, dtype=np.int64)] = False
+        return kind, ref, issue, length, alive
+
+    def _postings(self, term: str) -> np.ndarray:
+        delta = self._delta_postings.get(term)
+        base = self.base.lookup(term)
+        if delta is None:
+            return base
+        return np.concatenate([base, np.frombuffer(delta, dtype=np.uint32)])
+
+    def search(self, query: str) -> List[dict]:
+        """Issues whose title/description or a comment contains every query term, best first."""
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+
+        with self._lock:
+            kind, ref, issue, length, alive = self._columns()
+            n_alive = int(alive.sum())
+            if not n_alive:
+                return []
+            average_length = max(float(length[alive].mean()), 1.0)
+            scores = np.zeros(len(ref), dtype=np.float64)
+            matched = np.zeros(len(ref), dtype=np.uint16)
+
+            for term in terms:
+                postings = self._postings(term)
+                docs, frequencies = postings[0::2], postings[1::2].astype(np.float64)
+                keep = alive[docs]
+                docs, frequencies = docs[keep], frequencies[keep]
+                if not len(docs):
+                    return []
+                idf = math.log(1 + (n_alive - len(docs) + 0.5) / (len(docs) + 0.5))
+                norm = K1 * (1 - B + B * length[docs] / average_length)
+                scores[docs] += idf * frequencies * (K1 + 1) / (frequencies + norm)
+                matched[docs] += 1
+
+            hits = np.nonzero(matched == len(terms))[0]
+            hit_issues = issue[hits]
+            hit_scores = scores[hits]
+            issue_ids, inverse = np.unique(hit_issues, return_inverse=True)
+            totals = np.bincount(inverse, weights=hit_scores)
+
+            # Best-scoring comment per issue, used for the highlight fragment.
+            best_comment = {}
+            comment_hits = np.nonzero(kind[hits] == COMMENT)[0]
+            for position in comment_hits[np.argsort(-hit_scores[comment_hits], kind='stable')]:
+                best_comment.setdefault(int(hit_issues[position]), int(ref[hits[position]]))
+
+        order = np.lexsort((-issue_ids.astype(np.int64), -totals))
+        return [
+            {
+                'issue_id': int(issue_ids[i]),
+                'rank': float(totals[i]),
+                'comment_id': best_comment.get(int(issue_ids[i])),
+            }
+            for i in order
+        ]
+
+    @property
+    def mark(self) -> bytes:
+        return self.base.mark
+
+    def compact(self, mark: bytes = NO_MARK):
+        """Fold the delta segment and tombstones into a new index file.
+
+        Postings are merged and written from a snapshot without holding the
+        index lock; searches and writes only wait for the final swap, which
+        replays whatever changed in the meantime on top of the new segment.
+        ``mark`` is stored in the header and must describe the database state
+        the indexed documents reflect.
+        """
+        with self._compact_lock:
+            with self._lock:
+                kind, ref, issue, length, alive = self._columns()
+                base = self.base
+                snapshot_size = self.size
+                snapshot_dead = set(self._dead)
+                delta_postings = {term: array('I', pairs) for term, pairs in self._delta_postings.items()}
+
+            renumber = np.cumsum(alive, dtype=np.int64) - 1
+            postings = {}
+            for term in set(base.terms).union(delta_postings):
+                delta = delta_postings.get(term)
+                pairs = base.lookup(term)
+                if delta is not None:
+                    pairs = np.concatenate([pairs, np.frombuffer(delta, dtype=np.uint32)])
+                pairs = pairs.reshape(-1, 2)
+                pairs = pairs[alive[pairs[:, 0]]]
+                if len(pairs):
+                    pairs = pairs.copy()
+                    pairs[:, 0] = renumber[pairs[:, 0]]
+                    postings[term] = pairs.ravel()
+            docs = {'kind': kind[alive], 'ref': ref[alive], 'issue': issue[alive], 'length': length[alive]}
+            # A failed write leaves the current file and segment untouched.
+            tmp_path = f'{self.path}.tmp'
+            write_segment(tmp_path, docs, postings, mark)
+
+            with self._lock:
+                self._swap(tmp_path, snapshot_size, snapshot_dead, alive, renumber)
+
+    def _swap(self, tmp_path: str, snapshot_size: int, snapshot_dead: set, alive: np.ndarray, renumber: np.ndarray):
+        """Install a compacted segment, carrying over changes made after its snapshot."""
+        base_size = self.base.size
+        tail = [
+            (docno, self._delta_kind[docno - base_size], self._delta_ref[docno - base_size],
+             self._delta_issue[docno - base_size], self._delta_length[docno - base_size])
+            for docno in range(snapshot_size, self.size)
+            if docno not in self._dead
+        ]
+        tail_postings = {}
+        for term, pairs in self._delta_postings.items():
+            pairs = np.frombuffer(pairs, dtype=np.uint32).reshape(-1, 2)
+            pairs = pairs[pairs[:, 0] >= snapshot_size]
+            if len(pairs):
+                tail_postings[term] = pairs
+        # Snapshot documents deleted after the snapshot, in new numbering.
+        dropped = [
+            int(renumber[docno]) for docno in self._dead - snapshot_dead
+            if docno < snapshot_size and alive[docno]
+        ]
+
+        os.replace(tmp_path, self.path)
+        self.load()
+
+        for docno in dropped:
+            key = (int(self.base.doc_kind[docno]), int(self.base.doc_ref[docno]))
+            if self._keys.get(key) == docno:
+                del self._keys[key]
+            self._dead.add(docno)
+        moved = {}
+        for docno, kind, ref, issue_id, length in tail:
+            moved[docno] = self.size
+            self._keys[(kind, ref)] = self.size
+            self._delta_kind.append(kind)
+            self._delta_ref.append(ref)
+            self._delta_issue.append(issue_id)
+            self._delta_length.append(length)
+        for term, pairs in tail_postings.items():
+            for docno, frequency in pairs.tolist():
+                if docno in moved:
+                    self._delta_postings.setdefault(term, array('I')).extend((moved[docno], frequency))
+
+    def build(self, db: Session, batch_size: int = 5000):
+        # Taken first, so a write racing the scan makes the mark stale, not the index.
+        mark = state_mark(db)
+        with self._lock:
+            self.base.close()
+            self._reset_delta()
+            self._keys = {}
+            for issue_id, title, description in db.execute(
+                select(models.Issue.id, models.Issue.title, models.Issue.description)
+                .execution_options(yield_per=batch_size)
+            ):
+                self.add(ISSUE, issue_id, issue_id, issue_text(title, description))
+            for comment_id, issue_id, body in db.execute(
+                select(models.Comment.id, models.Comment.issue_id, models.Comment.body)
+                .execution_options(yield_per=batch_size)
+            ):
+                self.add(COMMENT, comment_id, issue_id, body)
+            self.compact(mark)
+
+    def apply(self, changes: Iterable[tuple]):
+        for change in changes:
+            if change[0] == 'remove':
+                self.remove(change[1], change[2])
+            else:
+                self.add(*change[1:])
+        if self.pending >= SEARCH_INDEX_COMPACT_EVERY:
+            self.compact_in_background()
+
+    def compact_in_background(self):
+        with self._lock:
+            if self._compacting:
+                return
+            self._compacting = True
+
+        def run():
+            try:
+                self.compact()
+            except Exception:
+                logger.exception('Search index compaction failed')
+            finally:
+                self._compacting = False
+
+        threading.Thread(target=run, name='search-index-compact', daemon=True).start()
+
+
+def state_mark(db: Session) -> bytes:
+    """Digest of the indexed tables' state: the issue change counter plus comment aggregates."""
+    counter = models.IssueCounter
+    dimension, value = counters.CHANGES
+    row = db.execute(
+        select(
+            select(counter.count).where(counter.dimension == dimension, counter.value == value).scalar_subquery(),
+            select(func.count(models.Comment.id)).scalar_subquery(),
+            select(func.max(models.Comment.id)).scalar_subquery(),
+            select(func.max(models.Comment.updated_at)).scalar_subquery(),
+        )
+    ).one()
+    return hashlib.blake2b(repr(tuple(row)).encode('utf-8'), digest_size=16).digest()
+
+
+def _owner_alive(pid: int) -> bool:
+    if pid == os.getpid():
+        # A recycled pid (e.g. pid 1 in a restarted container) is not a live owner.
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def acquire_lock(path: str) -> bool:
+    """Take ``<path>.lock``; returns True if it replaced the lock of an owner that died."""
+    lock_path = f'{path}.lock'
+    stale = False
+    for _ in range(2):
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            try:
+                with open(lock_path) as f:
+                    owner = int(f.read().strip() or 0)
+            except (FileNotFoundError, ValueError):
+                owner = 0
+            if owner and _owner_alive(owner):
+                raise IndexLocked(f'{path} is owned by process {owner}; SEARCH_ENGINE=inverted needs a single worker')
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(lock_path)
+            stale = True
+            continue
+        with os.fdopen(fd, 'w') as f:
+            f.write(str(os.getpid()))
+        return stale
+    # Another process took the lock between our removal and retry.
+    raise IndexLocked(f'Could not take {lock_path}')
+
+
+def release_lock(path: str):
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(f'{path}.lock')
+
+
+index: Optional[InvertedIndex] = None
+_session_factory = None
+
+
+def enabled() -> bool:
+    return index is not None
+
+
+def _load_current(search_index: InvertedIndex, mark: bytes) -> bool:
+    try:
+        loaded = search_index.load()
+    except ValueError:
+        # Older or damaged file format.
+        return False
+    return loaded and search_index.mark == mark
+
+
+def setup(session_factory, engine_name: str = SEARCH_ENGINE, path: Optional[str] = None) -> Optional[InvertedIndex]:
+    """Open the index for this process, rebuilding it unless the file is known to be current."""
+    global index, _session_factory
+    if engine_name != 'inverted':
+        return None
+    search_index = InvertedIndex(path or SEARCH_INDEX_PATH)
+    crashed = acquire_lock(search_index.path)
+    db = session_factory()
+    try:
+        if crashed:
+            logger.warning('Search index owner exited without compacting; rebuilding %s', search_index.path)
+        if crashed or not _load_current(search_index, state_mark(db)):
+            search_index.build(db)
+    except Exception:
+        release_lock(search_index.path)
+        raise
+    finally:
+        db.close()
+    index, _session_factory = search_index, session_factory
+    return index
+
+
+def shutdown():
+    """Compact with the current database mark and give up the lock, so the next start can reuse the file."""
+    global index
+    if index is None:
+        return
+    db = _session_factory()
+    try:
+        mark = state_mark(db)
+    finally:
+        db.close()
+    if index.pending or index.mark != mark:
+        index.compact(mark)
+    release_lock(index.path)
+    index = None
+
+
+def record_issues(db: Session, rows: Iterable[Tuple[int, dict]]):
+    """Queue documents for issues written with bulk statements, which skip the flush hooks."""
+    if index is None:
+        return
+    pending = db.info.setdefault('search_index_changes', [])
+    for issue_id, row in rows:
+        pending.append(('add', ISSUE, issue_id, issue_id, issue_text(row.get('title'), row.get('description'))))
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_changes(session, flush_context):
+    if index is None:
+        return
+    pending = session.info.setdefault('search_index_changes', [])
+    for instance in (*session.new, *session.dirty):
+        if isinstance(instance, models.Issue):
+            pending.append(('add', ISSUE, instance.id, instance.id, issue_text(instance.title, instance.description)))
+        elif isinstance(instance, models.Comment):
+            pending.append(('add', COMMENT, instance.id, instance.issue_id, instance.body))
+    for instance in session.deleted:
+        if isinstance(instance, models.Issue):
+            pending.append(('remove', ISSUE, instance.id))
+        elif isinstance(instance, models.Comment):
+            pending.append(('remove', COMMENT, instance.id))
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_changes(session):
+    changes = session.info.pop('search_index_changes', None)
+    if changes and index is not None:
+        index.apply(changes)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_changes(session):
+    session.info.pop('search_index_changes', None)
+
+
+def highlight(text: Optional[str], terms: Iterable[str]) -> Optional[str]:
+    if not text:
+        return None
+    wanted = set(terms)
+    parts, last, found = [], 0, False
+    for match in TOKEN_RE.finditer(text):
+        if match.group().lower() in wanted:
+            parts.append(escape(text[last:match.start()]))
+            parts.append(f'<mark>{escape(match.group())}</mark>')
+            last, found = match.end(), True
+    if not found:
+        return None
+    parts.append(escape(text[last:]))
+    return ''.join(parts)
+
+
+def search_issues(db: Session, query: str, filters: Optional[dict] = None, skip: int = 0, limit: int = 20) -> List[dict]:
+    """Same contract as ``search.search_issues``, answered from the in-process index."""
+    ranked = index.search(query) if index is not None else []
+    conditions = [
+        getattr(models.Issue, field) == value
+        for field, value in (filters or {}).items()
+        if value is not None
+    ]
+
+    page, wanted, position, batch = [], skip + limit, 0, max(limit * 4, 100)
+    while len(page) < wanted and position < len(ranked):
+        candidates = ranked[position:position + batch]
+        position += batch
+        if conditions:
+            allowed = set(db.execute(
+                select(models.Issue.id).where(models.Issue.id.in_([hit['issue_id'] for hit in candidates]), *conditions)
+            ).scalars())
+            candidates = [hit for hit in candidates if hit['issue_id'] in allowed]
+        page.extend(candidates)
+    page = page[skip:wanted]
+    if not page:
+        return []
+
+    terms = tokenize(query)
+    issues = dict(
+        (row.id, row) for row in db.execute(
+            select(models.Issue.id, models.Issue.title, models.Issue.description)
+            .where(models.Issue.id.in_([hit['issue_id'] for hit in page]))
+        )
+    )
+    comment_ids = [hit['comment_id'] for hit in page if hit['comment_id'] is not None]
+    comments = dict(db.execute(
+        select(models.Comment.id, models.Comment.body).where(models.Comment.id.in_(comment_ids))
+    ).all()) if comment_ids else {}
+
+    results = []
+    for hit in page:
+        row = issues.get(hit['issue_id'])
+        if row is None:
+            continue
+        fragments = {
+            'title': highlight(row.title, terms),
+            'description': highlight(row.description, terms),
+            'comment': highlight(comments.get(hit['comment_id']), terms),
+        }
+        results.append({
+            'issue_id': hit['issue_id'],
+            'rank': hit['rank'],
+            'highlights': {name: value for name, value in fragments.items() if value},
+        })
+    return results
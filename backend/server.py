@@ -1,21 +1,41 @@
-from fastapi import FastAPI, APIRouter, Depends, HTTPException, status, UploadFile, File, Query
+from fastapi import FastAPI, APIRouter, Depends, HTTPException, status, UploadFile, File, Query, Header, Request, Response
 from dotenv import load_dotenv
+from fastapi.responses import JSONResponse, StreamingResponse
 from starlette.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
-from sqlalchemy import func, case
 from sqlalchemy.exc import OperationalError
+from anyio import to_thread
 import os
 import logging
 from pathlib import Path
 from datetime import datetime,  timezone
-from typing import List, Optional, cast
-import csv
-import io
+from typing import List, Optional, Union, cast
 import time
-from database import engine, get_db, Base
+from collections import Counter
+from database import engine, get_db, Base, SessionLocal, THREADPOOL_SIZE
 import models
 import schemas
-from auth import get_password_hash, verify_password, create_access_token, get_current_user
+import loaders
+import pagination
+import projection
+import bulk
+import etags
+import events
+import export
+import history_archive
+import counters
+import reports
+from report_engine import report_engine
+import search
+import search_index
+import snapshot
+import sync
+import uow
+from csv_import import CSVImporter, CSV_IMPORT_CHUNK_SIZE
+import import_jobs
+from import_jobs import job_runner
+from auth import create_access_token, get_current_user
+from hashing import hasher, HashingOverloaded
 
 if os.getenv("RENDER") != "true":
     ROOT_DIR = Path(__file__).parent
@@ -29,13 +49,23 @@ api_router = APIRouter(prefix='/api')
 
 @app.on_event("startup")
 def on_startup():
+    # Route handlers are plain `def` so FastAPI runs them (and their blocking
+    # database calls) in this worker thread pool instead of on the event loop.
+    to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+
     retries = 5
     delay = 2  # seconds
 
     for attempt in range(retries):
         try:
             Base.metadata.create_all(bind=engine)
+            search.install(engine)
+            sync.install(engine)
+            search_index.setup(SessionLocal)
             print("✅ Database connected and tables created")
+            counters.reconciler.start()
+            history_archive.archive_job.start()
+            job_runner.resume_pending()
             return
         except OperationalError:
             print(f"⏳ DB not ready (attempt {attempt + 1}/{retries})")
@@ -44,8 +74,25 @@ def on_startup():
     raise RuntimeError("❌ Could not connect to database after retries")
 
 
+@app.on_event("shutdown")
+def on_shutdown():
+    hasher.shutdown()
+    job_runner.shutdown()
+    counters.reconciler.stop()
+    history_archive.archive_job.stop()
+    search_index.shutdown()
+
+
+def hashing_unavailable() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail='Authentication service is busy, please retry',
+        headers={'Retry-After': '1'},
+    )
+
+
 @api_router.post('/auth/register', response_model=schemas.Token, status_code=status.HTTP_201_CREATED)
-async def register(user_in: schemas.UserCreate, db: Session = Depends(get_db)):
+def register(user_in: schemas.UserCreate, db: Session = Depends(get_db)):
     db_user = db.query(models.User).filter(models.User.email == user_in.email).first()
     if db_user:
         raise HTTPException(status_code=400, detail='Email already registered')
@@ -54,7 +101,10 @@ async def register(user_in: schemas.UserCreate, db: Session = Depends(get_db)):
     if db_username:
         raise HTTPException(status_code=400, detail='Username already taken')
     
-    hashed_password = get_password_hash(user_in.password)
+    try:
+        hashed_password = hasher.hash_password(user_in.password)
+    except HashingOverloaded:
+        raise hashing_unavailable()
     db_user = models.User(
         email=user_in.email,
         username=user_in.username,
@@ -77,9 +127,13 @@ async def register(user_in: schemas.UserCreate, db: Session = Depends(get_db)):
     }
 
 @api_router.post('/auth/login', response_model=schemas.Token)
-async def login(user_in: schemas.UserLogin, db: Session = Depends(get_db)):
+def login(user_in: schemas.UserLogin, db: Session = Depends(get_db)):
     db_user = db.query(models.User).filter(models.User.email == user_in.email).first()
-    if not db_user or not verify_password(user_in.password, db_user.hashed_password):
+    try:
+        valid = db_user is not None and hasher.verify_password(user_in.password, db_user.hashed_password)
+    except HashingOverloaded:
+        raise hashing_unavailable()
+    if not valid:
         raise HTTPException(status_code=401, detail='Incorrect email or password')
     
     # 🔐 NON-EXPIRING TOKEN
@@ -98,13 +152,17 @@ async def login(user_in: schemas.UserLogin, db: Session = Depends(get_db)):
 async def get_me(current_user: models.User = Depends(get_current_user)):
     return current_user
 
+@api_router.get('/metrics/hashing', response_model=dict)
+async def get_hashing_metrics(current_user: models.User = Depends(get_current_user)):
+    return hasher.stats()
+
 @api_router.get('/users', response_model=List[schemas.User])
-async def list_users(db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
+def list_users(db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
     users = db.query(models.User).all()
     return users
 
 @api_router.post('/labels', response_model=schemas.Label, status_code=status.HTTP_201_CREATED)
-async def create_label(label_in: schemas.LabelCreate, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
+def create_label(label_in: schemas.LabelCreate, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
     db_label = db.query(models.Label).filter(models.Label.name == label_in.name).first()
     if db_label:
         raise HTTPException(status_code=400, detail='Label already exists')
@@ -116,12 +174,21 @@ async def create_label(label_in: schemas.LabelCreate, db: Session = Depends(get_
     return db_label
 
 @api_router.get('/labels', response_model=List[schemas.Label])
-async def list_labels(db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
+def list_labels(
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    etag = etags.labels_etag(db)
+    if etags.matches(if_none_match, etag):
+        return etags.not_modified(etag)
+    response.headers.update(etags.headers(etag))
     labels = db.query(models.Label).all()
     return labels
 
 @api_router.post('/issues', response_model=schemas.Issue, status_code=status.HTTP_201_CREATED)
-async def create_issue(issue_in: schemas.IssueCreate, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
+def create_issue(issue_in: schemas.IssueCreate, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
     db_issue = models.Issue(
         title=issue_in.title,
         description=issue_in.description,
@@ -136,31 +203,39 @@ async def create_issue(issue_in: schemas.IssueCreate, db: Session = Depends(get_
         db_issue.labels = labels
     
     db.add(db_issue)
-    db.commit()
-    db.refresh(db_issue)
+    counters.apply(db, counters.issue_deltas(issue_in.status, issue_in.priority))
+    work = uow.UnitOfWork(db, current_user.id)
+    work.record(db_issue, 'created', new_value='Issue created')
+    work.commit()
     
-    history = models.IssueHistory(
-        issue_id=db_issue.id,
-        changed_by_id=current_user.id,
-        change_type='created',
-        new_value='Issue created'
-    )
-    db.add(history)
-    db.commit()
-    
-    return db_issue
+    return loaders.get_issue(db, db_issue.id)
 
-@api_router.get('/issues', response_model=List[schemas.Issue])
-async def list_issues(
+@api_router.get('/issues', response_model=Union[List[schemas.Issue], schemas.IssuePage])
+def list_issues(
+    response: Response,
     status: Optional[str] = None,
     priority: Optional[str] = None,
     assignee_id: Optional[int] = None,
     skip: int = Query(0, ge=0),
     limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description='Keyset cursor; pass an empty value for the first page'),
+    fields: Optional[str] = Query(None, description='Comma-separated issue fields to return, e.g. id,title,status'),
+    if_none_match: Optional[str] = Header(None),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
-    query = db.query(models.Issue)
+    try:
+        selected = projection.parse_fields(fields)
+    except projection.InvalidFields as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    filters = {'status': status or None, 'priority': priority or None, 'assignee_id': assignee_id or None}
+    etag = etags.issues_etag(db, filters, skip, limit, cursor, sorted(selected or ()))
+    if etags.matches(if_none_match, etag):
+        return etags.not_modified(etag)
+    response.headers.update(etags.headers(etag))
+    
+    query = loaders.issue_query(db) if selected is None else projection.issue_query(db, selected)
     
     if status:
         query = query.filter(models.Issue.status == status)
@@ -169,18 +244,188 @@ async def list_issues(
     if assignee_id:
         query = query.filter(models.Issue.assignee_id == assignee_id)
     
-    issues = query.order_by(models.Issue.created_at.desc()).offset(skip).limit(limit).all()
-    return issues
+    if cursor is None:
+        issues = query.order_by(models.Issue.created_at.desc()).offset(skip).limit(limit).all()
+        if selected is not None:
+            return JSONResponse(projection.serialize_many(issues, selected), headers=etags.headers(etag))
+        return issues
+    
+    try:
+        issues, next_cursor = pagination.keyset_page(
+            query, models.Issue.created_at, models.Issue.id, cursor, limit
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail='Invalid cursor')
+    if selected is not None:
+        return JSONResponse(
+            {'items': projection.serialize_many(issues, selected), 'next_cursor': next_cursor},
+            headers=etags.headers(etag),
+        )
+    return {'items': issues, 'next_cursor': next_cursor}
+
+@api_router.get('/issues/export')
+def export_issues(
+    format: str = Query('csv', pattern='^(csv|ndjson)$'),
+    status: Optional[str] = None,
+    priority: Optional[str] = None,
+    assignee_id: Optional[int] = None,
+    include: Optional[str] = Query(None, description='Comma-separated: labels, history'),
+    current_user: models.User = Depends(get_current_user)
+):
+    included = tuple(name.strip() for name in (include or '').split(',') if name.strip())
+    unknown = set(included) - set(export.EXPORT_INCLUDES)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f'Unknown include: {", ".join(sorted(unknown))}')
+    
+    filters = {'status': status, 'priority': priority, 'assignee_id': assignee_id}
+    return StreamingResponse(
+        export.stream_export(SessionLocal, format, filters, included),
+        media_type=export.EXPORT_FORMATS[format],
+        headers={'Content-Disposition': f'attachment; filename="issues.{format}"'},
+    )
+
+@api_router.get('/issues/search', response_model=List[schemas.SearchResult])
+def search_issues(
+    q: str = Query(..., min_length=1),
+    status: Optional[str] = None,
+    priority: Optional[str] = None,
+    assignee_id: Optional[int] = None,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    filters = {'status': status, 'priority': priority, 'assignee_id': assignee_id}
+    try:
+        if search_index.enabled():
+            hits = search_index.search_issues(db, q, filters, skip=skip, limit=limit)
+        else:
+            hits = search.search_issues(db, q, filters, skip=skip, limit=limit)
+    except search.SearchUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    issues = {issue.id: issue for issue in loaders.load_issues(db, [hit['issue_id'] for hit in hits])}
+    return [
+        {'issue': issues[hit['issue_id']], 'rank': hit['rank'], 'highlights': hit['highlights']}
+        for hit in hits
+        if hit['issue_id'] in issues
+    ]
+
+@api_router.get('/events')
+async def stream_events(
+    request: Request,
+    issue_id: Optional[int] = None,
+    status: Optional[str] = None,
+    priority: Optional[str] = None,
+    assignee_id: Optional[int] = None,
+    current_user: models.User = Depends(get_current_user)
+):
+    subscription = events.broker.subscribe(
+        issue_id, {'status': status, 'priority': priority, 'assignee_id': assignee_id}
+    )
+    return StreamingResponse(
+        events.stream(subscription, request.is_disconnected),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+@api_router.get('/metrics/events', response_model=dict)
+async def get_event_metrics(current_user: models.User = Depends(get_current_user)):
+    return events.broker.stats()
+
+@api_router.get('/sync/changes', response_model=schemas.SyncPage)
+def get_changes(
+    since: Optional[str] = None,
+    limit: int = Query(sync.SYNC_PAGE_SIZE, ge=1, le=500),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    try:
+        return sync.changes_since(db, since, limit)
+    except sync.WatermarkExpired:
+        raise HTTPException(status_code=410, detail='Watermark predates archived history; sync again from the beginning')
+    except ValueError:
+        raise HTTPException(status_code=400, detail='Invalid watermark')
 
 @api_router.get('/issues/{issue_id}', response_model=schemas.IssueDetail)
-async def get_issue(issue_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
-    db_issue = db.query(models.Issue).filter(models.Issue.id == issue_id).first()
+def get_issue(
+    issue_id: int,
+    response: Response,
+    comments_limit: Optional[int] = Query(None, ge=1, le=500, description='Return only the first N comments'),
+    fields: Optional[str] = Query(None, description='Comma-separated issue fields to return, e.g. id,title,comments'),
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    try:
+        selected = projection.parse_fields(fields, projection.DETAIL_FIELDS)
+    except projection.InvalidFields as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    etag = etags.issue_etag(db, issue_id, comments_limit, sorted(selected or ()))
+    if etag is None:
+        raise HTTPException(status_code=404, detail='Issue not found')
+    if etags.matches(if_none_match, etag):
+        return etags.not_modified(etag)
+    response.headers.update(etags.headers(etag))
+    
+    if selected is not None:
+        preview = comments_limit is not None and 'comments' in selected
+        loaded = selected - {'comments'} if preview else selected
+        db_issue = projection.issue_query(db, loaded).filter(models.Issue.id == issue_id).first()
+        if not db_issue:
+            raise HTTPException(status_code=404, detail='Issue not found')
+        body = projection.serialize(db_issue, loaded)
+        if preview:
+            comments, next_cursor, comment_count = loaders.comment_preview(db, issue_id, comments_limit)
+            body.update(
+                comments=[schemas.Comment.model_validate(comment).model_dump(mode='json') for comment in comments],
+                comment_count=comment_count,
+                comments_next_cursor=next_cursor,
+            )
+        return JSONResponse(body, headers=etags.headers(etag))
+    
+    if comments_limit is None:
+        db_issue = loaders.get_issue_detail(db, issue_id)
+        if not db_issue:
+            raise HTTPException(status_code=404, detail='Issue not found')
+        return db_issue
+    
+    db_issue = loaders.get_issue(db, issue_id)
     if not db_issue:
         raise HTTPException(status_code=404, detail='Issue not found')
-    return db_issue
+    comments, next_cursor, comment_count = loaders.comment_preview(db, issue_id, comments_limit)
+    # Outside response_model, so the default detail keeps its shape without the preview keys.
+    body = schemas.IssueDetailPreview(
+        **schemas.Issue.model_validate(db_issue).model_dump(),
+        comments=comments,
+        comment_count=comment_count,
+        comments_next_cursor=next_cursor,
+    )
+    return JSONResponse(body.model_dump(mode='json'), headers=etags.headers(etag))
+
+@api_router.get('/issues/{issue_id}/comments', response_model=schemas.CommentPage)
+def list_comments(
+    issue_id: int,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    if db.query(models.Issue.id).filter(models.Issue.id == issue_id).first() is None:
+        raise HTTPException(status_code=404, detail='Issue not found')
+    
+    try:
+        comments, next_cursor = pagination.keyset_page(
+            loaders.comment_query(db, issue_id), models.Comment.created_at, models.Comment.id,
+            cursor, limit, descending=False,
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail='Invalid cursor')
+    return {'items': comments, 'next_cursor': next_cursor}
 
 @api_router.patch('/issues/{issue_id}', response_model=schemas.Issue)
-async def update_issue(
+def update_issue(
     issue_id: int,
     issue_update: schemas.IssueUpdate,
     db: Session = Depends(get_db),
@@ -206,21 +451,23 @@ async def update_issue(
 
     
     update_data = issue_update.model_dump(exclude_unset=True, exclude={'version'})
+    counter_deltas = Counter()
+    work = uow.UnitOfWork(db, current_user.id)
     
     for field, value in update_data.items():
         old_value = getattr(db_issue, field)
         if old_value != value:
             setattr(db_issue, field, value)
+            if field in ('status', 'priority'):
+                counter_deltas.update(counters.change_deltas(field, old_value, value))
             
-            history = models.IssueHistory(
-                issue_id=db_issue.id,
-                changed_by_id=current_user.id,
-                change_type='updated',
+            work.record(
+                db_issue,
+                'updated',
                 field_name=field,
                 old_value=str(old_value) if old_value is not None else None,
                 new_value=str(value) if value is not None else None
             )
-            db.add(history)
     
         resolved_at = db_issue.resolved_at
 
@@ -230,12 +477,12 @@ async def update_issue(
     
     setattr(db_issue, 'version', db_issue.version + 1)
     setattr(db_issue, 'updated_at', datetime.now(timezone.utc))
-    db.commit()
-    db.refresh(db_issue)
-    return db_issue
+    counters.apply(db, counter_deltas)
+    work.commit()
+    return loaders.get_issue(db, issue_id)
 
 @api_router.post('/issues/{issue_id}/comments', response_model=schemas.Comment, status_code=status.HTTP_201_CREATED)
-async def add_comment(
+def add_comment(
     issue_id: int,
     comment_in: schemas.CommentCreate,
     db: Session = Depends(get_db),
@@ -251,22 +498,15 @@ async def add_comment(
         author_id=current_user.id
     )
     db.add(db_comment)
-    db.commit()
+    work = uow.UnitOfWork(db, current_user.id)
+    work.record(db_issue, 'comment_added', new_value='Added comment')
+    work.commit()
     db.refresh(db_comment)
     
-    history = models.IssueHistory(
-        issue_id=issue_id,
-        changed_by_id=current_user.id,
-        change_type='comment_added',
-        new_value='Added comment'
-    )
-    db.add(history)
-    db.commit()
-    
     return db_comment
 
 @api_router.put('/issues/{issue_id}/labels', response_model=schemas.Issue)
-async def replace_labels(
+def replace_labels(
     issue_id: int,
     label_ids: List[int],
     db: Session = Depends(get_db),
@@ -283,262 +523,214 @@ async def replace_labels(
         raise HTTPException(status_code=400, detail='One or more label IDs are invalid')
     
     db_issue.labels = labels
-    db.commit()
-    db.refresh(db_issue)
-    
-    new_labels = [label.name for label in db_issue.labels]
-    history = models.IssueHistory(
-        issue_id=issue_id,
-        changed_by_id=current_user.id,
-        change_type='labels_updated',
+    # Labels are part of the issue's representation (and its ETag).
+    db_issue.version = models.Issue.version + 1
+    db_issue.updated_at = datetime.now(timezone.utc)
+    
+    new_labels = [label.name for label in labels]
+    work = uow.UnitOfWork(db, current_user.id)
+    work.record(
+        db_issue,
+        'labels_updated',
         field_name='labels',
         old_value=', '.join(old_labels) if old_labels else 'none',
         new_value=', '.join(new_labels) if new_labels else 'none'
     )
-    db.add(history)
-    db.commit()
+    work.commit()
     
-    return db_issue
+    return loaders.get_issue(db, issue_id)
 
 @api_router.post('/issues/bulk-status', response_model=dict)
-async def bulk_update_status(
+def bulk_update_status(
     bulk_update: schemas.BulkStatusUpdate,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
     try:
-        issues = db.query(models.Issue).filter(models.Issue.id.in_(bulk_update.issue_ids)).all()
-        
-        if len(issues) != len(bulk_update.issue_ids):
-            db.rollback()
-            raise HTTPException(status_code=400, detail='One or more issue IDs are invalid')
-        
-        for issue in issues:
-            old_status = issue.status
-            setattr(issue, 'status', bulk_update.status)
-            setattr(issue, 'version', issue.version + 1)
-            setattr(issue, 'updated_at', datetime.now(timezone.utc))
-            
-            if bulk_update.status in ['resolved', 'closed'] and issue.resolved_at is None:
-                setattr(issue, 'resolved_at', datetime.now(timezone.utc))
-            
-            history = models.IssueHistory(
-                issue_id=issue.id,
-                changed_by_id=current_user.id,
-                change_type='bulk_status_update',
-                field_name='status',
-                old_value=old_status,
-                new_value=bulk_update.status
-            )
-            db.add(history)
-        
+        result = bulk.bulk_update_status(db, bulk_update.issue_ids, bulk_update.status, current_user.id)
+        db.commit()
+        return result
+    except bulk.InvalidIssueIds as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f'Bulk update failed: {str(e)}')
+
+@api_router.post('/issues/bulk', response_model=dict)
+def bulk_mutate_issues(
+    mutation: schemas.BulkMutation,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    try:
+        filters = mutation.filter.model_dump() if mutation.filter else None
+        issue_ids = bulk.resolve_targets(db, mutation.issue_ids, filters)
+        result = bulk.bulk_mutate(
+            db, issue_ids, [operation.model_dump() for operation in mutation.operations], current_user.id
+        )
         db.commit()
-        return {'updated': len(issues), 'status': bulk_update.status}
+        return result
+    except (bulk.InvalidIssueIds, bulk.InvalidBulkOperation) as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         db.rollback()
         raise HTTPException(status_code=500, detail=f'Bulk update failed: {str(e)}')
 
 @api_router.post('/issues/import', response_model=schemas.CSVImportResult)
-async def import_issues_csv(
+def import_issues_csv(
     file: UploadFile = File(...),
+    chunk_size: int = Query(CSV_IMPORT_CHUNK_SIZE, ge=1, le=10000),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
     if not file.filename or not file.filename.endswith('.csv'):
         raise HTTPException(status_code=400, detail='File must be a CSV')
     
-    contents = await file.read()
-    csv_file = io.StringIO(contents.decode('utf-8'))
-    csv_reader = csv.DictReader(csv_file)
-    
-    total_rows = 0
-    successful = 0
-    failed = 0
-    errors = []
+    importer = CSVImporter(db, creator_id=current_user.id, chunk_size=chunk_size)
+    try:
+        result = importer.run(file.file)
+    except UnicodeDecodeError:
+        db.rollback()
+        raise HTTPException(status_code=400, detail='File must be UTF-8 encoded')
     
-    for row_num, row in enumerate(csv_reader, start=2):
-        total_rows += 1
-        try:
-            title = row.get('title', '').strip()
-            if not title:
-                raise ValueError('Title is required')
-            
-            description = row.get('description', '').strip()
-            status = row.get('status', 'open').strip()
-            priority = row.get('priority', 'medium').strip()
-            
-            valid_statuses = ['open', 'in_progress', 'resolved', 'closed']
-            if status not in valid_statuses:
-                raise ValueError(f'Invalid status. Must be one of {valid_statuses}')
-            
-            valid_priorities = ['low', 'medium', 'high', 'critical']
-            if priority not in valid_priorities:
-                raise ValueError(f'Invalid priority. Must be one of {valid_priorities}')
-            
-            assignee_id = None
-            assignee_email = row.get('assignee_email', '').strip()
-            if assignee_email:
-                assignee = db.query(models.User).filter(models.User.email == assignee_email).first()
-                if assignee:
-                    assignee_id = assignee.id
-            
-            db_issue = models.Issue(
-                title=title,
-                description=description if description else None,
-                status=status,
-                priority=priority,
-                creator_id=current_user.id,
-                assignee_id=assignee_id
-            )
-            db.add(db_issue)
-            db.flush()
-            
-            history = models.IssueHistory(
-                issue_id=db_issue.id,
-                changed_by_id=current_user.id,
-                change_type='created',
-                new_value='Issue created via CSV import'
-            )
-            db.add(history)
-            
-            successful += 1
-        except Exception as e:
-            failed += 1
-            errors.append({
-                'row': row_num,
-                'data': row,
-                'error': str(e)
-            })
-    
-    if successful > 0:
+    if importer.successful > 0:
         db.commit()
     else:
         db.rollback()
     
-    return {
-        'total_rows': total_rows,
-        'successful': successful,
-        'failed': failed,
-        'errors': errors
-    }
+    logger.info('CSV import: %d rows in %.2fs (%.1f rows/s)', result['total_rows'], result['elapsed_seconds'], result['rows_per_second'])
+    return result
+
+@api_router.post('/import-jobs', response_model=schemas.ImportJob, status_code=status.HTTP_202_ACCEPTED)
+def create_import_job(
+    file: UploadFile = File(...),
+    chunk_size: int = Query(CSV_IMPORT_CHUNK_SIZE, ge=1, le=10000),
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    if not file.filename or not file.filename.endswith('.csv'):
+        raise HTTPException(status_code=400, detail='File must be a CSV')
+    
+    try:
+        job = import_jobs.create_job(db, file.file, file.filename, current_user.id, chunk_size)
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail='File must be UTF-8 encoded')
+    
+    job_runner.submit(job.id)
+    return import_jobs.job_status(job)
+
+@api_router.get('/import-jobs/{job_id}', response_model=schemas.ImportJob)
+def get_import_job(
+    job_id: str,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_user)
+):
+    job = db.get(models.ImportJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail='Import job not found')
+    return import_jobs.job_status(job)
+
+@api_router.post('/snapshots', response_model=schemas.SnapshotResult, status_code=status.HTTP_201_CREATED)
+def create_snapshot(
+    format: Optional[str] = Query(None, pattern='^(parquet|npz)$'),
+    current_user: models.User = Depends(get_current_user)
+):
+    try:
+        return snapshot.write_snapshot(engine, snapshot_format=format)
+    except snapshot.SnapshotUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
 
-@api_router.get('/issues/{issue_id}/timeline', response_model=List[schemas.IssueHistoryItem])
-async def get_issue_timeline(
+@api_router.get('/issues/{issue_id}/timeline', response_model=Union[List[schemas.IssueHistoryItem], schemas.TimelinePage])
+def get_issue_timeline(
     issue_id: int,
+    change_type: Optional[str] = None,
+    field_name: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description='Keyset cursor; pass an empty value for the first page'),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
-    db_issue = db.query(models.Issue).filter(models.Issue.id == issue_id).first()
-    if not db_issue:
+    if db.query(models.Issue.id).filter(models.Issue.id == issue_id).first() is None:
         raise HTTPException(status_code=404, detail='Issue not found')
     
-    history = db.query(models.IssueHistory).filter(
-        models.IssueHistory.issue_id == issue_id
-    ).order_by(models.IssueHistory.created_at.desc()).all()
+    query = loaders.history_query(db, issue_id)
+    if change_type:
+        query = query.filter(models.IssueHistory.change_type == change_type)
+    if field_name:
+        query = query.filter(models.IssueHistory.field_name == field_name)
+    
+    if cursor is None:
+        query = query.order_by(models.IssueHistory.created_at.desc(), models.IssueHistory.id.desc())
+        live = query.limit(limit).all() if limit else query.all()
+        if limit and len(live) == limit:
+            return live
+        # Archived entries are older than the issue's live rows.
+        return live + history_archive.timeline(
+            db, issue_id, change_type, field_name, limit=limit - len(live) if limit else None
+        )
     
-    return history
+    page_size = limit or 100
+    try:
+        history, next_cursor = pagination.keyset_page(
+            query, models.IssueHistory.created_at, models.IssueHistory.id, cursor, page_size
+        )
+        before = pagination.decode_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail='Invalid cursor')
+    if next_cursor is None:
+        # Live rows are exhausted: continue into the archive, fetching one
+        # extra entry to know whether another page follows.
+        remaining = page_size - len(history)
+        if history:
+            before = (history[-1].created_at, history[-1].id)
+        archived = history_archive.timeline(db, issue_id, change_type, field_name, before, remaining + 1)
+        history = history + archived[:remaining]
+        if len(archived) > remaining:
+            next_cursor = pagination.encode_cursor(history[-1].created_at, history[-1].id)
+    return {'items': history, 'next_cursor': next_cursor}
 
 @api_router.get('/reports/top-assignees', response_model=List[schemas.TopAssignee])
-async def get_top_assignees(
+def get_top_assignees(
     limit: int = Query(10, ge=1, le=50),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    label_id: Optional[int] = None,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
-    results = db.query(
-        models.Issue.assignee_id,
-        func.count(models.Issue.id).label('issue_count'),
-        func.sum(case((models.Issue.status == 'open', 1), else_=0)).label('open'),
-        func.sum(case((models.Issue.status == 'in_progress', 1), else_=0)).label('in_progress'),
-        func.sum(case((models.Issue.status == 'resolved', 1), else_=0)).label('resolved'),
-        func.sum(case((models.Issue.status == 'closed', 1), else_=0)).label('closed')
-    ).filter(
-        models.Issue.assignee_id.isnot(None)
-    ).group_by(
-        models.Issue.assignee_id
-    ).order_by(
-        func.count(models.Issue.id).desc()
-    ).limit(limit).all()
-    
-    top_assignees = []
-    for result in results:
-        assignee = db.query(models.User).filter(models.User.id == result.assignee_id).first()
-        top_assignees.append({
-            'assignee': assignee,
-            'issue_count': result.issue_count,
-            'by_status': {
-                'open': result.open or 0,
-                'in_progress': result.in_progress or 0,
-                'resolved': result.resolved or 0,
-                'closed': result.closed or 0
-            }
-        })
-    
-    return top_assignees
+    return reports.top_assignees(db, limit=limit, since=since, until=until, label_id=label_id)
 
 @api_router.get('/reports/resolution-time', response_model=schemas.ResolutionStats)
-async def get_resolution_time(
+def get_resolution_time(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    assignee_id: Optional[int] = None,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
-    resolved_issues = db.query(models.Issue).filter(
-        models.Issue.resolved_at.isnot(None)
-    ).all()
-    
-    if not resolved_issues:
-        return {
-            'total_resolved': 0,
-            'average_resolution_hours': 0,
-            'by_priority': {}
-        }
-    
-    total_hours = 0
-    priority_stats = {'low': [], 'medium': [], 'high': [], 'critical': []}
-    
-    for issue in resolved_issues:
-        resolution_time = (issue.resolved_at - issue.created_at).total_seconds() / 3600
-        total_hours += resolution_time
-        priority = str(issue.priority)
-        if priority in priority_stats:
-            priority_stats[priority].append(resolution_time)
-    
-    avg_by_priority = {}
-    for priority, times in priority_stats.items():
-        if times:
-            avg_by_priority[priority] = round(sum(times) / len(times), 2)
-        else:
-            avg_by_priority[priority] = 0
-    
-    return {
-        'total_resolved': len(resolved_issues),
-        'average_resolution_hours': round(total_hours / len(resolved_issues), 2),
-        'by_priority': avg_by_priority
-    }
+    return reports.resolution_stats(db, start=start, end=end, assignee_id=assignee_id)
+
+@api_router.get('/reports/summary')
+def get_report_summary(current_user: models.User = Depends(get_current_user)):
+    return report_engine.summary()
 
 @api_router.get('/stats/dashboard')
-async def get_dashboard_stats(
+def get_dashboard_stats(
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ):
-    total_issues = db.query(func.count(models.Issue.id)).scalar()
-    
-    status_counts = db.query(
-        models.Issue.status,
-        func.count(models.Issue.id)
-    ).group_by(models.Issue.status).all()
-    
-    priority_counts = db.query(
-        models.Issue.priority,
-        func.count(models.Issue.id)
-    ).group_by(models.Issue.priority).all()
+    stats = counters.read(db)
+    if not stats['total_issues'] and db.query(models.Issue.id).first() is not None:
+        counters.reconcile(db)
+        db.commit()
+        stats = counters.read(db)
     
-    recent_issues = db.query(models.Issue).order_by(
-        models.Issue.created_at.desc()
-    ).limit(5).all()
+    recent_issues = loaders.recent_issues(db, limit=5)
     
     return {
-        'total_issues': total_issues,
-        'by_status': {status: count for status, count in status_counts},
-        'by_priority': {priority: count for priority, count in priority_counts},
+        **stats,
         'recent_issues': [schemas.Issue.model_validate(issue) for issue in recent_issues]
     }
 
@@ -0,0 +1,260 @@
+"""Columnar snapshots of the issue tables for offline analytics.
+
+Usage: python snapshot.py [--format parquet|npz] [--dir PATH]
+
+Each table is read through Core in chunks straight into typed columns and
+written as Parquet row groups when pyarrow is installed, or as numpy ``.npz``
+parts otherwise. Strings in ``.npz`` parts use Arrow's layout: one utf-8 byte
+buffer plus int64 offsets; nullable columns carry a ``<name>.valid`` mask.
+
+``issue_history`` includes the months moved to ``issue_history_archive``:
+they are decoded and written ahead of the live rows, with ``txid`` 0.
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import DateTime, Integer, Table, select
+from sqlalchemy.engine import Connection, Engine
+
+import database
+import history_archive
+import models
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - depends on the install
+    pa = None
+    pq = None
+
+SNAPSHOT_DIR = os.environ.get('SNAPSHOT_DIR', os.path.join(tempfile.gettempdir(), 'issue_tracker_snapshots'))
+SNAPSHOT_CHUNK_SIZE = int(os.environ.get('SNAPSHOT_CHUNK_SIZE', '50000'))
+
+SNAPSHOT_TABLES: Dict[str, Table] = {
+    'issues': models.Issue.__table__,
+    'issue_history': models.IssueHistory.__table__,
+    'issue_labels': models.issue_labels,
+}
+
+
+def _archived_history(conn: Connection, columns: list, chunk_size: int) -> Iterator[List[tuple]]:
+    """Archived history entries as ``issue_history`` rows, in chunks of about ``chunk_size``."""
+    archive = models.IssueHistoryArchive.__table__
+    result = conn.execution_options(yield_per=max(1, chunk_size // 100)).execute(
+        select(archive.c.issue_id, archive.c.payload).order_by(archive.c.issue_id, archive.c.period_start)
+    )
+    chunk = []
+    for issue_id, payload in result:
+        for entry in history_archive.decode(payload):
+            row = {'txid': 0, **entry, 'issue_id': issue_id}
+            chunk.append(tuple(row[column.name] for column in columns))
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# Rows a table's snapshot carries besides its own, read in the same transaction.
+EXTRA_ROWS: Dict[str, Callable[[Connection, list, int], Iterator[List[tuple]]]] = {
+    'issue_history': _archived_history,
+}
+
+
+class SnapshotUnavailable(Exception):
+    pass
+
+
+def default_format() -> str:
+    return 'parquet' if pa is not None else 'npz'
+
+
+def _kind(column) -> str:
+    if isinstance(column.type, Integer):
+        return 'int'
+    if isinstance(column.type, DateTime):
+        return 'datetime'
+    return 'string'
+
+
+def _utc(value: Optional[datetime]) -> Optional[datetime]:
+    # SQLite hands back naive datetimes that were written as UTC.
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _numpy_columns(name: str, kind: str, values: tuple) -> Dict[str, np.ndarray]:
+    valid = np.fromiter((value is not None for value in values), dtype=bool, count=len(values))
+    if kind == 'int':
+        data = np.fromiter((value or 0 for value in values), dtype=np.int64, count=len(values))
+        arrays = {name: data}
+    elif kind == 'datetime':
+        arrays = {name: np.array([_utc(value) for value in values], dtype='datetime64[us]')}
+    else:
+        encoded = [value.encode('utf-8') if value is not None else b'' for value in values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(value) for value in encoded], out=offsets[1:])
+        arrays = {
+            f'{name}.data': np.frombuffer(b''.join(encoded), dtype=np.uint8),
+            f'{name}.offsets': offsets,
+        }
+    if not valid.all():
+        arrays[f'{name}.valid'] = valid
+    return arrays
+
+
+class NpzWriter:
+    def __init__(self, path: str, columns: list):
+        self.path = path
+        self.columns = columns
+        self.parts = 0
+        os.makedirs(path, exist_ok=True)
+
+    def write(self, values: List[tuple]):
+        arrays = {}
+        for column, column_values in zip(self.columns, values):
+            arrays.update(_numpy_columns(column.name, _kind(column), column_values))
+        np.savez_compressed(os.path.join(self.path, f'part-{self.parts:05d}.npz'), **arrays)
+        self.parts += 1
+
+    def close(self):
+        pass
+
+
+class ParquetWriter:
+    def __init__(self, path: str, columns: list):
+        self.path = f'{path}.parquet'
+        self.columns = columns
+        self.schema = pa.schema([(column.name, self._arrow_type(column)) for column in columns])
+        self._writer = pq.ParquetWriter(self.path, self.schema, compression='zstd')
+
+    @staticmethod
+    def _arrow_type(column):
+        kind = _kind(column)
+        if kind == 'int':
+            return pa.int64()
+        if kind == 'datetime':
+            return pa.timestamp('us', tz='UTC')
+        return pa.string()
+
+    def write(self, values: List[tuple]):
+        arrays = [
+            pa.array([_utc(value) for value in column_values] if _kind(column) == 'datetime' else column_values, type=field.type)
+            for column, field, column_values in zip(self.columns, self.schema, values)
+        ]
+        self._writer.write_table(pa.Table.from_arrays(arrays, schema=self.schema))
+
+    def close(self):
+        self._writer.close()
+
+
+WRITERS = {'npz': NpzWriter, 'parquet': ParquetWriter}
+
+
+def write_snapshot(
+    engine: Engine,
+    directory: str = SNAPSHOT_DIR,
+    snapshot_format: Optional[str] = None,
+    chunk_size: int = SNAPSHOT_CHUNK_SIZE,
+) -> dict:
+    """Dump every snapshot table into a new directory and return its manifest."""
+    snapshot_format = snapshot_format or default_format()
+    if snapshot_format not in WRITERS:
+        raise ValueError(f'Unknown snapshot format {snapshot_format!r}')
+    if snapshot_format == 'parquet' and pa is None:
+        raise SnapshotUnavailable('Parquet snapshots need pyarrow; use the npz format')
+
+    started = time.perf_counter()
+    created_at = datetime.now(timezone.utc)
+    path = os.path.join(directory, created_at.strftime('%Y%m%dT%H%M%S%fZ'))
+    os.makedirs(path)
+
+    tables = {}
+    options = {'isolation_level': 'REPEATABLE READ'} if engine.dialect.name == 'postgresql' else {}
+    # One transaction for every table, so the files agree with each other.
+    with engine.connect().execution_options(**options) as conn:
+        for name, table in SNAPSHOT_TABLES.items():
+            columns = list(table.columns)
+            writer = WRITERS[snapshot_format](os.path.join(path, name), columns)
+            rows = 0
+            if name in EXTRA_ROWS:
+                for chunk in EXTRA_ROWS[name](conn, columns, chunk_size):
+                    writer.write(list(zip(*chunk)))
+                    rows += len(chunk)
+            result = conn.execution_options(yield_per=chunk_size).execute(select(table))
+            for chunk in result.partitions():
+                writer.write(list(zip(*chunk)))
+                rows += len(chunk)
+            writer.close()
+            tables[name] = {
+                'rows': rows,
+                'columns': {column.name: _kind(column) for column in columns},
+            }
+
+    manifest = {
+        'format': snapshot_format,
+        'path': path,
+        'created_at': created_at.isoformat(),
+        'tables': tables,
+        'elapsed_seconds': round(time.perf_counter() - started, 3),
+    }
+    with open(os.path.join(path, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def read_table(path: str, name: str) -> pd.DataFrame:
+    """Load one table of a snapshot directory into a DataFrame."""
+    with open(os.path.join(path, 'manifest.json')) as f:
+        manifest = json.load(f)
+    kinds = manifest['tables'][name]['columns']
+    if manifest['format'] == 'parquet':
+        return pd.read_parquet(os.path.join(path, f'{name}.parquet'))
+
+    frames = []
+    table_dir = os.path.join(path, name)
+    for part in sorted(os.listdir(table_dir)):
+        with np.load(os.path.join(table_dir, part)) as arrays:
+            frame = {}
+            for column, kind in kinds.items():
+                valid = arrays[f'{column}.valid'] if f'{column}.valid' in arrays else None
+                if kind == 'string':
+                    data, offsets = arrays[f'{column}.data'].tobytes(), arrays[f'{column}.offsets']
+                    values = pd.array(
+                        [data[start:end].decode('utf-8') for start, end in zip(offsets[:-1], offsets[1:])],
+                        dtype='string',
+                    )
+                elif kind == 'int':
+                    values = pd.array(arrays[column], dtype='Int64')
+                else:
+                    values = pd.to_datetime(arrays[column], utc=True)
+                if valid is not None and kind != 'datetime':
+                    values[~valid] = pd.NA
+                frame[column] = values
+            frames.append(pd.DataFrame(frame))
+    if not frames:
+        return pd.DataFrame({column: [] for column in kinds})
+    return pd.concat(frames, ignore_index=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Write a columnar snapshot of the issue tables.')
+    parser.add_argument('--format', choices=sorted(WRITERS), default=None)
+    parser.add_argument('--dir', default=SNAPSHOT_DIR)
+    parser.add_argument('--chunk-size', type=int, default=SNAPSHOT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    manifest = write_snapshot(database.engine, args.dir, args.format, args.chunk_size)
+    print(json.dumps(manifest, indent=2))
+
+
+if __name__ == '__main__':
+    main()
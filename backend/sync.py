@@ -0,0 +1,225 @@
+"""Incremental sync over ``issue_history``.
+
+A watermark is a position in the history log, ``(txid, id)``. On Postgres
+every history row carries its writing transaction's id and only rows of
+transactions older than the oldest one still running are read
+(``pg_snapshot_xmin``): that prefix is complete and never grows, however long
+a bulk write or import runs, so a watermark never moves past a row that
+commits later. SQLite serializes writers, so ids already follow commit order;
+there ``txid`` is 0 and rows younger than ``SYNC_SETTLE_SECONDS`` end the
+scan as a guard for clock-stamped writes still in flight.
+
+A full sync (no watermark) cannot replay the log, part of which may have
+been archived, so it pages through ``issues`` by id instead. The history
+position captured when it starts is handed over with the last page; from
+there the client follows the log like any other.
+"""
+import base64
+import os
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+from sqlalchemy import func, select, text, tuple_
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+import history_archive
+import loaders
+import models
+
+SYNC_PAGE_SIZE = int(os.environ.get('SYNC_PAGE_SIZE', '100'))
+# Upper bound on history rows read per call, however many issues they touch.
+SYNC_SCAN_LIMIT = int(os.environ.get('SYNC_SCAN_LIMIT', '5000'))
+SYNC_SETTLE_SECONDS = float(os.environ.get('SYNC_SETTLE_SECONDS', '5'))
+
+HISTORY_PREFIX = 'h2'
+# Full sync in progress: last issue id sent, then the history position to resume from.
+BOOTSTRAP_PREFIX = 'i1'
+
+POSTGRES_DDL = [
+    'ALTER TABLE issue_history ALTER COLUMN txid SET DEFAULT pg_current_xact_id()::text::bigint',
+]
+
+Position = Tuple[int, int]
+
+
+class WatermarkExpired(Exception):
+    """History after the watermark has been archived, so the changes since it can no longer be listed."""
+
+
+def install(engine: Engine) -> bool:
+    """Stamp history rows with their transaction id; returns False where ids already follow commit order."""
+    if engine.dialect.name != 'postgresql':
+        return False
+    with engine.begin() as conn:
+        for statement in POSTGRES_DDL:
+            conn.execute(text(statement))
+    return True
+
+
+def _encode(prefix: str, *numbers: int) -> str:
+    token = ':'.join([prefix, *map(str, numbers)])
+    return base64.urlsafe_b64encode(token.encode('ascii')).decode('ascii').rstrip('=')
+
+
+def _decode(watermark: str) -> Tuple[str, Tuple[int, ...]]:
+    try:
+        padded = watermark + '=' * (-len(watermark) % 4)
+        prefix, *parts = base64.urlsafe_b64decode(padded.encode('ascii')).decode('ascii').split(':')
+    except (ValueError, UnicodeError) as e:
+        raise ValueError('Invalid watermark') from e
+    expected = {HISTORY_PREFIX: 2, BOOTSTRAP_PREFIX: 3}.get(prefix)
+    if expected != len(parts) or not all(part.isdigit() for part in parts):
+        raise ValueError('Invalid watermark')
+    return prefix, tuple(int(part) for part in parts)
+
+
+def encode_watermark(history_id: int, txid: int = 0) -> str:
+    return _encode(HISTORY_PREFIX, txid, history_id)
+
+
+def decode_watermark(watermark: Optional[str]) -> Position:
+    """Return the ``(txid, history id)`` of a history watermark; empty means the start of the log."""
+    if not watermark:
+        return 0, 0
+    prefix, numbers = _decode(watermark)
+    if prefix != HISTORY_PREFIX:
+        raise ValueError('Invalid watermark')
+    return numbers
+
+
+def _utc(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+
+def oldest_running_txid(db: Session) -> Optional[int]:
+    """Transactions below this id have all finished; None where history carries no transaction ids."""
+    if db.get_bind().dialect.name != 'postgresql':
+        return None
+    return db.execute(text('SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint')).scalar()
+
+
+def history_after(
+    db: Session,
+    after: Position,
+    scan_limit: int,
+    now: Optional[datetime] = None,
+    xmin: Optional[int] = None,
+) -> Tuple[List[tuple], bool]:
+    """Visible ``(txid, id, issue_id)`` rows after ``after`` in log order, and whether more may follow."""
+    history = models.IssueHistory
+    if xmin is None:
+        xmin = oldest_running_txid(db)
+    if xmin is not None:
+        rows = db.execute(
+            select(history.txid, history.id, history.issue_id)
+            .where(tuple_(history.txid, history.id) > tuple_(*after), history.txid < xmin)
+            .order_by(history.txid, history.id)
+            .limit(scan_limit)
+        ).all()
+        return [tuple(row) for row in rows], len(rows) == scan_limit
+
+    settled_before = (now or datetime.now(timezone.utc)) - timedelta(seconds=SYNC_SETTLE_SECONDS)
+    rows = db.execute(
+        select(history.id, history.issue_id, history.created_at)
+        .where(history.id > after[1])
+        .order_by(history.id)
+        .limit(scan_limit)
+    ).all()
+    visible = []
+    for history_id, issue_id, created_at in rows:
+        # Stop at the first unsettled row rather than skipping past it.
+        if _utc(created_at) > settled_before:
+            return visible, False
+        visible.append((0, history_id, issue_id))
+    return visible, len(rows) == scan_limit
+
+
+def history_head(db: Session, now: Optional[datetime] = None) -> Position:
+    """The last position that ``history_after`` would currently read up to, never behind the archive."""
+    history = models.IssueHistory
+    archived = history_archive.archived_through(db)
+    xmin = oldest_running_txid(db)
+    if xmin is not None:
+        row = db.execute(
+            select(history.txid, history.id)
+            .where(history.txid < xmin)
+            .order_by(history.txid.desc(), history.id.desc())
+            .limit(1)
+        ).first()
+        txid, history_id = row if row else (0, 0)
+        return txid, max(history_id, archived)
+
+    settled_before = (now or datetime.now(timezone.utc)) - timedelta(seconds=SYNC_SETTLE_SECONDS)
+    first_unsettled = db.execute(
+        select(func.min(history.id)).where(history.created_at > settled_before)
+    ).scalar()
+    if first_unsettled is not None:
+        history_id = first_unsettled - 1
+    else:
+        history_id = db.execute(select(func.max(history.id))).scalar() or 0
+    return 0, max(history_id, archived)
+
+
+def bootstrap(db: Session, after_issue_id: int, head: Position, limit: int) -> dict:
+    """One page of a full sync: every issue by id, then the history watermark captured at the start."""
+    issues = (
+        loaders.issue_query(db)
+        .filter(models.Issue.id > after_issue_id)
+        .order_by(models.Issue.id)
+        .limit(limit + 1)
+        .all()
+    )
+    if len(issues) > limit:
+        issues = issues[:limit]
+        watermark = _encode(BOOTSTRAP_PREFIX, issues[-1].id, *head)
+    else:
+        # Changes made while paging are after ``head``; the next call picks them up.
+        watermark = encode_watermark(head[1], head[0])
+    return {'issues': issues, 'deleted_ids': [], 'watermark': watermark, 'has_more': True}
+
+
+def changes_since(
+    db: Session,
+    watermark: Optional[str],
+    limit: int = SYNC_PAGE_SIZE,
+    scan_limit: int = SYNC_SCAN_LIMIT,
+    now: Optional[datetime] = None,
+) -> dict:
+    """Issues touched by history rows after ``watermark``, at most ``limit`` of them.
+
+    Without a watermark this starts a full sync. The returned watermark is
+    the position reached; a client repeats the call with it until
+    ``has_more`` is false.
+    """
+    if not watermark:
+        return bootstrap(db, 0, history_head(db, now), limit)
+    prefix, numbers = _decode(watermark)
+    if prefix == BOOTSTRAP_PREFIX:
+        return bootstrap(db, numbers[0], numbers[1:], limit)
+
+    after = numbers
+    if after[1] < history_archive.archived_through(db):
+        raise WatermarkExpired(watermark)
+    rows, has_more = history_after(db, after, scan_limit, now)
+
+    issue_ids = []
+    seen = set()
+    position = after
+    for txid, history_id, issue_id in rows:
+        if issue_id not in seen:
+            if len(issue_ids) == limit:
+                has_more = True
+                break
+            seen.add(issue_id)
+            issue_ids.append(issue_id)
+        position = (txid, history_id)
+
+    issues = loaders.load_issues(db, issue_ids)
+    loaded = {issue.id for issue in issues}
+    return {
+        'issues': issues,
+        'deleted_ids': [issue_id for issue_id in issue_ids if issue_id not in loaded],
+        'watermark': encode_watermark(position[1], position[0]),
+        'has_more': has_more,
+    }
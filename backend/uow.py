@@ -0,0 +1,75 @@
+"""Unit of work for request handlers.
+
+A handler stages its entity changes on the session as usual and describes
+the history they imply with ``record``. ``commit`` flushes the entities,
+writes every history row with one executemany insert, queues the matching
+change events on the session (published by ``events`` after commit) and
+commits once, so an issue never exists without its history.
+"""
+from collections import defaultdict
+from typing import List, Optional, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+import events
+import models
+
+
+class UnitOfWork:
+    def __init__(self, session: Session, changed_by_id: Optional[int]):
+        self.session = session
+        self.changed_by_id = changed_by_id
+        self._history: List[Tuple[models.Issue, dict]] = []
+
+    def record(
+        self,
+        issue: models.Issue,
+        change_type: str,
+        field_name: Optional[str] = None,
+        old_value: Optional[str] = None,
+        new_value: Optional[str] = None,
+    ):
+        """Queue a history row; ``issue`` may still be pending, its id is read at commit."""
+        self._history.append((issue, {
+            'change_type': change_type,
+            'field_name': field_name,
+            'old_value': old_value,
+            'new_value': new_value,
+        }))
+
+    def flush(self) -> int:
+        """Write the staged entities and queued history without committing; returns the rows written."""
+        self.session.flush()
+        history, self._history = self._history, []
+        if not history:
+            return 0
+        rows = [
+            {'issue_id': issue.id, 'changed_by_id': self.changed_by_id, **fields}
+            for issue, fields in history
+        ]
+        # The table, not the mapper: ORM bulk inserts drop None keys and split
+        # rows with different null columns into separate statements.
+        self.session.execute(insert(models.IssueHistory.__table__), rows)
+        if events.broker.has_subscribers:
+            changed = defaultdict(list)
+            for row in rows:
+                changed[row['issue_id']].append((row['field_name'], row['old_value']))
+            events.record(self.session, [
+                events.make_event(
+                    row['issue_id'],
+                    row['change_type'],
+                    events.snapshot(issue),
+                    previous=events.previous_values(events.snapshot(issue), changed[row['issue_id']]),
+                    field_name=row['field_name'],
+                    old_value=row['old_value'],
+                    new_value=row['new_value'],
+                    changed_by_id=self.changed_by_id,
+                )
+                for (issue, _), row in zip(history, rows)
+            ])
+        return len(rows)
+
+    def commit(self):
+        self.flush()
+        self.session.commit()
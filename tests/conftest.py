@@ -0,0 +1,98 @@
+import os
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / 'backend'
+sys.path.insert(0, str(BACKEND_DIR))
+os.environ.setdefault('DATABASE_URL_LOCAL', 'sqlite://')
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from database import Base
+import models
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine(
+        'sqlite://',
+        connect_args={'check_same_thread': False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(engine):
+    session = sessionmaker(bind=engine, autocommit=False, autoflush=False)()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def user(db):
+    db_user = models.User(
+        email='owner@example.com',
+        username='owner',
+        hashed_password='x',
+        full_name='Owner',
+    )
+    db.add(db_user)
+    db.commit()
+    return db_user
+
+
+class QueryCounter:
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = []
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._record)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self._record)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+
+@pytest.fixture
+def count_queries(engine):
+    return lambda: QueryCounter(engine)
+
+
+@pytest.fixture
+def client(engine, db, user):
+    """The API on the test engine, authenticated as ``user``; startup hooks are not run."""
+    from fastapi.testclient import TestClient
+
+    import server
+
+    session_factory = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+
+    def get_db():
+        session = session_factory()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    def current_user():
+        db.refresh(user)
+        return user
+
+    server.app.dependency_overrides[server.get_db] = get_db
+    server.app.dependency_overrides[server.get_current_user] = current_user
+    yield TestClient(server.app)
+    server.app.dependency_overrides.clear()
@@ -0,0 +1,97 @@
+import pytest
+
+import bulk
+import models
+
+
+def _issues(db, user, count, status='open'):
+    issues = [models.Issue(title=f'Issue {i}', status=status, creator_id=user.id) for i in range(count)]
+    db.add_all(issues)
+    db.commit()
+    return [issue.id for issue in issues]
+
+
+def test_bulk_status_uses_a_fixed_number_of_statements(db, user, count_queries, monkeypatch):
+    monkeypatch.setattr(bulk, 'BULK_CHUNK_SIZE', 1000)
+    ids = _issues(db, user, 50)
+    user_id = user.id
+
+    with count_queries() as counter:
+        result = bulk.bulk_update_status(db, ids, 'closed', user_id)
+    db.commit()
+
+    # count, old-status breakdown, history, update, and one upsert per touched counter
+    assert counter.count == 6
+    assert result['statements'] == 5
+    assert result['updated'] == 50
+    issues = db.query(models.Issue).all()
+    assert {(i.status, i.version) for i in issues} == {('closed', 2)}
+    assert all(i.resolved_at is not None for i in issues)
+    history = db.query(models.IssueHistory).all()
+    assert len(history) == 50
+    assert {(h.old_value, h.new_value, h.change_type) for h in history} == {('open', 'closed', 'bulk_status_update')}
+
+
+def test_bulk_status_splits_large_id_lists_into_chunks(db, user, count_queries, monkeypatch):
+    monkeypatch.setattr(bulk, 'BULK_CHUNK_SIZE', 20)
+    ids = _issues(db, user, 50)
+    user_id = user.id
+
+    with count_queries() as counter:
+        result = bulk.bulk_update_status(db, ids, 'resolved', user_id)
+    db.commit()
+
+    # Three chunks: a count each to validate, then old-status breakdown, history
+    # and update each, plus one upsert per touched counter.
+    assert counter.count == 3 + 3 * 3 + 2
+    assert result['statements'] == 3 * 3 + 2
+    assert result['updated'] == 50
+    assert {(i.status, i.version) for i in db.query(models.Issue)} == {('resolved', 2)}
+    assert db.query(models.IssueHistory).filter(models.IssueHistory.change_type == 'bulk_status_update').count() == 50
+
+
+def test_bulk_status_rejects_unknown_ids_without_writing(db, user):
+    ids = _issues(db, user, 2)
+
+    with pytest.raises(bulk.InvalidIssueIds):
+        bulk.bulk_update_status(db, ids + [999], 'closed', user.id)
+
+    assert db.query(models.IssueHistory).count() == 0
+    assert {status for (status,) in db.query(models.Issue.status)} == {'open'}
+
+
+def test_bulk_mutate_applies_fields_and_labels_in_one_pass(db, user, count_queries):
+    ids = _issues(db, user, 4)
+    bug, ui = models.Label(name='bug'), models.Label(name='ui')
+    db.add_all([bug, ui])
+    db.commit()
+    user_id, bug_id, ui_id = user.id, bug.id, ui.id
+
+    with count_queries() as counter:
+        result = bulk.bulk_mutate(db, ids, [
+            {'op': 'set_priority', 'value': 'high'},
+            {'op': 'assign', 'value': user_id},
+            {'op': 'set_labels', 'value': [bug_id, ui_id]},
+        ], user_id)
+    db.commit()
+
+    assert result['statements'] == 9
+    assert counter.count <= result['statements'] + 2
+    issues = db.query(models.Issue).all()
+    assert {(i.priority, i.assignee_id, i.version) for i in issues} == {('high', user_id, 2)}
+    assert all(sorted(label.name for label in i.labels) == ['bug', 'ui'] for i in issues)
+    assert db.query(models.IssueHistory).filter(models.IssueHistory.change_type == 'bulk_labels_update').count() == 4
+
+
+def test_resolve_targets_from_filter(db, user):
+    _issues(db, user, 2, status='open')
+    closed = _issues(db, user, 3, status='closed')
+
+    assert bulk.resolve_targets(db, filters={'status': 'closed', 'priority': None}) == closed
+
+
+def test_bulk_mutate_rejects_unknown_labels(db, user):
+    ids = _issues(db, user, 1)
+
+    with pytest.raises(bulk.InvalidBulkOperation):
+        bulk.bulk_mutate(db, ids, [{'op': 'add_labels', 'value': [42]}], user.id)
@@ -0,0 +1,39 @@
+import io
+
+import bulk
+import counters
+import models
+from csv_import import CSVImporter
+
+
+def test_counters_follow_creates_imports_and_bulk_updates(db, user):
+    db.add(models.Issue(title='Manual', status='open', priority='high', creator_id=user.id))
+    counters.apply(db, counters.issue_deltas('open', 'high'))
+    db.commit()
+
+    csv_data = 'title,status,priority\nA,open,low\nB,closed,low\n'
+    CSVImporter(db, creator_id=user.id).run(io.BytesIO(csv_data.encode()))
+    db.commit()
+
+    open_ids = [issue_id for (issue_id,) in db.query(models.Issue.id).filter(models.Issue.status == 'open')]
+    bulk.bulk_update_status(db, open_ids, 'resolved', user.id)
+    db.commit()
+
+    assert counters.read(db) == {
+        'total_issues': 3,
+        'by_status': {'resolved': 2, 'closed': 1},
+        'by_priority': {'high': 1, 'low': 2},
+    }
+    assert counters.reconcile(db) == {}
+
+
+def test_reconcile_repairs_drift(db, user):
+    db.add(models.Issue(title='Untracked', status='open', priority='low', creator_id=user.id))
+    counters.apply(db, counters.issue_deltas('closed', 'low'))
+    db.commit()
+
+    drift = counters.reconcile(db)
+    db.commit()
+
+    assert drift == {('status', 'open'): 1, ('status', 'closed'): -1}
+    assert counters.read(db)['by_status'] == {'open': 1}
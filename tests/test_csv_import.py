@@ -0,0 +1,42 @@
+import io
+
+import models
+from csv_import import CSVImporter
+
+HEADER = 'title,description,status,priority,assignee_email\n'
+
+
+def _csv(lines):
+    return io.BytesIO((HEADER + '\n'.join(lines) + '\n').encode('utf-8'))
+
+
+def test_import_writes_issues_and_history_in_chunks(db, user):
+    rows = [f'Issue {i},,open,low,owner@example.com' for i in range(5)] + ['Broken,,open,urgent,']
+
+    result = CSVImporter(db, creator_id=user.id, chunk_size=2).run(_csv(rows))
+    db.commit()
+
+    assert (result['total_rows'], result['successful'], result['failed']) == (6, 5, 1)
+    assert result['errors'][0]['row'] == 7
+    assert db.query(models.Issue).filter(models.Issue.assignee_id == user.id).count() == 5
+    assert db.query(models.IssueHistory).filter(models.IssueHistory.change_type == 'created').count() == 5
+
+
+def test_assignee_emails_are_looked_up_once(db, user, count_queries):
+    rows = [f'Issue {i},,open,low,owner@example.com' for i in range(10)]
+    importer = CSVImporter(db, creator_id=user.id, chunk_size=3)
+
+    with count_queries() as counter:
+        importer.run(_csv(rows))
+
+    lookups = [s for s in counter.statements if s.lstrip().upper().startswith('SELECT')]
+    assert len(lookups) == 1
+
+
+def test_skip_rows_resumes_after_committed_rows(db, user):
+    rows = [f'Issue {i},,open,low,' for i in range(4)]
+
+    result = CSVImporter(db, creator_id=user.id).run(_csv(rows), skip_rows=3)
+
+    assert result['total_rows'] == 1
+    assert db.query(models.Issue.title).scalar() == 'Issue 3'
@@ -0,0 +1,102 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import update
+from sqlalchemy.orm import sessionmaker
+
+import counters
+import etags
+import models
+
+
+def test_issue_etag_tracks_version_and_comments(db, user):
+    issue = models.Issue(title='Polling target', creator_id=user.id)
+    db.add(issue)
+    db.commit()
+
+    first = etags.issue_etag(db, issue.id)
+    assert first == etags.issue_etag(db, issue.id)
+    assert first != etags.issue_etag(db, issue.id, 'fields')
+    assert etags.issue_etag(db, issue.id + 1) is None
+
+    db.add(models.Comment(body='ping', issue_id=issue.id, author_id=user.id))
+    db.commit()
+    second = etags.issue_etag(db, issue.id)
+    assert second != first
+
+    issue.version += 1
+    db.commit()
+    assert etags.issue_etag(db, issue.id) != second
+
+
+def test_list_etag_tracks_filters_and_writes(db, user):
+    db.add(models.Issue(title='One', creator_id=user.id))
+    db.commit()
+
+    open_etag = etags.issues_etag(db, {'status': 'open'}, 0, 50)
+    assert open_etag != etags.issues_etag(db, {'status': 'closed'}, 0, 50)
+    assert open_etag != etags.issues_etag(db, {'status': 'open'}, 50, 50)
+
+    db.add(models.Issue(title='Two', creator_id=user.id))
+    db.commit()
+    assert etags.issues_etag(db, {'status': 'open'}, 0, 50) != open_etag
+
+
+def test_list_etag_is_one_statement_and_tracks_deletes(db, user, count_queries):
+    issue = models.Issue(title='Doomed', creator_id=user.id)
+    db.add(issue)
+    db.commit()
+
+    with count_queries() as counter:
+        before = etags.issues_etag(db, {}, 0, 50)
+    assert counter.count == 1
+
+    db.delete(issue)
+    db.commit()
+    assert etags.issues_etag(db, {}, 0, 50) != before
+
+
+def test_list_etag_changes_when_an_older_write_commits_last(engine, db, user):
+    issue = models.Issue(title='Contended', creator_id=user.id)
+    db.add(issue)
+    db.commit()
+    issue_id = issue.id
+    started = datetime.now(timezone.utc) - timedelta(minutes=1)
+
+    # A fast write commits first with the newest updated_at.
+    fast = sessionmaker(bind=engine)()
+    fast.add(models.Issue(title='Fast', creator_id=user.id, updated_at=datetime.now(timezone.utc)))
+    fast.commit()
+    fast.close()
+    seen = etags.issues_etag(db, {}, 0, 50)
+
+    # A slow bulk write stamped when it started commits afterwards.
+    slow = sessionmaker(bind=engine)()
+    slow.execute(update(models.Issue).where(models.Issue.id == issue_id).values(status='closed', updated_at=started))
+    slow.commit()
+    slow.close()
+    after_slow = etags.issues_etag(db, {}, 0, 50)
+    assert after_slow != seen
+
+    # Embedded creator data is part of the list too.
+    user.full_name = 'Renamed'
+    db.commit()
+    assert etags.issues_etag(db, {}, 0, 50) != after_slow
+
+
+def test_reconcile_keeps_the_change_token(db, user):
+    db.add(models.Issue(title='Counted', creator_id=user.id))
+    db.commit()
+    before = etags.issues_etag(db, {}, 0, 50)
+    counters.reconcile(db)
+    db.commit()
+    assert etags.issues_etag(db, {}, 0, 50) == before
+    assert 'by_changes' not in counters.read(db)
+
+
+def test_if_none_match_parsing():
+    etag = etags.make_etag('x')
+    assert etags.matches(etag, etag)
+    assert etags.matches(f'"other", W/{etag}', etag)
+    assert etags.matches('*', etag)
+    assert not etags.matches(None, etag)
+    assert not etags.matches('"other"', etag)
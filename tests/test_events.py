@@ -0,0 +1,122 @@
+import asyncio
+import threading
+
+import bulk
+import events
+import models
+import uow
+
+
+def _run(db, user, subscribe, write, settle=0.05):
+    """Subscribe on a fresh loop, run ``write`` on another thread, return what was delivered."""
+    async def scenario():
+        subscriptions = [events.broker.subscribe(**kwargs) for kwargs in subscribe]
+        try:
+            writer = threading.Thread(target=write)
+            writer.start()
+            await asyncio.get_running_loop().run_in_executor(None, writer.join)
+            await asyncio.sleep(settle)
+            return [
+                [subscription.queue.get_nowait() for _ in range(subscription.queue.qsize())]
+                for subscription in subscriptions
+            ], subscriptions
+        finally:
+            for subscription in subscriptions:
+                events.broker.unsubscribe(subscription)
+    return asyncio.run(scenario())
+
+
+def test_history_writes_are_published_after_commit(db, user):
+    issue = models.Issue(title='Watched', creator_id=user.id)
+    other = models.Issue(title='Ignored', creator_id=user.id, priority='low')
+    db.add_all([issue, other])
+    db.commit()
+    issue_id, other_id, user_id = issue.id, other.id, user.id
+
+    def write():
+        issue.status = 'in_progress'
+        db.add(models.IssueHistory(issue_id=issue_id, changed_by_id=user_id, change_type='updated', field_name='status', new_value='in_progress'))
+        db.add(models.IssueHistory(issue_id=other_id, changed_by_id=user_id, change_type='comment_added'))
+        db.commit()
+        db.add(models.IssueHistory(issue_id=issue_id, change_type='updated'))
+        db.rollback()
+
+    (by_issue, by_filter, everything), _ = _run(db, user, [
+        {'issue_id': issue_id},
+        {'filters': {'status': 'in_progress'}},
+        {},
+    ], write)
+
+    assert [(change['issue_id'], change['kind']) for change in by_issue] == [(issue_id, 'issue')]
+    assert by_issue[0]['issue']['status'] == 'in_progress'
+    assert [change['issue_id'] for change in by_filter] == [issue_id]
+    assert sorted(change['kind'] for change in everything) == ['comment', 'issue']
+
+
+def test_bulk_writes_publish_events(db, user):
+    issues = [models.Issue(title=f'Bulk {i}', creator_id=user.id) for i in range(3)]
+    db.add_all(issues)
+    db.commit()
+    issue_ids, user_id = [issue.id for issue in issues], user.id
+
+    def write():
+        bulk.bulk_update_status(db, issue_ids, 'closed', user_id)
+        db.commit()
+
+    (closed,), _ = _run(db, user, [{'filters': {'status': 'closed'}}], write)
+    assert sorted(change['issue_id'] for change in closed) == issue_ids
+    assert {change['change_type'] for change in closed} == {'bulk_status_update'}
+
+
+def test_slow_subscriber_is_marked_lagged_instead_of_blocking(db, user):
+    issue = models.Issue(title='Noisy', creator_id=user.id)
+    db.add(issue)
+    db.commit()
+    issue_id = issue.id
+    original = events.broker.maxsize
+    events.broker.maxsize = 2
+
+    def write():
+        for i in range(5):
+            db.add(models.IssueHistory(issue_id=issue_id, change_type='updated', new_value=str(i)))
+            db.commit()
+
+    try:
+        (delivered,), (subscription,) = _run(db, user, [{}], write)
+    finally:
+        events.broker.maxsize = original
+    assert subscription.lagged
+    assert len(delivered) <= 2
+    assert subscription.dropped + len(delivered) == 5
+
+
+def test_issues_leaving_a_filter_are_published(db, user):
+    edited = models.Issue(title='Closed by hand', creator_id=user.id, status='open', priority='high')
+    bulked = [models.Issue(title=f'Closed in bulk {i}', creator_id=user.id, status='open') for i in range(2)]
+    untouched = models.Issue(title='Already closed', creator_id=user.id, status='closed')
+    db.add_all([edited, *bulked, untouched])
+    db.commit()
+    edited_id, bulk_ids, untouched_id, user_id = edited.id, [issue.id for issue in bulked], untouched.id, user.id
+
+    def write():
+        work = uow.UnitOfWork(db, user_id)
+        edited.status = 'closed'
+        work.record(edited, 'updated', field_name='status', old_value='open', new_value='closed')
+        edited.priority = 'low'
+        work.record(edited, 'updated', field_name='priority', old_value='high', new_value='low')
+        work.commit()
+        bulk.bulk_update_status(db, bulk_ids + [untouched_id], 'resolved', user_id)
+        db.commit()
+
+    (open_high, open_only), _ = _run(db, user, [
+        {'filters': {'status': 'open', 'priority': 'high'}},
+        {'filters': {'status': 'open'}},
+    ], write)
+
+    # Neither change alone left the issue open and high; both events show where it went.
+    assert [change['issue_id'] for change in open_high] == [edited_id, edited_id]
+    assert open_high[0]['issue']['status'] == 'closed'
+    assert open_high[0]['previous'] == {'status': 'open', 'priority': 'high', 'assignee_id': None}
+    bulk_changes = [change for change in open_only if change['change_type'] == 'bulk_status_update']
+    assert sorted(change['issue_id'] for change in bulk_changes) == bulk_ids
+    assert all(change['issue']['status'] == 'resolved' for change in bulk_changes)
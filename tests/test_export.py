@@ -0,0 +1,49 @@
+import csv
+import io
+import json
+
+from sqlalchemy.orm import sessionmaker
+
+import export
+import models
+
+
+def _seed(db, user):
+    bug = models.Label(name='bug', color='#ff0000')
+    first = models.Issue(title='First', creator_id=user.id, assignee_id=user.id, labels=[bug])
+    second = models.Issue(title='Second', status='closed', creator_id=user.id)
+    db.add_all([first, second])
+    db.flush()
+    db.add(models.IssueHistory(issue_id=first.id, changed_by_id=user.id, change_type='created', new_value='Issue created'))
+    db.commit()
+    return first.id, second.id
+
+
+def test_ndjson_export_streams_batches_with_labels_and_history(engine, db, user, count_queries):
+    first_id, second_id = _seed(db, user)
+    session_factory = sessionmaker(bind=engine)
+
+    with count_queries() as counter:
+        chunks = list(export.stream_export(session_factory, 'ndjson', include=('labels', 'history'), batch_size=1))
+    # One streaming SELECT plus labels, history and archived history queries per batch.
+    assert counter.count == 7
+    assert len(chunks) == 2
+
+    rows = [json.loads(line) for line in ''.join(chunks).splitlines()]
+    assert [row['id'] for row in rows] == [first_id, second_id]
+    assert rows[0]['labels'] == ['bug']
+    assert rows[0]['assignee_email'] == user.email
+    assert [entry['change_type'] for entry in rows[0]['history']] == ['created']
+    assert rows[1]['history'] == []
+
+
+def test_csv_export_filters_and_matches_import_columns(engine, db, user):
+    _seed(db, user)
+    session_factory = sessionmaker(bind=engine)
+
+    body = ''.join(export.stream_export(session_factory, 'csv', {'status': 'closed'}, include=('labels',)))
+    rows = list(csv.DictReader(io.StringIO(body)))
+    assert [row['title'] for row in rows] == ['Second']
+    assert rows[0]['status'] == 'closed'
+    assert rows[0]['labels'] == ''
+    assert 'history' not in rows[0]
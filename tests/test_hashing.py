@@ -0,0 +1,64 @@
+import threading
+
+import pytest
+
+import hashing
+from hashing import HashingExecutor, HashingOverloaded
+
+
+def test_requests_beyond_max_pending_are_shed():
+    executor = HashingExecutor(kind='thread', workers=1, max_pending=1)
+    started, release = threading.Event(), threading.Event()
+
+    def slow_hash():
+        started.set()
+        release.wait(5)
+        return 'hashed'
+
+    worker = threading.Thread(target=executor.run, args=('hash', slow_hash))
+    worker.start()
+    started.wait(5)
+    try:
+        with pytest.raises(HashingOverloaded):
+            executor.run('hash', lambda: 'never')
+    finally:
+        release.set()
+        worker.join(5)
+        executor.shutdown()
+
+    stats = executor.stats()
+    assert stats['rejected'] == 1
+    assert stats['operations']['hash']['count'] == 1
+
+
+def test_timed_out_jobs_keep_their_slot_until_they_finish(monkeypatch):
+    monkeypatch.setattr(hashing, 'HASH_TIMEOUT', 0.05)
+    executor = HashingExecutor(kind='thread', workers=1, max_pending=2)
+    release = threading.Event()
+
+    def slow_hash():
+        release.wait(5)
+        return 'hashed'
+
+    try:
+        # The first job runs past its timeout; the second is still queued
+        # when it times out, so it is cancelled and frees its slot at once.
+        for _ in range(3):
+            with pytest.raises(HashingOverloaded):
+                executor.run('hash', slow_hash)
+        # The running job still holds one of the two slots.
+        assert executor._slots.acquire(blocking=False)
+        assert not executor._slots.acquire(blocking=False)
+        executor._slots.release()
+    finally:
+        release.set()
+        executor.shutdown()
+
+    stats = executor.stats()
+    assert stats['rejected'] == 3
+    assert stats['operations'] == {}
+
+
+def test_unknown_executor_kind_is_rejected():
+    with pytest.raises(ValueError):
+        HashingExecutor(kind='gpu')
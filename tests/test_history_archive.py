@@ -0,0 +1,121 @@
+from datetime import datetime, timedelta, timezone
+import threading
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+import history_archive
+import models
+import pagination
+import sync
+
+NOW = datetime(2026, 6, 15, 12, 0, tzinfo=timezone.utc)
+
+
+def _seed(db, user):
+    issue = models.Issue(title='Old', creator_id=user.id)
+    db.add(issue)
+    db.flush()
+    stamps = [
+        datetime(2026, 1, 3, tzinfo=timezone.utc),
+        datetime(2026, 1, 20, tzinfo=timezone.utc),
+        datetime(2026, 2, 10, tzinfo=timezone.utc),
+        datetime(2026, 6, 1, tzinfo=timezone.utc),
+    ]
+    for i, created_at in enumerate(stamps):
+        db.add(models.IssueHistory(
+            issue_id=issue.id, changed_by_id=user.id, change_type='updated',
+            field_name='status' if i % 2 else 'priority', new_value=f'v{i}', created_at=created_at,
+        ))
+    db.commit()
+    return issue.id
+
+
+def test_compaction_moves_whole_months_within_budget(engine, db, user):
+    issue_id = _seed(db, user)
+    session_factory = sessionmaker(bind=engine)
+
+    first = history_archive.compact(session_factory, retention_days=60, batch_size=1, max_rows=2, pause_seconds=0, now=NOW)
+    assert first['archived_rows'] == 2 and first['budget_exhausted']
+    # The batch edge fell inside January, so the second batch extended the same bucket.
+    second = history_archive.compact(session_factory, retention_days=60, batch_size=1, max_rows=10, pause_seconds=0, now=NOW)
+    assert second['archived_rows'] == 1 and not second['budget_exhausted']
+
+    buckets = db.query(models.IssueHistoryArchive).order_by(models.IssueHistoryArchive.period_start).all()
+    assert [(bucket.period_start.month, bucket.entry_count) for bucket in buckets] == [(1, 2), (2, 1)]
+    # Sixty days before mid-June rounds down to 1 April, so only the June row stays live.
+    assert [row.new_value for row in db.query(models.IssueHistory).filter(models.IssueHistory.issue_id == issue_id)] == ['v3']
+
+
+def test_timeline_continues_into_archived_entries(engine, db, user, count_queries):
+    issue_id = _seed(db, user)
+    username = user.username
+    history_archive.compact(sessionmaker(bind=engine), retention_days=60, pause_seconds=0, now=NOW)
+
+    entries = history_archive.timeline(db, issue_id)
+    assert [entry.new_value for entry in entries] == ['v2', 'v1', 'v0']
+    assert entries[-1].changed_by.username == username
+
+    statuses = history_archive.timeline(db, issue_id, field_name='status')
+    assert [entry.new_value for entry in statuses] == ['v1']
+
+    newest = entries[0]
+    older = history_archive.timeline(db, issue_id, before=pagination.decode_cursor(
+        pagination.encode_cursor(newest.created_at, newest.id)
+    ))
+    assert [entry.new_value for entry in older] == ['v1', 'v0']
+
+    # Only February is decompressed when one entry is enough: the bucket list,
+    # one payload and the author.
+    with count_queries() as counter:
+        assert [entry.new_value for entry in history_archive.timeline(db, issue_id, limit=1)] == ['v2']
+    assert counter.count == 3
+
+
+def test_sync_rejects_watermarks_behind_the_archive(engine, db, user):
+    _seed(db, user)
+    stale = sync.encode_watermark(1)
+    history_archive.compact(sessionmaker(bind=engine), retention_days=60, pause_seconds=0, now=NOW)
+
+    with pytest.raises(sync.WatermarkExpired):
+        sync.changes_since(db, stale)
+    with pytest.raises(sync.WatermarkExpired):
+        sync.changes_since(db, sync.encode_watermark(0))
+
+
+def test_full_sync_covers_issues_with_only_archived_history(engine, db, user):
+    quiet = models.Issue(title='Quiet for years', creator_id=user.id)
+    db.add(quiet)
+    db.flush()
+    db.add(models.IssueHistory(issue_id=quiet.id, change_type='created', created_at=NOW - timedelta(days=800)))
+    db.commit()
+    quiet_id = quiet.id
+    history_archive.compact(sessionmaker(bind=engine), retention_days=365, pause_seconds=0, now=NOW)
+    assert db.query(models.IssueHistory).count() == 0
+
+    page = sync.changes_since(db, None)
+    assert [issue.id for issue in page['issues']] == [quiet_id]
+    # The handover watermark is at the head of the log, not behind the archive.
+    assert sync.changes_since(db, page['watermark'])['issues'] == []
+
+
+def test_batches_resume_after_finished_issues(engine, db, user):
+    first_id, second_id = _seed(db, user), _seed(db, user)
+    before = history_archive.cutoff(60, NOW)
+
+    # Starting at the second issue leaves the first one's rows unread.
+    assert history_archive.archive_batch(db, before, 10, from_issue_id=second_id) == (3, second_id)
+    db.commit()
+    live = db.query(models.IssueHistory.issue_id, models.IssueHistory.new_value).order_by(models.IssueHistory.id).all()
+    assert live == [(first_id, 'v0'), (first_id, 'v1'), (first_id, 'v2'), (first_id, 'v3'), (second_id, 'v3')]
+
+
+def test_archive_job_runs_a_pass_at_startup(monkeypatch):
+    ran = threading.Event()
+    monkeypatch.setattr(history_archive, 'compact', lambda *args: ran.set() or {'archived_rows': 0})
+    job = history_archive.ArchiveJob(interval=3600, retention_days=30)
+    job.start()
+    try:
+        assert ran.wait(5)
+    finally:
+        job.stop()
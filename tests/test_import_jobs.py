@@ -0,0 +1,58 @@
+import io
+import os
+
+from sqlalchemy.orm import sessionmaker
+
+import import_jobs
+import models
+from import_jobs import ImportJobRunner
+
+CSV = 'title,description,status,priority,assignee_email\n' + ''.join(
+    f'Issue {i},,open,low,\n' for i in range(5)
+)
+
+
+def test_interrupted_job_resumes_after_last_committed_chunk(engine, db, user, tmp_path, monkeypatch):
+    monkeypatch.setattr(import_jobs, 'IMPORT_JOB_DIR', str(tmp_path))
+    job = import_jobs.create_job(db, io.BytesIO(CSV.encode()), 'issues.csv', user.id, chunk_size=2)
+    runner = ImportJobRunner(session_factory=sessionmaker(bind=engine))
+
+    record_progress = runner._record_progress
+
+    def stop_after_first_chunk(job_row, importer):
+        record_progress(job_row, importer)
+        runner._stopping.set()
+
+    monkeypatch.setattr(runner, '_record_progress', stop_after_first_chunk)
+    runner.run_job(job.id)
+
+    db.expire_all()
+    assert db.get(models.ImportJob, job.id).status == 'queued'
+    assert db.get(models.ImportJob, job.id).rows_processed == 2
+    assert db.query(models.Issue).count() == 2
+
+    resumed = ImportJobRunner(session_factory=sessionmaker(bind=engine))
+    resumed.run_job(job.id)
+
+    db.expire_all()
+    finished = db.get(models.ImportJob, job.id)
+    assert (finished.status, finished.rows_processed, finished.successful) == ('completed', 5, 5)
+    assert sorted(title for (title,) in db.query(models.Issue.title)) == [f'Issue {i}' for i in range(5)]
+
+
+def test_failed_job_removes_its_upload(engine, db, user, tmp_path, monkeypatch):
+    monkeypatch.setattr(import_jobs, 'IMPORT_JOB_DIR', str(tmp_path))
+    job = import_jobs.create_job(db, io.BytesIO(CSV.encode()), 'issues.csv', user.id, chunk_size=2)
+    assert os.path.exists(job.file_path)
+    runner = ImportJobRunner(session_factory=sessionmaker(bind=engine))
+
+    def broken_progress(job_row, importer):
+        raise RuntimeError('disk on fire')
+
+    monkeypatch.setattr(runner, '_record_progress', broken_progress)
+    runner.run_job(job.id)
+
+    db.expire_all()
+    failed = db.get(models.ImportJob, job.id)
+    assert (failed.status, failed.error_message) == ('failed', 'disk on fire')
+    assert os.listdir(tmp_path) == []
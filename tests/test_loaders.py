@@ -0,0 +1,91 @@
+import pytest
+
+import loaders
+import models
+import pagination
+import schemas
+
+
+def _seed(db, user, count):
+    labels = [models.Label(name=f'label-{i}', color='#000000') for i in range(3)]
+    db.add_all(labels)
+    assignees = [
+        models.User(email=f'dev{i}@example.com', username=f'dev{i}', hashed_password='x')
+        for i in range(5)
+    ]
+    db.add_all(assignees)
+    for i in range(count):
+        db.add(models.Issue(
+            title=f'Issue {i}',
+            status='open',
+            priority='medium',
+            creator_id=user.id,
+            assignee=assignees[i % len(assignees)],
+            labels=labels[: i % 4],
+        ))
+    db.commit()
+    db.expunge_all()
+
+
+@pytest.mark.parametrize('rows', [5, 100])
+def test_issue_page_query_count_is_constant(db, user, count_queries, rows):
+    _seed(db, user, rows)
+
+    with count_queries() as counter:
+        issues = loaders.issue_query(db).order_by(models.Issue.created_at.desc()).limit(100).all()
+        payload = [schemas.Issue.model_validate(issue) for issue in issues]
+
+    assert len(payload) == rows
+    assert counter.count == 2
+
+
+def test_issue_detail_query_count_is_constant(db, user, count_queries):
+    user_id = user.id
+    _seed(db, user, 1)
+    issue_id = db.query(models.Issue.id).scalar()
+    for i in range(20):
+        db.add(models.Comment(body=f'comment {i}', issue_id=issue_id, author_id=user_id))
+    db.commit()
+    db.expunge_all()
+
+    with count_queries() as counter:
+        issue = loaders.get_issue_detail(db, issue_id)
+        detail = schemas.IssueDetail.model_validate(issue)
+
+    assert len(detail.comments) == 20
+    assert counter.count == 3
+
+
+def test_load_issues_preserves_requested_order(db, user):
+    _seed(db, user, 4)
+    ids = [row.id for row in db.query(models.Issue.id).order_by(models.Issue.id)]
+
+    issues = loaders.load_issues(db, list(reversed(ids)) + [999])
+
+    assert [issue.id for issue in issues] == list(reversed(ids))
+
+
+def test_comment_pages_are_ascending_with_authors(db, user, count_queries):
+    issue = models.Issue(title='Incident', creator_id=user.id)
+    db.add(issue)
+    db.flush()
+    db.add_all([models.Comment(body=f'update {i}', issue_id=issue.id, author_id=user.id) for i in range(5)])
+    db.commit()
+    issue_id = issue.id
+    db.expunge_all()
+
+    with count_queries() as counter:
+        page, cursor = pagination.keyset_page(
+            loaders.comment_query(db, issue_id), models.Comment.created_at, models.Comment.id,
+            None, 3, descending=False,
+        )
+        [comment.author.username for comment in page]
+    assert counter.count == 1
+    assert [comment.body for comment in page] == ['update 0', 'update 1', 'update 2']
+
+    page, cursor = pagination.keyset_page(
+        loaders.comment_query(db, issue_id), models.Comment.created_at, models.Comment.id,
+        cursor, 3, descending=False,
+    )
+    assert [comment.body for comment in page] == ['update 3', 'update 4']
+    assert cursor is None
@@ -0,0 +1,59 @@
+from datetime import datetime, timezone
+
+import pytest
+
+import loaders
+import models
+import pagination
+
+
+def test_keyset_pages_cover_ties_without_gaps(db, user):
+    same_time = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    for i in range(7):
+        db.add(models.Issue(title=f'Issue {i}', creator_id=user.id, created_at=same_time))
+    db.commit()
+
+    seen, cursor = [], ''
+    while cursor is not None:
+        page, cursor = pagination.keyset_page(
+            db.query(models.Issue), models.Issue.created_at, models.Issue.id, cursor, 3
+        )
+        seen.extend(issue.id for issue in page)
+
+    assert seen == sorted(seen, reverse=True)
+    assert len(seen) == len(set(seen)) == 7
+
+
+def test_decode_cursor_rejects_garbage():
+    with pytest.raises(ValueError):
+        pagination.decode_cursor('not-a-cursor')
+
+
+def test_timeline_pages_filter_and_load_users(db, user, count_queries):
+    issue = models.Issue(title='Busy issue', creator_id=user.id)
+    db.add(issue)
+    db.flush()
+    same_time = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    for i in range(5):
+        db.add(models.IssueHistory(
+            issue_id=issue.id, changed_by_id=user.id, change_type='updated',
+            field_name='status' if i % 2 else 'priority', new_value=str(i), created_at=same_time,
+        ))
+    db.commit()
+    issue_id = issue.id
+    db.expunge_all()
+
+    query = loaders.history_query(db, issue_id).filter(models.IssueHistory.field_name == 'priority')
+    with count_queries() as counter:
+        page, cursor = pagination.keyset_page(
+            query, models.IssueHistory.created_at, models.IssueHistory.id, '', 2
+        )
+        [entry.changed_by.email for entry in page]
+    assert counter.count == 1
+    assert [entry.new_value for entry in page] == ['4', '2']
+
+    page, cursor = pagination.keyset_page(
+        query, models.IssueHistory.created_at, models.IssueHistory.id, cursor, 2
+    )
+    assert [entry.new_value for entry in page] == ['0']
+    assert cursor is None
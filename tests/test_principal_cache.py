@@ -0,0 +1,53 @@
+import pytest
+
+import principal_cache as cache_module
+from principal_cache import CacheBackend, MemoryBackend, PrincipalCache, SQLiteBackend
+
+
+def test_memory_backend_evicts_least_recently_used():
+    backend = MemoryBackend(ttl=60, max_size=2)
+    backend.set(1, {'id': 1})
+    backend.set(2, {'id': 2})
+    backend.get(1)
+    backend.set(3, {'id': 3})
+
+    assert backend.get(2) is None
+    assert backend.get(1) == {'id': 1}
+    assert backend.get(3) == {'id': 3}
+
+
+def test_memory_backend_expires_entries():
+    backend = MemoryBackend(ttl=-1, max_size=2)
+    backend.set(1, {'id': 1})
+
+    assert backend.get(1) is None
+
+
+def test_sqlite_backend_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / 'principals.db')
+    SQLiteBackend(path=path, ttl=60, max_size=10).set(7, {'id': 7})
+
+    assert SQLiteBackend(path=path, ttl=60, max_size=10).get(7) == {'id': 7}
+
+
+def test_incomplete_backend_fails_at_construction():
+    class GetOnly(CacheBackend):
+        def get(self, key):
+            return None
+
+    with pytest.raises(TypeError):
+        GetOnly()
+
+
+def test_user_update_invalidates_after_commit(db, user, monkeypatch):
+    cache = PrincipalCache(MemoryBackend(ttl=60, max_size=10))
+    monkeypatch.setattr(cache_module, 'principal_cache', cache)
+    cache.put(user)
+    assert cache.get(user.id)['username'] == 'owner'
+
+    user.full_name = 'Renamed'
+    db.flush()
+    assert cache.get(user.id) is not None
+
+    db.commit()
+    assert cache.get(user.id) is None
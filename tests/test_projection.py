@@ -0,0 +1,53 @@
+import pytest
+
+import models
+import projection
+
+
+def _issue(db, user):
+    label = models.Label(name='bug', color='#ff0000')
+    issue = models.Issue(title='Crash', description='x' * 1000, creator_id=user.id, assignee_id=user.id, labels=[label])
+    db.add(issue)
+    db.commit()
+    issue_id = issue.id
+    db.expunge_all()
+    return issue_id
+
+
+def test_sparse_fields_load_only_requested_columns(db, user, count_queries):
+    _issue(db, user)
+    fields = projection.parse_fields('title,status')
+
+    with count_queries() as counter:
+        issues = projection.issue_query(db, fields).all()
+        rows = projection.serialize_many(issues, fields)
+
+    assert counter.count == 1
+    sql = counter.statements[0].lower()
+    assert 'description' not in sql and 'users' not in sql
+    assert rows == [{'id': issues[0].id, 'title': 'Crash', 'status': 'open'}]
+
+
+def test_requested_relationships_are_eager_loaded(db, user, count_queries):
+    username = user.username
+    issue_id = _issue(db, user)
+    fields = projection.parse_fields('title,assignee,labels', projection.DETAIL_FIELDS)
+
+    with count_queries() as counter:
+        issue = projection.issue_query(db, fields).filter(models.Issue.id == issue_id).one()
+        body = projection.serialize(issue, fields)
+
+    assert counter.count == 2
+    assert body['assignee']['username'] == username
+    assert [label['name'] for label in body['labels']] == ['bug']
+    assert 'creator' not in body
+    with pytest.raises(Exception):
+        issue.creator
+
+
+def test_unknown_fields_are_rejected():
+    with pytest.raises(projection.InvalidFields):
+        projection.parse_fields('title,password')
+    with pytest.raises(projection.InvalidFields):
+        projection.parse_fields('comments')
+    assert projection.parse_fields(None) is None
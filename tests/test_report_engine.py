@@ -0,0 +1,56 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy.orm import sessionmaker
+
+import models
+import report_engine
+import reports
+
+CREATED = datetime(2024, 1, 1, tzinfo=timezone.utc)  # a Monday
+
+
+def _seed(db, user):
+    other = models.User(email='dev@example.com', username='dev', hashed_password='x')
+    db.add(other)
+    db.flush()
+    for hours, priority, assignee_id in [(1, 'high', user.id), (2, 'high', user.id), (3, 'high', other.id), (4, 'high', None), (10, 'low', user.id)]:
+        db.add(models.Issue(
+            title=f'{priority} {hours}', priority=priority, status='resolved', creator_id=user.id,
+            assignee_id=assignee_id, created_at=CREATED, resolved_at=CREATED + timedelta(hours=hours),
+        ))
+    db.add(models.Issue(title='Open', creator_id=user.id, assignee_id=other.id, created_at=CREATED + timedelta(days=8)))
+    db.commit()
+
+
+def test_summary_matches_the_sql_reports(db, user):
+    _seed(db, user)
+
+    summary = report_engine.build_summary(db, now=CREATED + timedelta(days=10))
+
+    assert summary['total_issues'] == 6
+    assert summary['by_status'] == {'open': 1, 'in_progress': 0, 'resolved': 5, 'closed': 0}
+    assert summary['by_priority'] == {'low': 1, 'medium': 1, 'high': 4, 'critical': 0}
+
+    expected = reports.resolution_stats(db)
+    resolution = summary['resolution']
+    for key in ('total_resolved', 'average_resolution_hours', 'median_resolution_hours', 'p90_resolution_hours', 'p95_resolution_hours', 'by_priority'):
+        assert resolution[key] == expected[key]
+
+    expected_top = reports.top_assignees(db)
+    assert summary['top_assignees'] == expected_top
+
+    assert summary['weekly'][-2:] == [
+        {'week_start': '2024-01-01', 'created': 5, 'resolved': 5},
+        {'week_start': '2024-01-08', 'created': 1, 'resolved': 0},
+    ]
+    assert len(summary['weekly']) == report_engine.REPORT_WEEKS
+
+
+def test_engine_serves_cached_summary_until_refresh(engine, db, user):
+    engine_cache = report_engine.ReportEngine(sessionmaker(bind=engine), refresh_seconds=3600)
+    assert engine_cache.summary()['total_issues'] == 0
+
+    db.add(models.Issue(title='New', creator_id=user.id))
+    db.commit()
+    assert engine_cache.summary()['total_issues'] == 0
+    assert engine_cache.refresh()['total_issues'] == 1
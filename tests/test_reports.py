@@ -0,0 +1,68 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import models
+import reports
+
+CREATED = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def _resolved(db, user, hours, priority='medium', assignee_id=None):
+    for value in hours:
+        db.add(models.Issue(
+            title=f'{priority} {value}',
+            priority=priority,
+            status='resolved',
+            creator_id=user.id,
+            assignee_id=assignee_id,
+            created_at=CREATED,
+            resolved_at=CREATED + timedelta(hours=value),
+        ))
+    db.commit()
+
+
+def test_resolution_stats_are_aggregated_in_sql(db, user):
+    _resolved(db, user, [1, 2, 3, 4], priority='high')
+    _resolved(db, user, [10], priority='low')
+
+    stats = reports.resolution_stats(db)
+
+    assert stats['total_resolved'] == 5
+    assert stats['average_resolution_hours'] == pytest.approx(4.0)
+    assert stats['median_resolution_hours'] == pytest.approx(3.0)
+    assert stats['p90_resolution_hours'] == pytest.approx(7.6)
+    assert stats['by_priority'] == {'low': 10.0, 'medium': 0, 'high': 2.5, 'critical': 0}
+
+
+def test_resolution_stats_filters(db, user):
+    _resolved(db, user, [1, 2], assignee_id=user.id)
+    _resolved(db, user, [50])
+
+    assert reports.resolution_stats(db, assignee_id=user.id)['average_resolution_hours'] == pytest.approx(1.5)
+    assert reports.resolution_stats(db, start=CREATED + timedelta(hours=10))['total_resolved'] == 1
+    assert reports.resolution_stats(db, end=CREATED)['total_resolved'] == 0
+
+
+def test_top_assignees_is_one_query_and_invalidated_by_issue_writes(db, user, count_queries):
+    reports.report_cache.invalidate()
+    user_id = user.id
+    db.add_all([
+        models.Issue(title='A', status='open', creator_id=user_id, assignee_id=user_id),
+        models.Issue(title='B', status='closed', creator_id=user_id, assignee_id=user_id),
+    ])
+    db.commit()
+
+    with count_queries() as counter:
+        first = reports.top_assignees(db)
+        cached = reports.top_assignees(db)
+
+    assert counter.count == 1
+    assert cached == first
+    assert first[0]['assignee']['id'] == user_id
+    assert first[0]['by_status'] == {'open': 1, 'in_progress': 0, 'resolved': 0, 'closed': 1}
+
+    db.add(models.Issue(title='C', status='open', creator_id=user_id, assignee_id=user_id))
+    db.commit()
+
+    assert reports.top_assignees(db)[0]['issue_count'] == 3
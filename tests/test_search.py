@@ -0,0 +1,49 @@
+import models
+import search
+
+
+def test_search_matches_titles_descriptions_and_comments(engine, db, user):
+    assert search.install(engine)
+    login = models.Issue(title='Login page crashes', description='Stack trace on submit', creator_id=user.id)
+    other = models.Issue(title='Slow dashboard', description='Charts render slowly', status='closed', creator_id=user.id)
+    db.add_all([login, other])
+    db.flush()
+    db.add(models.Comment(body='Also crashes on the dashboard', issue_id=other.id, author_id=user.id))
+    db.commit()
+
+    hits = search.search_issues(db, 'crashes')
+    assert {hit['issue_id'] for hit in hits} == {login.id, other.id}
+    by_id = {hit['issue_id']: hit for hit in hits}
+    assert by_id[login.id]['highlights']['title'] == 'Login page <mark>crashes</mark>'
+    assert '<mark>crashes</mark>' in by_id[other.id]['highlights']['comment']
+
+    closed_only = search.search_issues(db, 'crashes', {'status': 'closed'})
+    assert [hit['issue_id'] for hit in closed_only] == [other.id]
+
+
+def test_search_index_follows_updates(engine, db, user):
+    search.install(engine)
+    issue = models.Issue(title='Typo in footer', creator_id=user.id)
+    db.add(issue)
+    db.commit()
+
+    issue.title = 'Broken footer link'
+    db.commit()
+
+    assert search.search_issues(db, 'typo') == []
+    assert [hit['issue_id'] for hit in search.search_issues(db, 'broken')] == [issue.id]
+    assert search.search_issues(db, '"(*') == []
+
+
+def test_highlights_escape_user_markup(engine, db, user):
+    search.install(engine)
+    issue = models.Issue(title='<b>Login</b> crashes', description='<script>crashes()</script>', creator_id=user.id)
+    db.add(issue)
+    db.flush()
+    db.add(models.Comment(body='crashes & <img src=x>', issue_id=issue.id, author_id=user.id))
+    db.commit()
+
+    (hit,) = search.search_issues(db, 'crashes')
+    assert hit['highlights']['title'] == '&lt;b&gt;Login&lt;/b&gt; <mark>crashes</mark>'
+    assert '<script>' not in hit['highlights']['description']
+    assert hit['highlights']['comment'] == '<mark>crashes</mark> &amp; &lt;img src=x&gt;'
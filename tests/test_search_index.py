@@ -0,0 +1,169 @@
+import os
+import threading
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+import models
+import search_index
+
+
+@pytest.fixture
+def inverted(tmp_path, monkeypatch):
+    index = search_index.InvertedIndex(str(tmp_path / 'search.idx'))
+    monkeypatch.setattr(search_index, 'index', index)
+    return index
+
+
+def test_index_ranks_and_follows_writes(inverted, db, user):
+    login = models.Issue(title='Login page crashes', description='Crashes on submit', creator_id=user.id)
+    other = models.Issue(title='Slow dashboard', status='closed', creator_id=user.id)
+    db.add_all([login, other])
+    db.flush()
+    db.add(models.Comment(body='Dashboard crashes too', issue_id=other.id, author_id=user.id))
+    db.commit()
+
+    hits = search_index.search_issues(db, 'crashes')
+    assert [hit['issue_id'] for hit in hits] == [login.id, other.id]
+    assert hits[0]['highlights']['title'] == 'Login page <mark>crashes</mark>'
+    assert hits[1]['highlights']['comment'] == 'Dashboard <mark>crashes</mark> too'
+    assert [hit['issue_id'] for hit in search_index.search_issues(db, 'crashes', {'status': 'closed'})] == [other.id]
+
+    login.title = 'Login page hangs'
+    login.description = None
+    db.commit()
+    assert [hit['issue_id'] for hit in search_index.search_issues(db, 'crashes')] == [other.id]
+    assert search_index.search_issues(db, 'login hangs')[0]['issue_id'] == login.id
+
+
+def test_compacted_index_survives_reload(inverted, db, user):
+    issue = models.Issue(title='Broken footer link', creator_id=user.id)
+    db.add(issue)
+    db.commit()
+    inverted.compact()
+
+    issue.title = 'Broken header link'
+    db.commit()
+    assert inverted.pending == 2
+    inverted.compact()
+
+    reloaded = search_index.InvertedIndex(inverted.path)
+    assert reloaded.load()
+    assert reloaded.size == 1
+    assert reloaded.search('footer') == []
+    assert [hit['issue_id'] for hit in reloaded.search('broken header')] == [issue.id]
+
+
+def test_build_indexes_existing_rows(inverted, db, user):
+    search_index.index = None
+    issue = models.Issue(title='Imported issue', creator_id=user.id)
+    db.add(issue)
+    db.flush()
+    db.add(models.Comment(body='needs triage', issue_id=issue.id, author_id=user.id))
+    db.commit()
+
+    inverted.build(db)
+    assert inverted.pending == 0
+    assert [hit['issue_id'] for hit in inverted.search('triage')] == [issue.id]
+
+
+def test_writes_during_compaction_are_carried_over(tmp_path, monkeypatch):
+    index = search_index.InvertedIndex(str(tmp_path / 'search.idx'))
+    index.add(search_index.ISSUE, 1, 1, 'alpha bravo')
+    index.add(search_index.ISSUE, 2, 2, 'alpha charlie')
+    index.add(search_index.ISSUE, 3, 3, 'alpha delta')
+    write_segment = search_index.write_segment
+
+    seen = []
+
+    def concurrent_writes():
+        seen.extend(hit['issue_id'] for hit in index.search('alpha'))
+        index.remove(search_index.ISSUE, 1)
+        index.add(search_index.ISSUE, 2, 2, 'echo')
+        index.add(search_index.ISSUE, 4, 4, 'alpha foxtrot')
+
+    def write_while_indexing(path, docs, postings, mark):
+        # The file is written without the index lock, so another thread's
+        # searches and writes go through instead of waiting.
+        writer = threading.Thread(target=concurrent_writes)
+        writer.start()
+        writer.join(5)
+        assert not writer.is_alive()
+        write_segment(path, docs, postings, mark)
+
+    monkeypatch.setattr(search_index, 'write_segment', write_while_indexing)
+    index.compact()
+
+    assert sorted(seen) == [1, 2, 3]
+    assert index.base.size == 3
+    assert sorted(hit['issue_id'] for hit in index.search('alpha')) == [3, 4]
+    assert [hit['issue_id'] for hit in index.search('echo')] == [2]
+    assert index.search('charlie') == []
+
+    monkeypatch.setattr(search_index, 'write_segment', write_segment)
+    index.compact()
+    assert index.pending == 0 and index.size == 3
+    assert sorted(hit['issue_id'] for hit in index.search('alpha')) == [3, 4]
+
+
+def test_failed_compaction_keeps_the_index_searchable(tmp_path, monkeypatch):
+    index = search_index.InvertedIndex(str(tmp_path / 'search.idx'))
+    index.add(search_index.ISSUE, 1, 1, 'golf')
+    index.compact()
+    index.add(search_index.ISSUE, 2, 2, 'golf hotel')
+
+    def disk_full(path, docs, postings, mark):
+        raise OSError('No space left on device')
+
+    monkeypatch.setattr(search_index, 'write_segment', disk_full)
+    with pytest.raises(OSError):
+        index.compact()
+    assert sorted(hit['issue_id'] for hit in index.search('golf')) == [1, 2]
+
+
+@pytest.fixture
+def owned(engine, tmp_path, monkeypatch):
+    monkeypatch.setattr(search_index, 'index', None)
+    path = str(tmp_path / 'owned.idx')
+    session_factory = sessionmaker(bind=engine)
+    yield lambda: search_index.setup(session_factory, 'inverted', path)
+    search_index.release_lock(path)
+
+
+def test_startup_rebuilds_after_a_crash(owned, db, user):
+    first = owned()
+    issue = models.Issue(title='Written before the crash', creator_id=user.id)
+    db.add(issue)
+    db.commit()
+    assert first.pending and [hit['issue_id'] for hit in first.search('crash')] == [issue.id]
+
+    # No shutdown(): the lock stays behind and the file lacks the write.
+    search_index.index = None
+    assert [hit['issue_id'] for hit in owned().search('crash')] == [issue.id]
+
+
+def test_startup_reuses_a_current_file_and_rebuilds_a_stale_one(owned, db, user, monkeypatch):
+    owned()
+    db.add(models.Issue(title='Indexed before shutdown', creator_id=user.id))
+    db.commit()
+    search_index.shutdown()
+
+    builds = []
+    build = search_index.InvertedIndex.build
+    monkeypatch.setattr(search_index.InvertedIndex, 'build', lambda self, db: builds.append(1) or build(self, db))
+    assert owned().search('shutdown') and builds == []
+    search_index.shutdown()
+
+    # Written while no process owned the index.
+    offline = models.Issue(title='Imported offline', creator_id=user.id)
+    db.add(offline)
+    db.commit()
+    assert [hit['issue_id'] for hit in owned().search('offline')] == [offline.id]
+    assert builds == [1]
+
+
+def test_a_second_live_owner_is_refused(owned, tmp_path):
+    with open(tmp_path / 'owned.idx.lock', 'w') as f:
+        f.write(str(os.getppid()))
+    with pytest.raises(search_index.IndexLocked):
+        owned()
@@ -0,0 +1,163 @@
+import functools
+import json
+from datetime import datetime, timezone
+
+from sqlalchemy.orm import sessionmaker
+
+import history_archive
+import models
+import snapshot
+import sync
+
+
+def _issue(db, user, **fields):
+    issue = models.Issue(title=fields.pop('title', 'Routed'), creator_id=user.id, **fields)
+    db.add(issue)
+    db.commit()
+    return issue.id
+
+
+def test_issue_detail_keeps_its_shape_unless_comments_are_limited(client, db, user):
+    issue_id = _issue(db, user)
+    db.add_all([models.Comment(body=f'note {i}', issue_id=issue_id, author_id=user.id) for i in range(3)])
+    db.commit()
+
+    detail = client.get(f'/api/issues/{issue_id}')
+    assert detail.status_code == 200
+    assert len(detail.json()['comments']) == 3
+    assert 'comment_count' not in detail.json() and 'comments_next_cursor' not in detail.json()
+
+    preview = client.get(f'/api/issues/{issue_id}', params={'comments_limit': 2}).json()
+    assert [comment['body'] for comment in preview['comments']] == ['note 0', 'note 1']
+    assert preview['comment_count'] == 3 and preview['comments_next_cursor']
+    assert client.get(f'/api/issues/{issue_id}', params={'comments_limit': 0}).status_code == 422
+
+
+def test_list_and_detail_answer_if_none_match_with_304(client, db, user):
+    issue_id = _issue(db, user)
+
+    listed = client.get('/api/issues')
+    etag = listed.headers['ETag']
+    assert listed.status_code == 200 and listed.headers['Cache-Control'] == 'private, no-cache'
+    cached = client.get('/api/issues', headers={'If-None-Match': etag})
+    assert cached.status_code == 304 and cached.content == b'' and cached.headers['ETag'] == etag
+
+    detail_etag = client.get(f'/api/issues/{issue_id}').headers['ETag']
+    assert client.get(f'/api/issues/{issue_id}', headers={'If-None-Match': f'W/{detail_etag}'}).status_code == 304
+
+    client.patch(f'/api/issues/{issue_id}', json={'status': 'closed', 'version': 1})
+    assert client.get('/api/issues', headers={'If-None-Match': etag}).status_code == 200
+    assert client.get(f'/api/issues/{issue_id}', headers={'If-None-Match': detail_etag}).status_code == 200
+
+    labels_etag = client.get('/api/labels').headers['ETag']
+    assert client.get('/api/labels', headers={'If-None-Match': labels_etag}).status_code == 304
+
+
+def test_fields_project_list_pages_and_detail(client, db, user):
+    issue_id = _issue(db, user, title='Projected', priority='high')
+
+    assert client.get('/api/issues', params={'fields': 'id,title'}).json() == [{'id': issue_id, 'title': 'Projected'}]
+    page = client.get('/api/issues', params={'fields': 'id,priority', 'cursor': ''}).json()
+    assert page == {'items': [{'id': issue_id, 'priority': 'high'}], 'next_cursor': None}
+    detail = client.get(f'/api/issues/{issue_id}', params={'fields': 'title,comments'}).json()
+    assert detail == {'id': issue_id, 'title': 'Projected', 'comments': []}
+    assert client.get('/api/issues', params={'fields': 'id,password'}).status_code == 400
+
+
+def test_list_offset_and_cursor_modes(client, db, user):
+    issue_ids = [_issue(db, user, title=f'Issue {i}') for i in range(3)]
+
+    offset = client.get('/api/issues', params={'limit': 2}).json()
+    assert isinstance(offset, list) and len(offset) == 2
+
+    seen, cursor = [], ''
+    while cursor is not None:
+        page = client.get('/api/issues', params={'limit': 2, 'cursor': cursor}).json()
+        seen += [issue['id'] for issue in page['items']]
+        cursor = page['next_cursor']
+    assert sorted(seen) == issue_ids
+    assert client.get('/api/issues', params={'cursor': 'garbage'}).status_code == 400
+
+
+def test_comments_and_timeline_pages(client, db, user):
+    issue_id = _issue(db, user)
+    for i in range(3):
+        client.post(f'/api/issues/{issue_id}/comments', json={'body': f'note {i}'})
+
+    first = client.get(f'/api/issues/{issue_id}/comments', params={'limit': 2}).json()
+    rest = client.get(f'/api/issues/{issue_id}/comments', params={'cursor': first['next_cursor']}).json()
+    assert [comment['body'] for comment in first['items'] + rest['items']] == ['note 0', 'note 1', 'note 2']
+    assert rest['next_cursor'] is None
+
+    timeline = client.get(f'/api/issues/{issue_id}/timeline', params={'change_type': 'comment_added'})
+    assert isinstance(timeline.json(), list) and len(timeline.json()) == 3
+    page = client.get(f'/api/issues/{issue_id}/timeline', params={'cursor': '', 'limit': 2}).json()
+    assert len(page['items']) == 2 and page['next_cursor']
+    assert client.get('/api/issues/999/timeline').status_code == 404
+
+
+def test_bulk_mutation_by_filter(client, db, user):
+    open_ids = [_issue(db, user, status='open') for _ in range(2)]
+    closed_id = _issue(db, user, status='closed')
+
+    response = client.post('/api/issues/bulk', json={
+        'filter': {'status': 'open'},
+        'operations': [{'op': 'set_priority', 'value': 'critical'}],
+    })
+    assert response.status_code == 200 and response.json()['updated'] == 2
+    db.expire_all()
+    priorities = dict(db.query(models.Issue.id, models.Issue.priority))
+    assert [priorities[issue_id] for issue_id in open_ids] == ['critical', 'critical']
+    assert priorities[closed_id] != 'critical'
+
+    both = client.post('/api/issues/bulk', json={
+        'issue_ids': open_ids, 'filter': {'status': 'open'}, 'operations': [{'op': 'set_priority', 'value': 'low'}],
+    })
+    assert both.status_code == 422
+    unknown = client.post('/api/issues/bulk', json={'issue_ids': [999], 'operations': [{'op': 'set_priority', 'value': 'low'}]})
+    assert unknown.status_code == 400
+
+
+def test_export_streams_csv_and_ndjson(client, db, user, engine, monkeypatch):
+    import server
+
+    monkeypatch.setattr(server, 'SessionLocal', sessionmaker(bind=engine))
+    issue_ids = [_issue(db, user, title=f'Exported {i}') for i in range(3)]
+
+    exported = client.get('/api/issues/export')
+    assert exported.status_code == 200
+    assert exported.headers['content-type'].startswith('text/csv')
+    assert exported.headers['content-disposition'] == 'attachment; filename="issues.csv"'
+    assert len(exported.text.strip().splitlines()) == 4
+
+    lines = client.get('/api/issues/export', params={'format': 'ndjson', 'include': 'labels'}).text.strip().splitlines()
+    assert [json.loads(line)['id'] for line in lines] == issue_ids
+    assert client.get('/api/issues/export', params={'include': 'secrets'}).status_code == 400
+    assert client.get('/api/issues/export', params={'format': 'xml'}).status_code == 422
+
+
+def test_snapshot_route_returns_the_manifest(client, db, user, engine, tmp_path, monkeypatch):
+    import server
+
+    monkeypatch.setattr(server, 'engine', engine)
+    monkeypatch.setattr(snapshot, 'write_snapshot', functools.partial(snapshot.write_snapshot, directory=str(tmp_path)))
+    _issue(db, user)
+
+    response = client.post('/api/snapshots', params={'format': 'npz'})
+    assert response.status_code == 201
+    assert response.json()['tables']['issues']['rows'] == 1
+    assert client.post('/api/snapshots', params={'format': 'csv'}).status_code == 422
+
+
+def test_sync_route_pages_and_expires_watermarks(client, db, user, engine):
+    issue_id = _issue(db, user)
+    db.add(models.IssueHistory(issue_id=issue_id, change_type='created', created_at=datetime(2020, 1, 5, tzinfo=timezone.utc)))
+    db.commit()
+
+    full = client.get('/api/sync/changes').json()
+    assert [issue['id'] for issue in full['issues']] == [issue_id] and full['has_more']
+    assert client.get('/api/sync/changes', params={'since': 'not-a-watermark'}).status_code == 400
+
+    history_archive.compact(sessionmaker(bind=engine), retention_days=30, pause_seconds=0)
+    expired = client.get('/api/sync/changes', params={'since': sync.encode_watermark(0)})
+    assert expired.status_code == 410
@@ -0,0 +1,73 @@
+import json
+import os
+from datetime import datetime, timezone
+
+import pandas as pd
+import pytest
+
+import history_archive
+import models
+import snapshot
+
+
+def _seed(db, user):
+    bug = models.Label(name='bug', color='#ff0000')
+    issues = [
+        models.Issue(title=f'Issue {i}', description='Ünïcode' if i % 2 else None, creator_id=user.id, labels=[bug])
+        for i in range(5)
+    ]
+    db.add_all(issues)
+    db.flush()
+    db.add(models.IssueHistory(issue_id=issues[0].id, changed_by_id=None, change_type='created'))
+    db.commit()
+    return [issue.id for issue in issues]
+
+
+def test_npz_snapshot_round_trips_typed_columns(engine, db, user, tmp_path):
+    issue_ids = _seed(db, user)
+
+    manifest = snapshot.write_snapshot(engine, str(tmp_path), 'npz', chunk_size=2)
+    assert {name: table['rows'] for name, table in manifest['tables'].items()} == {
+        'issues': 5, 'issue_history': 1, 'issue_labels': 5,
+    }
+    assert len(os.listdir(os.path.join(manifest['path'], 'issues'))) == 3
+    with open(os.path.join(manifest['path'], 'manifest.json')) as f:
+        assert json.load(f)['format'] == 'npz'
+
+    issues = snapshot.read_table(manifest['path'], 'issues')
+    assert issues['id'].tolist() == issue_ids
+    assert str(issues['id'].dtype) == 'Int64'
+    assert issues['description'].isna().tolist() == [True, False, True, False, True]
+    assert issues['description'][1] == 'Ünïcode'
+    assert str(issues['created_at'].dt.tz) == 'UTC'
+    assert issues['assignee_id'].isna().all()
+
+    history = snapshot.read_table(manifest['path'], 'issue_history')
+    assert history['changed_by_id'].isna().tolist() == [True]
+
+
+def test_snapshot_includes_archived_history(engine, db, user, tmp_path):
+    issue_ids = _seed(db, user)
+    db.add(models.IssueHistory(
+        issue_id=issue_ids[1], changed_by_id=user.id, change_type='updated', field_name='status',
+        new_value='closed', created_at=datetime(2020, 3, 4, tzinfo=timezone.utc),
+    ))
+    db.commit()
+    assert history_archive.archive_batch(db, datetime(2021, 1, 1, tzinfo=timezone.utc), 10) == (1, issue_ids[1])
+    db.commit()
+
+    manifest = snapshot.write_snapshot(engine, str(tmp_path), 'npz')
+    assert manifest['tables']['issue_history']['rows'] == 2
+    history = snapshot.read_table(manifest['path'], 'issue_history')
+    assert history['issue_id'].tolist() == [issue_ids[1], issue_ids[0]]
+    assert history['new_value'][0] == 'closed' and history['txid'].tolist() == [0, 0]
+    assert history['created_at'][0] == pd.Timestamp('2020-03-04', tz='UTC')
+
+
+def test_parquet_snapshot(engine, db, user, tmp_path):
+    pytest.importorskip('pyarrow')
+    _seed(db, user)
+
+    manifest = snapshot.write_snapshot(engine, str(tmp_path), 'parquet', chunk_size=2)
+    labels = snapshot.read_table(manifest['path'], 'issue_labels')
+    assert len(labels) == 5
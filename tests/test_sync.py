@@ -0,0 +1,139 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import models
+import sync
+
+LOG_START = sync.encode_watermark(0)
+
+
+def _touch(db, issue_id, change_type='updated', created_at=None, txid=None):
+    history = models.IssueHistory(issue_id=issue_id, change_type=change_type)
+    if created_at is not None:
+        history.created_at = created_at
+    if txid is not None:
+        history.txid = txid
+    db.add(history)
+
+
+def test_changes_are_paged_by_watermark(db, user):
+    issues = [models.Issue(title=f'Issue {i}', creator_id=user.id) for i in range(5)]
+    db.add_all(issues)
+    db.flush()
+    ids = [issue.id for issue in issues]
+    for issue_id in ids:
+        _touch(db, issue_id, 'created')
+    _touch(db, ids[0])
+    _touch(db, ids[1], 'labels_updated')
+    db.commit()
+    later = datetime.now(timezone.utc) + timedelta(minutes=1)
+
+    first = sync.changes_since(db, LOG_START, limit=3, now=later)
+    assert [issue.id for issue in first['issues']] == ids[:3]
+    assert first['has_more']
+
+    second = sync.changes_since(db, first['watermark'], limit=3, now=later)
+    # ids[0] and ids[1] changed again after the first page, so they come back.
+    assert [issue.id for issue in second['issues']] == ids[3:] + ids[:1]
+    third = sync.changes_since(db, second['watermark'], limit=3, now=later)
+    assert [issue.id for issue in third['issues']] == ids[1:2]
+    assert not third['has_more']
+
+    caught_up = sync.changes_since(db, third['watermark'], now=later)
+    assert caught_up['issues'] == [] and caught_up['watermark'] == third['watermark']
+
+
+def test_scan_limit_bounds_rows_read(db, user):
+    issue = models.Issue(title='Busy', creator_id=user.id)
+    db.add(issue)
+    db.flush()
+    for _ in range(10):
+        _touch(db, issue.id)
+    db.commit()
+    later = datetime.now(timezone.utc) + timedelta(minutes=1)
+
+    page = sync.changes_since(db, LOG_START, scan_limit=4, now=later)
+    assert [found.id for found in page['issues']] == [issue.id]
+    assert page['has_more'] and sync.decode_watermark(page['watermark'])[1] > 0
+
+
+def test_recent_history_waits_for_the_settle_window(db, user):
+    issue = models.Issue(title='Fresh', creator_id=user.id)
+    db.add(issue)
+    db.flush()
+    _touch(db, issue.id, 'created')
+    db.commit()
+
+    page = sync.changes_since(db, LOG_START)
+    assert page['issues'] == [] and sync.decode_watermark(page['watermark']) == (0, 0)
+
+
+def test_invalid_watermark():
+    with pytest.raises(ValueError):
+        sync.decode_watermark('not-a-watermark')
+    assert sync.decode_watermark(sync.encode_watermark(42, 7)) == (7, 42)
+
+
+def test_scan_stops_at_the_first_unsettled_row(db, user):
+    issues = [models.Issue(title=f'Issue {i}', creator_id=user.id) for i in range(3)]
+    db.add_all(issues)
+    db.flush()
+    now = datetime.now(timezone.utc)
+    old = now - timedelta(minutes=5)
+    _touch(db, issues[0].id, created_at=old)
+    _touch(db, issues[1].id, created_at=now)
+    # Stamped when a long write started, so it looks settled behind a fresh row.
+    _touch(db, issues[2].id, created_at=old)
+    db.commit()
+    first_id = issues[0].id
+
+    page = sync.changes_since(db, LOG_START, now=now)
+    assert [issue.id for issue in page['issues']] == [first_id]
+    assert not page['has_more']
+
+
+def test_rows_of_running_transactions_hold_the_watermark(db, user, monkeypatch):
+    bulk_target, single_target = models.Issue(title='Bulk', creator_id=user.id), models.Issue(title='Single', creator_id=user.id)
+    db.add_all([bulk_target, single_target])
+    db.flush()
+    # A long bulk write (txid 100) took the lower id; a short update (txid 101)
+    # took a higher id and committed first.
+    _touch(db, bulk_target.id, txid=100)
+    _touch(db, single_target.id, txid=101)
+    db.commit()
+    bulk_id, single_id = bulk_target.id, single_target.id
+    later = datetime.now(timezone.utc) + timedelta(minutes=1)
+
+    monkeypatch.setattr(sync, 'oldest_running_txid', lambda db: 100)
+    while_running = sync.changes_since(db, LOG_START, now=later)
+    assert while_running['issues'] == []
+
+    monkeypatch.setattr(sync, 'oldest_running_txid', lambda db: 102)
+    committed = sync.changes_since(db, while_running['watermark'], now=later)
+    assert [issue.id for issue in committed['issues']] == [bulk_id, single_id]
+    assert sync.decode_watermark(committed['watermark'])[0] == 101
+
+
+def test_full_sync_pages_issues_then_follows_the_log(db, user):
+    issues = [models.Issue(title=f'Issue {i}', creator_id=user.id) for i in range(3)]
+    db.add_all(issues)
+    db.flush()
+    ids = [issue.id for issue in issues]
+    old = datetime.now(timezone.utc) - timedelta(minutes=5)
+    for issue_id in ids:
+        _touch(db, issue_id, 'created', created_at=old)
+    db.commit()
+
+    first = sync.changes_since(db, None, limit=2)
+    assert [issue.id for issue in first['issues']] == ids[:2] and first['has_more']
+    # Changed mid-sync: already sent, so it comes back from the log.
+    _touch(db, ids[0], created_at=old)
+    db.commit()
+
+    second = sync.changes_since(db, first['watermark'], limit=2)
+    assert [issue.id for issue in second['issues']] == ids[2:]
+    later = datetime.now(timezone.utc) + timedelta(minutes=1)
+    third = sync.changes_since(db, second['watermark'], now=later)
+    assert [issue.id for issue in third['issues']] == ids[:1]
+    assert not third['has_more']
@@ -0,0 +1,60 @@
+from sqlalchemy import event
+
+import events
+import models
+import uow
+
+
+def _count_commits(db):
+    commits = []
+    event.listen(db, 'after_commit', lambda session: commits.append(session))
+    return commits
+
+
+def test_new_issue_and_history_share_one_commit(db, user, count_queries):
+    user_id = user.id
+    commits = _count_commits(db)
+    issue = models.Issue(title='Atomic', creator_id=user_id)
+    db.add(issue)
+    work = uow.UnitOfWork(db, user_id)
+    work.record(issue, 'created', new_value='Issue created')
+    work.record(issue, 'updated', field_name='priority', old_value='medium', new_value='high')
+    with count_queries() as counter:
+        work.commit()
+
+    assert len(commits) == 1
+    # One insert for the issue, one executemany for both history rows.
+    assert sum(statement.startswith('INSERT INTO issue_history') for statement in counter.statements) == 1
+    rows = db.query(models.IssueHistory).filter(models.IssueHistory.issue_id == issue.id).order_by(models.IssueHistory.id).all()
+    assert [(row.change_type, row.changed_by_id) for row in rows] == [('created', user_id), ('updated', user_id)]
+
+
+def test_rollback_discards_entity_and_history(db, user):
+    issue = models.Issue(title='Never', creator_id=user.id)
+    db.add(issue)
+    work = uow.UnitOfWork(db, user.id)
+    work.record(issue, 'created')
+    work.flush()
+    db.rollback()
+
+    assert db.query(models.Issue).count() == 0
+    assert db.query(models.IssueHistory).count() == 0
+
+
+def test_events_are_published_once_committed(db, user, monkeypatch):
+    published = []
+    monkeypatch.setattr(events.EventBroker, 'has_subscribers', property(lambda self: True))
+    monkeypatch.setattr(events.broker, 'publish', published.extend)
+    issue = models.Issue(title='Announced', creator_id=user.id, priority='high')
+    db.add(issue)
+    db.commit()
+
+    work = uow.UnitOfWork(db, user.id)
+    db.add(models.Comment(body='Hello', issue_id=issue.id, author_id=user.id))
+    work.record(issue, 'comment_added', new_value='Added comment')
+    work.flush()
+    assert published == []
+    db.commit()
+
+    assert [(change['kind'], change['issue_id']) for change in published] == [('comment', issue.id)]
+    assert published[0]['issue']['priority'] == 'high'